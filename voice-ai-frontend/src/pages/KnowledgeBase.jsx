@@ -13,6 +13,7 @@ const KnowledgeBase = () => {
     const [loading, setLoading] = useState(false);
     const [uploadStatus, setUploadStatus] = useState(null);
     const [promptStatus, setPromptStatus] = useState(null);
+    const [uploadProgress, setUploadProgress] = useState(null);
 
     const apiBaseUrl = import.meta.env.VITE_API_URL || 'http://localhost:8000';
     const token = localStorage.getItem('token');
@@ -50,12 +51,25 @@ const KnowledgeBase = () => {
         formData.append('file', file);
 
         try {
-            await axios.post(`${apiBaseUrl}/upload-doc`, formData, {
+            const res = await axios.post(`${apiBaseUrl}/upload-doc`, formData, {
                 headers: {
                     Authorization: `Bearer ${token}`,
                     'Content-Type': 'multipart/form-data'
                 }
             });
+
+            // İşleme arka planda sürer: iş bitene kadar durumu sorgula
+            let job = res.data;
+            while (job.status === 'queued' || job.status === 'running') {
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                const statusRes = await axios.get(`${apiBaseUrl}/upload-doc/${job.job_id}`, {
+                    headers: { Authorization: `Bearer ${token}` }
+                });
+                job = statusRes.data;
+                setUploadProgress(job);
+            }
+
+            if (job.status !== 'done') throw new Error(job.error || 'Ingestion failed');
             setUploadStatus('success');
             setFile(null);
         } catch (err) {
@@ -63,6 +77,7 @@ const KnowledgeBase = () => {
             setUploadStatus('error');
         } finally {
             setLoading(false);
+            setUploadProgress(null);
         }
     };
 
@@ -146,7 +161,11 @@ const KnowledgeBase = () => {
                         {uploadStatus === 'error' && <span className="text-red-500 text-sm font-mono">Upload Failed</span>}
 
                         <Button onClick={handleFileUpload} disabled={!file || loading} size="sm">
-                            {loading ? 'Processing...' : 'Upload & Index'}
+                            {loading
+                                ? (uploadProgress && uploadProgress.pages_total
+                                    ? `Processing ${uploadProgress.pages_processed}/${uploadProgress.pages_total} pages (${uploadProgress.chunks_processed} chunks)`
+                                    : 'Processing...')
+                                : 'Upload & Index'}
                         </Button>
                     </div>
                 </PixelCard>
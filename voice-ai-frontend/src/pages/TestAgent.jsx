@@ -18,67 +18,188 @@ const TestAgent = () => {
     // Global Stream Referansı (Sürekli mikrofon izni istememek için)
     const streamRef = useRef(null);
 
-    // Döngü Kontrolü
-    const isLoopingRef = useRef(false);
+    // Akışlı STT: WebSocket bağlantısı ve ham ses işleme düğümleri
+    const sttSocketRef = useRef(null);
+    const audioContextRef = useRef(null);
+    const processorRef = useRef(null);
+    // Konuşma sürerken sunucudan gelen kısmi metin
+    const [partialText, setPartialText] = useState('');
 
     // Playback Referansları
     const audioQueue = useRef([]);
     const isPlayingAudio = useRef(false);
     const currentAudio = useRef(new Audio());
+    // Akışlı ses parçaları (audio_chunk): cümle sırası (seq) -> parça listesi
+    const audioChunkBuffers = useRef({});
 
     const apiBaseUrl = import.meta.env.VITE_API_URL || 'http://localhost:8000';
     const token = localStorage.getItem('token');
 
+    // Sohbet taşıma katmanı: 'sse' (varsayılan, JSON içinde Base64 ses) veya 'ws' (binary ses frame'leri)
+    const chatTransport = import.meta.env.VITE_CHAT_TRANSPORT || 'sse';
+    const chatSocketRef = useRef(null);
+    const activeAgentMsgId = useRef(null);
+    const wsAudioChunks = useRef([]);
+    // Sohbet oturumu: sunucu bu kimlikle önceki turları hatırlar (sayfa yenilenince yeni oturum)
+    const sessionId = useRef(crypto.randomUUID?.() ?? `${Date.now()}-${Math.random().toString(36).slice(2)}`);
+
     // --- SES OYNATMA KUYRUĞU (TTS) ---
     const processAudioQueue = () => {
         if (isPlayingAudio.current || audioQueue.current.length === 0) return;
 
-        const base64Audio = audioQueue.current.shift();
+        const audioItem = audioQueue.current.shift();
 
         // Boş veya geçersiz ses verisi kontrolü
-        if (!base64Audio || base64Audio.length < 10) {
+        if (!audioItem || audioItem.length < 10) {
             processAudioQueue();
             return;
         }
 
         isPlayingAudio.current = true;
-        const audioSrc = `data:audio/mp3;base64,${base64Audio}`;
+        // Kuyrukta base64 ses veya birleştirilmiş parçalardan oluşan blob URL olabilir
+        const isBlobUrl = audioItem.startsWith('blob:');
+        const audioSrc = isBlobUrl ? audioItem : `data:audio/mp3;base64,${audioItem}`;
         currentAudio.current.src = audioSrc;
 
-        currentAudio.current.onended = () => {
+        const playNext = () => {
+            if (isBlobUrl) URL.revokeObjectURL(audioItem);
             isPlayingAudio.current = false;
             processAudioQueue();
         };
-        currentAudio.current.onerror = () => {
-            isPlayingAudio.current = false;
-            processAudioQueue();
-        };
-        currentAudio.current.play().catch(() => {
-            isPlayingAudio.current = false;
-            processAudioQueue();
-        });
+        currentAudio.current.onended = playNext;
+        currentAudio.current.onerror = playNext;
+        currentAudio.current.play().catch(playNext);
+    };
+
+    // Base64 parçaları tek bir ses blob'una çevirir
+    const base64ChunksToBlobUrl = (chunks) => {
+        const parts = chunks.map((b64) => Uint8Array.from(atob(b64), (c) => c.charCodeAt(0)));
+        return URL.createObjectURL(new Blob(parts, { type: 'audio/mpeg' }));
     };
 
+    // --- WEBSOCKET SOHBET BAĞLANTISI ---
+    const getChatSocket = () => new Promise((resolve, reject) => {
+        const existing = chatSocketRef.current;
+        if (existing && existing.readyState === WebSocket.OPEN) {
+            resolve(existing);
+            return;
+        }
+
+        const wsUrl = `${apiBaseUrl.replace(/^http/, 'ws')}/ws/chat?token=${encodeURIComponent(token)}`;
+        const socket = new WebSocket(wsUrl);
+        socket.binaryType = 'arraybuffer';
+
+        socket.onopen = () => resolve(socket);
+        socket.onerror = (err) => reject(err);
+        socket.onclose = () => { chatSocketRef.current = null; };
+        socket.onmessage = (event) => {
+            // Binary frame: açık cümlenin ses parçası
+            if (event.data instanceof ArrayBuffer) {
+                wsAudioChunks.current.push(event.data);
+                return;
+            }
+
+            const message = JSON.parse(event.data);
+            if (message.type === 'audio_end') {
+                const chunks = wsAudioChunks.current;
+                wsAudioChunks.current = [];
+                if (chunks.length) {
+                    audioQueue.current.push(URL.createObjectURL(new Blob(chunks, { type: 'audio/mpeg' })));
+                    processAudioQueue();
+                }
+                return;
+            }
+            handleStreamEvent(message, activeAgentMsgId.current);
+        };
+
+        chatSocketRef.current = socket;
+    });
+
+    // Sayfadan çıkınca sohbet bağlantısını kapat
+    useEffect(() => () => chatSocketRef.current?.close(), []);
+
     // --- SCROLL TO BOTTOM ---
     useEffect(() => {
         chatEndRef.current?.scrollIntoView({ behavior: 'smooth' });
     }, [messages, status, inputText]);
 
-    // --- SES KAYIT DÖNGÜSÜ (HEADER FIX) ---
-    const startRecordingLoop = async () => {
+    // --- AKIŞLI SES KAYDI (WebSocket + PCM16) ---
+    // Backend 16 kHz mono PCM16 bekler (sessizlik tespiti ve segmentleme sunucuda yapılır)
+    const STT_SAMPLE_RATE = 16000;
+
+    const downsampleToPcm16 = (input, inputRate) => {
+        const ratio = inputRate / STT_SAMPLE_RATE;
+        const length = Math.floor(input.length / ratio);
+        const output = new Int16Array(length);
+        for (let i = 0; i < length; i++) {
+            const sample = Math.max(-1, Math.min(1, input[Math.floor(i * ratio)]));
+            output[i] = sample < 0 ? sample * 0x8000 : sample * 0x7fff;
+        }
+        return output.buffer;
+    };
+
+    const openSttSocket = () => new Promise((resolve, reject) => {
+        const wsUrl = `${apiBaseUrl.replace(/^http/, 'ws')}/ws/transcribe?token=${encodeURIComponent(token)}&sample_rate=${STT_SAMPLE_RATE}`;
+        const socket = new WebSocket(wsUrl);
+
+        socket.onmessage = (event) => {
+            const message = JSON.parse(event.data);
+            if (message.type === 'partial') {
+                setPartialText(message.text);
+            } else if (message.type === 'final') {
+                setPartialText('');
+                if (message.text) {
+                    // Gelen metni mevcudun üzerine ekle
+                    setInputText(prev => (prev ? `${prev} ${message.text}` : message.text));
+                }
+            } else if (message.type === 'error') {
+                // Sunucu yoğun: bu segment yazıya dökülemedi
+                console.warn('STT segment reddedildi', message.data);
+            } else if (message.type === 'done') {
+                // Son segment de yazıya döküldü, oturumu kapat
+                socket.close();
+            }
+        };
+        socket.onclose = () => {
+            sttSocketRef.current = null;
+            setPartialText('');
+            setIsTranscribing(false);
+            setStatus(prev => (prev === 'listening' ? 'idle' : prev));
+        };
+        socket.onopen = () => resolve(socket);
+        socket.onerror = (err) => reject(err);
+    });
+
+    const startRecording = async () => {
         try {
             // 1. Mikrofon akışını al (varsa mevcudu kullan)
             if (!streamRef.current) {
                 streamRef.current = await navigator.mediaDevices.getUserMedia({ audio: true });
             }
 
-            isLoopingRef.current = true;
-            setIsListening(true);
-            setStatus('listening');
+            // 2. Tek bir STT bağlantısı aç (kimlik doğrulama bağlantı başına bir kez)
+            const socket = await openSttSocket();
+            sttSocketRef.current = socket;
+
+            // 3. Ham örnekleri 16 kHz PCM16'ya çevirip sürekli gönder
+            const audioContext = new AudioContext();
+            const source = audioContext.createMediaStreamSource(streamRef.current);
+            // ScriptProcessor: ayrı bir worklet dosyası gerektirmeden ham örneklere erişim sağlar
+            const processor = audioContext.createScriptProcessor(4096, 1, 1);
+            processor.onaudioprocess = (event) => {
+                if (socket.readyState === WebSocket.OPEN) {
+                    socket.send(downsampleToPcm16(event.inputBuffer.getChannelData(0), audioContext.sampleRate));
+                }
+            };
+            source.connect(processor);
+            processor.connect(audioContext.destination);
 
-            // Döngüyü başlat
-            recordNextChunk();
+            audioContextRef.current = audioContext;
+            processorRef.current = processor;
 
+            setIsListening(true);
+            setIsTranscribing(true);
+            setStatus('listening');
         } catch (err) {
             console.error("Mikrofon hatası:", err);
             alert("Mikrofon erişimi sağlanamadı.");
@@ -86,104 +207,36 @@ const TestAgent = () => {
         }
     };
 
-    const recordNextChunk = () => {
-        // Döngü durdurulduysa işlem yapma
-        if (!isLoopingRef.current || !streamRef.current) return;
-
-        // Yeni bir kaydedici oluştur (Her seferinde "Header" yeniden yazılır)
-        const mediaRecorder = new MediaRecorder(streamRef.current, { mimeType: 'audio/webm' });
-        const audioChunks = [];
-
-        mediaRecorder.ondataavailable = (event) => {
-            if (event.data.size > 0) {
-                audioChunks.push(event.data);
-            }
-        };
-
-        mediaRecorder.onstop = async () => {
-            // Kayıt durunca eldeki veriyi blob yap
-            const audioBlob = new Blob(audioChunks, { type: 'audio/webm' });
-
-            // Eğer blob geçerliyse gönder
-            if (audioBlob.size > 0 && isLoopingRef.current) {
-                await sendAudioChunkToBackend(audioBlob);
-            }
-
-            // Döngü hala aktifse yeni bir kayıt başlat
-            if (isLoopingRef.current) {
-                recordNextChunk();
-            }
-        };
-
-        // Kaydı başlat
-        mediaRecorder.start();
-
-        // 2 Saniye sonra durdur (Bu, onstop'u tetikler ve döngüyü sürdürür)
-        setTimeout(() => {
-            if (mediaRecorder.state === "recording") {
-                mediaRecorder.stop();
-            }
-        }, 2000); // 2000ms = 2 saniyelik parçalar
-    };
-
-    const stopRecordingLoop = () => {
-        isLoopingRef.current = false; // Döngüyü kır
+    const stopRecording = () => {
         setIsListening(false);
 
+        // Ses işlemeyi durdur
+        processorRef.current?.disconnect();
+        processorRef.current = null;
+        audioContextRef.current?.close();
+        audioContextRef.current = null;
+
         // Stream'i temizle (Mikrofon ışığını söndür)
         if (streamRef.current) {
             streamRef.current.getTracks().forEach(track => track.stop());
             streamRef.current = null;
         }
 
-        // Status güncellemesi (Hemen idle yapmıyoruz, son işlem bitince idle olacak)
-        if (!isTranscribing) setStatus('idle');
+        // Sunucu açık segmenti kapatıp son metni gönderir, 'done' gelince bağlantı kapanır
+        if (sttSocketRef.current?.readyState === WebSocket.OPEN) {
+            sttSocketRef.current.send(JSON.stringify({ type: 'stop' }));
+        } else {
+            setIsTranscribing(false);
+            setStatus('idle');
+        }
     };
 
     const toggleMicrophone = () => {
         if (isListening) {
-            stopRecordingLoop();
+            stopRecording();
         } else {
             setInputText(''); // Yeni konuşma için temizle
-            startRecordingLoop();
-        }
-    };
-
-    // --- PARÇAYI BACKEND'E GÖNDER ---
-    const sendAudioChunkToBackend = async (audioBlob) => {
-        setIsTranscribing(true);
-        const formData = new FormData();
-        // Backend 'recording.webm' bekliyor (stt_service.py ile uyumlu)
-        formData.append('file', audioBlob, 'recording.webm');
-
-        try {
-            const response = await fetch(`${apiBaseUrl}/transcribe`, {
-                method: 'POST',
-                headers: { 'Authorization': `Bearer ${token}` },
-                body: formData
-            });
-
-            if (response.ok) {
-                const data = await response.json();
-                if (data.text) {
-                    // Gelen metni mevcudun üzerine ekle
-                    setInputText(prev => {
-                        // Eğer önceki metin varsa boşluk bırakarak ekle
-                        const newText = prev ? `${prev} ${data.text}` : data.text;
-                        return newText;
-                    });
-                }
-            } else {
-                console.warn("Chunk upload failed:", response.status);
-            }
-        } catch (error) {
-            console.error("Chunk Error:", error);
-        } finally {
-            // Eğer kullanıcı durdurduysa ve bu son işlemse idle yap
-            if (!isLoopingRef.current) {
-                setIsTranscribing(false);
-                setStatus('idle');
-            }
+            startRecording();
         }
     };
 
@@ -193,7 +246,7 @@ const TestAgent = () => {
 
         // Konuşma devam ediyorsa durdur
         if (isListening) {
-            stopRecordingLoop();
+            stopRecording();
             // Son parça için ufak bir bekleme (opsiyonel)
             await new Promise(r => setTimeout(r, 500));
         }
@@ -213,6 +266,18 @@ const TestAgent = () => {
             { id: agentMsgId, sender: 'agent', text: '', sources: [], timestamp: new Date().toLocaleTimeString() }
         ]);
 
+        if (chatTransport === 'ws') {
+            try {
+                activeAgentMsgId.current = agentMsgId;
+                const socket = await getChatSocket();
+                socket.send(JSON.stringify({ message: messageToSend, session_id: sessionId.current }));
+            } catch (err) {
+                console.error(err);
+                setStatus('idle');
+            }
+            return;
+        }
+
         try {
             const response = await fetch(`${apiBaseUrl}/chat/stream`, {
                 method: 'POST',
@@ -220,9 +285,17 @@ const TestAgent = () => {
                     'Content-Type': 'application/json',
                     'Authorization': `Bearer ${token}`
                 },
-                body: JSON.stringify({ message: messageToSend })
+                body: JSON.stringify({ message: messageToSend, session_id: sessionId.current })
             });
 
+            // Sunucu doluysa (429 / 503) akış hiç başlamaz
+            if (!response.ok) {
+                const retryAfter = response.headers.get('Retry-After');
+                handleStreamEvent({ type: 'error', data: { status: response.status, retry_after: retryAfter } }, agentMsgId);
+                setStatus('idle');
+                return;
+            }
+
             const reader = response.body.getReader();
             const decoder = new TextDecoder();
             let buffer = '';
@@ -262,6 +335,25 @@ const TestAgent = () => {
             case 'audio':
                 audioQueue.current.push(data);
                 processAudioQueue(); break;
+            case 'audio_chunk':
+                (audioChunkBuffers.current[data.seq] ||= []).push(data.data); break;
+            case 'error': {
+                const retry = data && data.retry_after ? ` ${data.retry_after} sn sonra tekrar deneyin.` : '';
+                const text = data === 'deadline_exceeded' || (data && data.detail === 'deadline_exceeded')
+                    ? '⏱️ Cevap süresi aşıldı.'
+                    : `⚠️ Sunucu şu an yoğun.${retry}`;
+                setMessages(prev => prev.map(m => m.id === msgId ? { ...m, text: m.text ? `${m.text}\n${text}` : text } : m));
+                break;
+            }
+            case 'audio_end': {
+                const chunks = audioChunkBuffers.current[data.seq] || [];
+                delete audioChunkBuffers.current[data.seq];
+                if (chunks.length) {
+                    audioQueue.current.push(base64ChunksToBlobUrl(chunks));
+                    processAudioQueue();
+                }
+                break;
+            }
         }
     };
 
@@ -272,7 +364,7 @@ const TestAgent = () => {
                     <h1 className="text-2xl font-bold uppercase tracking-wide flex items-center gap-2">
                         Test Lab <span className="text-xs bg-purple-500/20 text-purple-400 px-2 py-0.5 rounded font-mono border border-purple-500/30">FAL.AI LIVE</span>
                     </h1>
-                    <p className="text-gray-400 font-mono text-sm mt-1">Chunked Audio Processing</p>
+                    <p className="text-gray-400 font-mono text-sm mt-1">Streaming Audio Processing</p>
                 </div>
                 <button onClick={() => setMessages([])} className="p-2 hover:bg-white/10 rounded text-gray-400 hover:text-white">
                     <RotateCcw size={18} />
@@ -288,7 +380,7 @@ const TestAgent = () => {
                     <div className="text-center text-gray-500 mt-20 font-mono">
                         System ready.
                         <br />
-                        Wait 2-3 seconds to see text while speaking.
+                        Text appears as soon as you pause while speaking.
                     </div>
                 )}
                 {messages.map((msg) => (
@@ -326,11 +418,14 @@ const TestAgent = () => {
                     </button>
 
                     <div className="flex-1 relative">
+                        {partialText && (
+                            <p className="absolute -top-6 left-0 right-0 text-xs text-gray-500 font-mono truncate">{partialText}</p>
+                        )}
                         <input
                             type="text"
                             value={inputText}
                             onChange={(e) => setInputText(e.target.value)}
-                            placeholder={isListening ? "Listening... (Text updates every 2s)" : "Type your message..."}
+                            placeholder={isListening ? "Listening..." : "Type your message..."}
                             className="w-full h-12 bg-background-dark border border-white/20 rounded pl-4 pr-12 text-white font-mono placeholder:text-gray-600 focus:outline-none focus:border-primary transition-colors shadow-inner"
                         />
                     </div>
@@ -12,7 +12,7 @@ sys.path.append(parent_dir)
 
 from fastapi import APIRouter, Depends
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
 # Artık üst klasörden import yapabiliriz
@@ -31,7 +31,7 @@ class ChatRequest(BaseModel):
 async def chat_stream_endpoint(
         request: ChatRequest,
         current_user: models.User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """
     Gerçek zamanlı RAG + LLM + TTS akışı.
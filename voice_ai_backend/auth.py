@@ -1,11 +1,16 @@
 # voice_ai_backend/auth.py
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from typing import Optional
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import threading
+import time
 from pydantic import BaseModel
 import models
 from database import get_db  # Database bağlantısını ekledik
@@ -30,6 +35,97 @@ class TokenData(BaseModel):
     email: Optional[str] = None
 
 
+class UserSnapshot:
+    """Sıcak yolda (her istek) kullanılan hafif kullanıcı kopyası; DB oturumuna bağlı değildir."""
+
+    __slots__ = ("id", "email", "full_name", "system_prompt")
+
+    def __init__(self, id: int, email: str, full_name: Optional[str], system_prompt: Optional[str]):
+        self.id = id
+        self.email = email
+        self.full_name = full_name
+        self.system_prompt = system_prompt
+
+    @classmethod
+    def from_model(cls, user: models.User) -> "UserSnapshot":
+        return cls(user.id, user.email, user.full_name, user.system_prompt)
+
+
+class TokenUserCache:
+    """
+    Doğrulanmış token -> kullanıcı kopyası önbelleği (thread-safe, LRU, kısa TTL).
+
+    İsabette ne JWT çözülür ne de DB'ye gidilir. Kayıt TTL dolunca veya token'ın kendi
+    süresi (exp) bitince geçersiz olur; persona değişince invalidate_user ile kullanıcının
+    tüm token'ları düşürülür.
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 10000):
+        """
+        Args:
+            ttl_seconds (float): Kaydın en fazla geçerli kalacağı süre.
+            max_entries (int): Önbellekteki en fazla token sayısı.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[UserSnapshot, float, int]]" = OrderedDict()
+        # Kullanıcı sürümü artınca o kullanıcının eski kayıtları isabet vermez
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[UserSnapshot]:
+        with self._lock:
+            entry = self._data.get(token)
+            if entry is not None:
+                snapshot, expires_at, version = entry
+                if time.time() < expires_at and self._versions.get(snapshot.id, 0) == version:
+                    self._data.move_to_end(token)
+                    self.hits += 1
+                    return snapshot
+                del self._data[token]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, snapshot: UserSnapshot, token_expires_at: Optional[float] = None,
+            generation: Optional[int] = None) -> None:
+        """
+        generation, DB okumasından önce alınmalıdır; arada herhangi bir kullanıcı geçersiz
+        kılındıysa (persona değişti) okunan kopya eski olabileceği için önbelleğe girmez.
+        """
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            if generation is not None and generation != self.invalidations:
+                return
+            self._data[token] = (snapshot, expires_at, self._versions.get(snapshot.id, 0))
+            self._data.move_to_end(token)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    @property
+    def generation(self) -> int:
+        return self.invalidations
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._data),
+            "invalidations": self.invalidations,
+        }
+
+
 # --- Yardımcı Fonksiyonlar ---
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -51,53 +147,92 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 
 # --- Logic ---
-def get_current_user_from_token(token: str, db: Session):
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def decode_token(token: str) -> Tuple[TokenData, Optional[float]]:
+    """Token'ı doğrular; (token verisi, bitiş zamanı epoch saniye) döner."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
-            raise credentials_exception
+            raise _credentials_exception()
         token_data = TokenData(email=email)
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    exp = payload.get("exp")
+    return token_data, float(exp) if exp is not None else None
+
+
+async def _find_user_by_email(db: AsyncSession, email: str) -> Optional[models.User]:
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
 
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
+
+async def get_current_user_from_token(token: str, db: AsyncSession):
+    token_data, _ = decode_token(token)
+
+    user = await _find_user_by_email(db, token_data.email)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
 
 
+async def get_user_snapshot(token: str, session_factory, cache: Optional[TokenUserCache] = None) -> UserSnapshot:
+    """
+    Hızlı yol: token önbellekteyse DB'ye gidilmez. Aksi halde token doğrulanır, kullanıcı
+    session_factory() ile açılan kısa ömürlü oturumdan okunur ve önbelleğe yazılır.
+    """
+    if cache is not None:
+        snapshot = cache.get(token)
+        if snapshot is not None:
+            return snapshot
+
+    token_data, token_expires_at = decode_token(token)
+    generation = cache.generation if cache is not None else None
+    async with session_factory() as db:
+        user = await _find_user_by_email(db, token_data.email)
+        if user is None:
+            raise _credentials_exception()
+        snapshot = UserSnapshot.from_model(user)
+
+    if cache is not None:
+        cache.put(token, snapshot, token_expires_at, generation)
+    return snapshot
+
+
 # --- YENİ EKLENEN KISIM: Dependency Wrapper ---
 # Artık route'lar doğrudan bunu çağıracak
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    return get_current_user_from_token(token, db)
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    return await get_current_user_from_token(token, db)
 
 
-def register_user(db: Session, user_data):
-    db_user = db.query(models.User).filter(models.User.email == user_data.email).first()
+async def register_user(db: AsyncSession, user_data):
+    db_user = await _find_user_by_email(db, user_data.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = get_password_hash(user_data.password)
+    # Argon2 bilerek yavaş; event loop'u bloklamasın
+    hashed_password = await asyncio.to_thread(get_password_hash, user_data.password)
     new_user = models.User(
         email=user_data.email,
         full_name=user_data.full_name,
         hashed_password=hashed_password
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return {"msg": "User created successfully", "email": new_user.email}
 
 
-def login_user(db: Session, user_data):
-    user = db.query(models.User).filter(models.User.email == user_data.email).first()
-    if not user or not verify_password(user_data.password, user.hashed_password):
+async def login_user(db: AsyncSession, user_data):
+    user = await _find_user_by_email(db, user_data.email)
+    if not user or not await asyncio.to_thread(verify_password, user_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -0,0 +1,65 @@
+# voice_ai_backend/core/http_client.py
+import importlib.util
+from typing import Dict
+import httpx
+
+
+class HTTPClientPool:
+    """
+    Upstream servisleri (Fal.ai, LLM) için paylaşılan, keep-alive destekli httpx istemcileri.
+
+    Her upstream kendi bağlantı havuzunu ve timeout ayarını kullanır. İstemciler ilk
+    kullanımda oluşturulur ve uygulama kapanırken `aclose()` ile kapatılır.
+    """
+
+    def __init__(self, http2: bool = False):
+        # HTTP/2 için 'h2' paketi gerekir; yoksa HTTP/1.1 ile devam edilir
+        if http2 and importlib.util.find_spec("h2") is None:
+            print("⚠️ [HTTP] 'h2' paketi bulunamadı, HTTP/1.1 kullanılacak.")
+            http2 = False
+        self.http2 = http2
+        self._configs: Dict[str, dict] = {}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def register(self, name: str, timeout: float = 30.0, connect_timeout: float = 5.0,
+                 max_connections: int = 20, max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 30.0) -> None:
+        """Bir upstream için havuz limitlerini ve timeout değerlerini tanımlar."""
+        self._configs[name] = {
+            "timeout": httpx.Timeout(timeout, connect=connect_timeout),
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        }
+
+    def ensure(self, name: str, **kwargs) -> None:
+        """Upstream daha önce tanımlanmadıysa verilen varsayılanlarla tanımlar."""
+        if name not in self._configs:
+            self.register(name, **kwargs)
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """İsimle kayıtlı upstream'in paylaşılan istemcisini döndürür (yoksa oluşturur)."""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            if name not in self._configs:
+                self.register(name)
+            config = self._configs[name]
+            client = httpx.AsyncClient(timeout=config["timeout"], limits=config["limits"], http2=self.http2)
+            self._clients[name] = client
+        return client
+
+    async def start(self) -> None:
+        """Kayıtlı tüm istemcileri önceden oluşturur (lifespan başlangıcı)."""
+        for name in self._configs:
+            self.get(name)
+        print(f"[HTTP] İstemci havuzları hazır: {', '.join(self._configs) or '-'} (http2={self.http2})")
+
+    async def aclose(self) -> None:
+        """Tüm istemcileri ve açık bağlantıları kapatır (lifespan bitişi)."""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+        print("[HTTP] İstemci havuzları kapatıldı.")
+
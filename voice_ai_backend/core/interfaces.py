@@ -19,9 +19,9 @@ class ILLMService(ABC):
     """
 
     @abstractmethod
-    async def generate_stream(self, system_prompt: str, user_query: str, context: str = "") -> AsyncGenerator[
-        str, None]:
-        """Cevabı parça parça (token token) döner."""
+    async def generate_stream(self, system_prompt: str, user_query: str, context: str = "",
+                              history: Any = None) -> AsyncGenerator[str, None]:
+        """Cevabı parça parça (token token) döner. history: önceki turlar (varsa)."""
         pass
 
 
@@ -1,20 +1,87 @@
 # voice_ai_backend/database.py
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./voice_ai.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./voice_ai.db")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+# SQLite'ta yazma işlemleri tek tek yapılır; havuz okuyucuların yazarı beklememesi için
+# birkaç bağlantı tutar (WAL modunda okuyucular yazarı engellemez).
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+
+@event.listens_for(engine.sync_engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Her yeni bağlantıda SQLite ayarları."""
+    cursor = dbapi_connection.cursor()
+    # WAL: okuyucular yazarı, yazar okuyucuları beklemez (kalıcı ayar, dosyada saklanır)
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # WAL ile NORMAL güvenlidir; her commit'te fsync yapılmaz
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    # Kilitli veritabanında hemen 'database is locked' yerine bekle
+    cursor.execute(f"PRAGMA busy_timeout={int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000'))}")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    # Negatif değer KiB cinsinden sayfa önbelleği (~16 MB)
+    cursor.execute(f"PRAGMA cache_size=-{int(os.getenv('DB_CACHE_KB', '16000'))}")
+    cursor.execute(f"PRAGMA mmap_size={int(os.getenv('DB_MMAP_MB', '64')) * 1024 * 1024}")
+    cursor.close()
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+
+# --- Şema Geçişleri ---
+# Sürüm SQLite'ın PRAGMA user_version alanında tutulur. Yeni tablolar create_all ile
+# oluşur; mevcut tabloları değiştiren adımlar buraya sırayla eklenir ve bir kez çalışır.
+def _add_users_system_prompt(conn) -> None:
+    """Persona alanından önce oluşturulmuş voice_ai.db dosyaları için."""
+    columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(users)")}
+    if "system_prompt" not in columns:
+        conn.exec_driver_sql("ALTER TABLE users ADD COLUMN system_prompt TEXT")
+        conn.exec_driver_sql(
+            "UPDATE users SET system_prompt = 'You are a helpful AI assistant.' WHERE system_prompt IS NULL"
+        )
+
+
+def _create_conversation_log_tables(conn) -> None:
+    """Sohbet turu kaydı tabloları (turlar ve aşama süreleri); varsa dokunulmaz."""
+    import models
+
+    models.ConversationTurn.__table__.create(conn, checkfirst=True)
+    models.TurnTiming.__table__.create(conn, checkfirst=True)
+
+
+MIGRATIONS = [
+    (1, _add_users_system_prompt),
+    (2, _create_conversation_log_tables),
+]
+
+
+def _migrate(conn) -> None:
+    version = conn.exec_driver_sql("PRAGMA user_version").scalar() or 0
+    Base.metadata.create_all(conn)
+    for target, step in MIGRATIONS:
+        if version < target:
+            step(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {target}")
+            print(f"[DB] Şema sürümü {target} uygulandı.")
+
+
+async def init_db() -> None:
+    """Tabloları oluşturur ve bekleyen şema geçişlerini uygular (lifespan başlangıcı)."""
+    import models  # noqa: F401  (tabloların metadata'ya kaydı için)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(_migrate)
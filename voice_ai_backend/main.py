@@ -1,29 +1,90 @@
 # voice_ai_backend/main.py
 import os
+import json
+import asyncio
 import shutil
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File
+import uuid
+from functools import partial
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect, Query, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
 # Modüller
 import models
 import auth
-from database import engine, get_db
+from database import get_db, init_db, AsyncSessionLocal
 from services.rag.pipeline import RAGPipeline
+from services.rag.store import VectorStore
+from services.rag.backends import ChromaBackend, NumpyBackend
+from services.rag.jobs import IngestionJobManager
+from services.rag.lexical import LEXICAL_INDEX_PATH, LexicalIndex
+from services.rag.retrieval import HybridRetriever
+from services.rag.context import ContextAssembler
+from services.rag.prefetch import RetrievalPrefetcher
 from services.llm_service import CustomLLMService
+from services.llm_pool import LLMEndpointPool
 from services.orchestrator import ConversationOrchestrator
+from services.text_segmenter import SentenceSegmenter
+from services.answer_cache import SemanticAnswerCache
+from services.conversation_log import ConversationRecorder
+from services.memory import ConversationMemory
+from services.admission import AdmissionController, AdmissionRejected, AdmissionTicket, DeadlineExceeded
+from core.http_client import HTTPClientPool
 
 # Fal.ai Servisleri
 from services.tts_service import FalTTSService
+from services.tts_cache import TTSAudioCache
 from services.stt_service import FalSTTService
+from services.stt_session import StreamingSTTSession
+from services.vad import SpeechSegmenter, EnergyVAD, SilenceFilter
+
+# --- PAYLAŞILAN HTTP HAVUZLARI ---
+# Her upstream için ayrı keep-alive havuzu; istemciler lifespan içinde açılıp kapatılır.
+http_clients = HTTPClientPool(http2=os.getenv("HTTP2_ENABLED", "0") == "1")
+http_clients.register(
+    "llm",
+    timeout=float(os.getenv("LLM_TIMEOUT", "120")),
+    max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "10")),
+)
+http_clients.register(
+    "tts",
+    timeout=float(os.getenv("TTS_TIMEOUT", "30")),
+    max_connections=int(os.getenv("TTS_MAX_CONNECTIONS", "50")),
+    max_keepalive_connections=int(os.getenv("TTS_MAX_KEEPALIVE", "20")),
+)
+http_clients.register(
+    "stt",
+    timeout=float(os.getenv("STT_TIMEOUT", "10")),
+    max_connections=int(os.getenv("STT_MAX_CONNECTIONS", "50")),
+    max_keepalive_connections=int(os.getenv("STT_MAX_KEEPALIVE", "20")),
+)
+
 
-# DB Tabloları oluşturuluyor
-models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_db()
+    await http_clients.start()
+    await llm_pool.start()
+    if conversation_recorder:
+        await conversation_recorder.start()
+    # Embedding modeli arka planda yüklenip ısıtılır; hazır olana kadar /ready 503 döner
+    if os.getenv("EMBEDDING_PRELOAD", "1") == "1":
+        app.state.embedding_warmup = asyncio.create_task(asyncio.to_thread(rag_pipeline.store.embedding_fn.load))
+    yield
+    await ingestion_jobs.shutdown()
+    if conversation_recorder:
+        await conversation_recorder.aclose()
+    await llm_pool.aclose()
+    await http_clients.aclose()
 
-app = FastAPI(title="VoiceAI Platform v2 - Fal.ai Integrated")
+
+app = FastAPI(title="VoiceAI Platform v2 - Fal.ai Integrated", lifespan=lifespan)
 
 # CORS Ayarları
 app.add_middleware(
@@ -37,17 +98,151 @@ app.add_middleware(
 # --- SERVİS BAŞLATMA ---
 print("[Main] Servisler başlatılıyor...")
 
-rag_pipeline = RAGPipeline()
+# Vektör backend'i: "chroma" (varsayılan) veya küçük/orta korpuslar için mmap'li "numpy"
+if os.getenv("VECTOR_BACKEND", "chroma") == "numpy":
+    vector_backend = NumpyBackend(
+        dtype=os.getenv("NUMPY_VECTOR_DTYPE", "float32"),
+        max_users_in_memory=int(os.getenv("NUMPY_MAX_USERS_IN_MEMORY", "256")),
+    )
+else:
+    vector_backend = ChromaBackend(
+        collection_cache_size=int(os.getenv("CHROMA_COLLECTION_CACHE_SIZE", "256")),
+    )
+# Hibrit arama: BM25 (ürün kodu, isim, birebir terim) + vektör araması, RRF ile birleştirilir
+lexical_index = LexicalIndex(
+    path=vector_backend.scoped_path(LEXICAL_INDEX_PATH),
+) if os.getenv("HYBRID_RETRIEVAL_ENABLED", "1") == "1" else None
+vector_store = VectorStore(
+    batch_window_ms=float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5")),
+    max_batch_size=int(os.getenv("EMBEDDING_MAX_BATCH", "64")),
+    embedding_cache_size=int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096")),
+    result_cache_size=int(os.getenv("RETRIEVAL_CACHE_SIZE", "2048")),
+    result_cache_ttl=float(os.getenv("RETRIEVAL_CACHE_TTL", "600")),
+    lexical_index=lexical_index,
+    backend=vector_backend,
+)
+rag_pipeline = RAGPipeline(store=vector_store, retriever=HybridRetriever(
+    vector_store, lexical_index,
+    rrf_k=int(os.getenv("HYBRID_RRF_K", "60")),
+    candidate_multiplier=int(os.getenv("HYBRID_CANDIDATE_MULTIPLIER", "3")),
+) if lexical_index else None, assembler=ContextAssembler(
+    # Bağlam token bütçesi: daha kısa prompt, daha hızlı LLM prefill
+    token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200")),
+    mmr_lambda=float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7")),
+    chars_per_token=float(os.getenv("CONTEXT_CHARS_PER_TOKEN", "3.5")),
+), fetch_multiplier=int(os.getenv("CONTEXT_FETCH_MULTIPLIER", "2")))
+
+# Doküman yükleme işleri arka planda (process pool + batch'li embedding) çalışır
+ingestion_jobs = IngestionJobManager(
+    rag_pipeline,
+    max_workers=int(os.getenv("INGEST_WORKERS", "2")),
+    pages_per_task=int(os.getenv("INGEST_PAGES_PER_TASK", "8")),
+    batch_size=int(os.getenv("INGEST_BATCH_SIZE", "64")),
+    max_concurrent_jobs=int(os.getenv("INGEST_MAX_CONCURRENT_JOBS", "2")),
+)
 
 # LLM Servisi (Ngrok URL'in güncel olduğundan emin ol)
-llm_service = CustomLLMService(api_url="https://1af8-34-142-175-97.ngrok-free.app/generate")
+# LLM_ENDPOINTS virgülle ayrılmış birden fazla /generate adresi alabilir; istekler aralarında dağıtılır.
+llm_pool = LLMEndpointPool(
+    [url.strip() for url in os.getenv(
+        "LLM_ENDPOINTS", "https://1af8-34-142-175-97.ngrok-free.app/generate"
+    ).split(",") if url.strip()],
+    http=http_clients,
+    failure_threshold=int(os.getenv("LLM_FAILURE_THRESHOLD", "3")),
+    open_seconds=float(os.getenv("LLM_OPEN_SECONDS", "30")),
+    probe_interval_seconds=float(os.getenv("LLM_PROBE_INTERVAL", "10")),
+    probe_path=os.getenv("LLM_PROBE_PATH", "/health"),
+)
+llm_service = CustomLLMService(
+    http=http_clients,
+    stream=os.getenv("LLM_STREAM", "1") == "1",
+    pool=llm_pool,
+    # İlk token bu sürede gelmezse istek ikinci bir sunucuya da gönderilir (0: kapalı)
+    hedge_after_seconds=float(os.getenv("LLM_HEDGE_AFTER", "0")) or None,
+)
+
+# Kabul kontrolü: ani yükte upstream'ler (LLM, TTS, STT) boğulmasın, fazla istek hızlıca reddedilsin
+chat_admission = AdmissionController(
+    "chat",
+    max_concurrent=int(os.getenv("CHAT_MAX_CONCURRENT", "8")),
+    max_per_user=int(os.getenv("CHAT_MAX_PER_USER", "2")),
+    max_queue=int(os.getenv("CHAT_MAX_QUEUE", "16")),
+    queue_timeout_seconds=float(os.getenv("CHAT_QUEUE_TIMEOUT", "5")),
+    deadline_seconds=float(os.getenv("CHAT_DEADLINE", "120")) or None,
+)
+stt_admission = AdmissionController(
+    "stt",
+    max_concurrent=int(os.getenv("STT_MAX_CONCURRENT", "16")),
+    max_per_user=int(os.getenv("STT_MAX_PER_USER", "4")),
+    max_queue=int(os.getenv("STT_MAX_QUEUE", "32")),
+    queue_timeout_seconds=float(os.getenv("STT_QUEUE_TIMEOUT", "3")),
+    deadline_seconds=float(os.getenv("STT_DEADLINE", "15")) or None,
+)
 
 # Fal.ai Servisleri
-tts_service = FalTTSService()
-stt_service = FalSTTService()
+# TTS önbelleği: tekrar eden cümleler (karşılama, hata mesajları, SSS) için Fal.ai çağrısı yapılmaz
+tts_cache = TTSAudioCache(
+    memory_budget_bytes=int(os.getenv("TTS_CACHE_MEMORY_MB", "32")) * 1024 * 1024,
+    disk_budget_bytes=int(os.getenv("TTS_CACHE_DISK_MB", "512")) * 1024 * 1024,
+) if os.getenv("TTS_CACHE_ENABLED", "1") == "1" else None
+tts_service = FalTTSService(http=http_clients, cache=tts_cache)
+# Sessizlik filtresi: oda gürültüsünden ibaret parçalar Fal.ai'ye hiç gönderilmez
+stt_vad = SilenceFilter(
+    min_threshold=float(os.getenv("VAD_MIN_RMS", "300")),
+    min_trim_ratio=float(os.getenv("VAD_MIN_TRIM_RATIO", "0.2")),
+    opus_bitrate=os.getenv("VAD_OPUS_BITRATE", "24k"),
+) if os.getenv("VAD_ENABLED", "1") == "1" else None
+stt_service = FalSTTService(http=http_clients, vad=stt_vad)
+
+# Cevap önbelleği (aynı doküman + persona + benzer soru için LLM çağrısı yapılmaz)
+answer_cache = SemanticAnswerCache(
+    similarity_threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+    max_users=int(os.getenv("ANSWER_CACHE_MAX_USERS", "10000")),
+) if os.getenv("ANSWER_CACHE_ENABLED", "1") == "1" else None
+
+# Spekülatif bağlam araması: kullanıcı konuşurken kısmi transkripsiyonla arama önceden yapılır
+prefetcher = RetrievalPrefetcher(
+    rag_pipeline,
+    ttl_seconds=float(os.getenv("PREFETCH_TTL", "20")),
+    similarity_threshold=float(os.getenv("PREFETCH_SIMILARITY", "0.9")),
+    max_concurrent=int(os.getenv("PREFETCH_MAX_CONCURRENT", "4")),
+) if os.getenv("PREFETCH_ENABLED", "1") == "1" else None
+
+# Sohbet turları ve aşama süreleri arka planda veritabanına yazılır
+conversation_recorder = ConversationRecorder(
+    AsyncSessionLocal,
+    max_pending=int(os.getenv("CONVERSATION_LOG_MAX_PENDING", "1000")),
+) if os.getenv("CONVERSATION_LOG_ENABLED", "1") == "1" else None
+
+# Oturum başına sohbet hafızası: son turlar token bütçesiyle, eskiler özet olarak prompt'a girer
+conversation_memory = ConversationMemory(
+    token_budget=int(os.getenv("MEMORY_TOKEN_BUDGET", "800")),
+    summary_token_budget=int(os.getenv("MEMORY_SUMMARY_TOKENS", "300")),
+    max_sessions=int(os.getenv("MEMORY_MAX_SESSIONS", "1000")),
+    ttl_seconds=float(os.getenv("MEMORY_SESSION_TTL", "3600")),
+) if os.getenv("MEMORY_ENABLED", "1") == "1" else None
+
+# Orchestrator (Bir cevap içinde paralel çalışacak TTS isteği sayısı)
+orchestrator = ConversationOrchestrator(
+    rag_pipeline, llm_service, tts_service,
+    max_concurrent_tts=int(os.getenv("TTS_MAX_CONCURRENCY", "3")),
+    stream_audio=os.getenv("TTS_STREAM_AUDIO", "0") == "1",
+    segmenter_factory=partial(
+        SentenceSegmenter,
+        first_chunk_min_chars=int(os.getenv("TTS_FIRST_CHUNK_MIN_CHARS", "40")),
+        min_chunk_chars=int(os.getenv("TTS_MIN_CHUNK_CHARS", "20")),
+        max_chunk_chars=int(os.getenv("TTS_MAX_CHUNK_CHARS", "250")),
+    ),
+    answer_cache=answer_cache,
+    prefetcher=prefetcher,
+    recorder=conversation_recorder,
+    memory=conversation_memory
+)
 
-# Orchestrator
-orchestrator = ConversationOrchestrator(rag_pipeline, llm_service, tts_service)
+# Yeni doküman eski cevapları geçersiz kılar
+if answer_cache:
+    ingestion_jobs.on_complete = answer_cache.invalidate_user
 
 print("[Main] Sistem Hazır (Fal.ai Powered).")
 
@@ -57,8 +252,15 @@ app.mount("/audio", StaticFiles(directory="."), name="audio")
 
 
 # --- Auth Dependency ---
-def get_current_user(token: str = Depends(auth.oauth2_scheme), db: Session = Depends(get_db)):
-    user = auth.get_current_user_from_token(token, db)
+# Doğrulanmış token'lar kısa süre önbellekte tutulur; sıcak yolda (her /transcribe parçası) DB'ye gidilmez
+auth_cache = auth.TokenUserCache(
+    ttl_seconds=float(os.getenv("AUTH_CACHE_TTL", "60")),
+    max_entries=int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000")),
+) if os.getenv("AUTH_CACHE_ENABLED", "1") == "1" else None
+
+
+async def get_current_user(token: str = Depends(auth.oauth2_scheme)) -> auth.UserSnapshot:
+    user = await auth.get_user_snapshot(token, AsyncSessionLocal, auth_cache)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     return user
@@ -67,6 +269,10 @@ def get_current_user(token: str = Depends(auth.oauth2_scheme), db: Session = Dep
 # --- Pydantic Modelleri ---
 class ChatRequest(BaseModel):
     message: str
+    # True ise cevap önbelleği atlanır (her zaman yeni cevap üretilir)
+    bypass_cache: bool = False
+    # İstemcinin sohbet oturumu (turlar bu kimlikle kaydedilir)
+    session_id: Optional[str] = None
 
 
 class PersonaUpdate(BaseModel):
@@ -91,18 +297,85 @@ def read_root():
     return {"status": "VoiceAI System Operational", "mode": "Fal.ai Integrated"}
 
 
+@app.get("/ready")
+def read_ready():
+    """Hazırlık kontrolü: embedding modeli yüklenene kadar 503 döner."""
+    if not rag_pipeline.store.embedding_fn.ready:
+        raise HTTPException(status_code=503, detail="Embedding model loading")
+    return {"status": "ready"}
+
+
+@app.get("/stats")
+def read_stats():
+    """Önbellek ve servis sayaçları."""
+    return {
+        "tts_cache": tts_cache.stats() if tts_cache else None,
+        "answer_cache": answer_cache.stats() if answer_cache else None,
+        "stt_vad": stt_vad.stats() if stt_vad else None,
+        "embeddings": rag_pipeline.store.embedding_fn.stats(),
+        "embedding_batcher": rag_pipeline.store.query_batcher.stats(),
+        "vector_store": rag_pipeline.store.cache_stats(),
+        "lexical_index": lexical_index.stats() if lexical_index else None,
+        "context": rag_pipeline.assembler.stats(),
+        "prefetch": prefetcher.stats() if prefetcher else None,
+        "ingestion_jobs": ingestion_jobs.stats(),
+        "llm": llm_pool.stats(),
+        "auth_cache": auth_cache.stats() if auth_cache else None,
+        "conversation_log": conversation_recorder.stats() if conversation_recorder else None,
+        "memory": conversation_memory.stats() if conversation_memory else None,
+        "admission": {"chat": chat_admission.stats(), "stt": stt_admission.stats()},
+    }
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    Kabul bileti taşıyan akış cevabı: yanıt nasıl biterse bitsin (istemci akış başlamadan
+    kopsa ve generator hiç çalışmasa bile) slot bırakılır.
+    """
+
+    def __init__(self, ticket: AdmissionTicket, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ticket = ticket
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.ticket.release()
+
+
+async def admit(controller: AdmissionController, user_id: int) -> AdmissionTicket:
+    """Slot alır; kabul edilmezse Retry-After başlıklı 429 / 503 döner."""
+    try:
+        return await controller.acquire(user_id)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail,
+                            headers={"Retry-After": str(e.retry_after)})
+
+
+def parse_json_frame(text: Optional[str]) -> Optional[dict]:
+    """WebSocket metin frame'ini JSON nesnesi olarak çözer; geçersizse None döner."""
+    if text is None:
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
 @app.post("/register")
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    return auth.register_user(db, user)
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    return await auth.register_user(db, user)
 
 
 @app.post("/token")
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    return auth.login_user(db, user)
+async def login(user: UserLogin, db: AsyncSession = Depends(get_db)):
+    return await auth.login_user(db, user)
 
 
 @app.get("/me")
-def read_users_me(current_user: models.User = Depends(get_current_user)):
+def read_users_me(current_user: auth.UserSnapshot = Depends(get_current_user)):
     return {
         "email": current_user.email,
         "full_name": current_user.full_name,
@@ -113,70 +386,236 @@ def read_users_me(current_user: models.User = Depends(get_current_user)):
 @app.post("/upload-doc")
 async def upload_document(
         file: UploadFile = File(...),
-        current_user: models.User = Depends(get_current_user)
+        current_user: auth.UserSnapshot = Depends(get_current_user)
 ):
-    file_location = os.path.join("uploads", f"{current_user.id}_{file.filename}")
-    try:
+    """
+    Dosyayı kaydeder ve işleme işini arka planda başlatır; iş kimliği hemen döner.
+    İlerleme GET /upload-doc/{job_id} ile takip edilir.
+    """
+    filename = os.path.basename(file.filename)
+    # Aynı isimli eşzamanlı yüklemeler birbirinin dosyasını ezmesin
+    file_location = os.path.join("uploads", f"{current_user.id}_{uuid.uuid4().hex}_{filename}")
+
+    def save():
         with open(file_location, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
 
-        result = await rag_pipeline.process_document_async(current_user.id, file_location)
-        return result
-    finally:
-        if os.path.exists(file_location):
-            os.remove(file_location)
+    await asyncio.to_thread(save)
+    # Dosya iş bitince (başarılı veya hatalı) silinir
+    job = ingestion_jobs.submit(current_user.id, file_location, filename)
+    return {"status": job.status, "job_id": job.id, "filename": filename}
+
+
+@app.get("/upload-doc/{job_id}")
+def read_upload_status(job_id: str, current_user: auth.UserSnapshot = Depends(get_current_user)):
+    """Yükleme işinin durumu: işlenen sayfa/parça sayısı ve varsa hata."""
+    job = ingestion_jobs.get(job_id)
+    if job is None or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 
 @app.put("/update-persona")
-def update_persona(data: PersonaUpdate, db: Session = Depends(get_db),
-                   current_user: models.User = Depends(get_current_user)):
-    current_user.system_prompt = data.system_prompt
-    db.commit()
+async def update_persona(data: PersonaUpdate, db: AsyncSession = Depends(get_db),
+                         current_user: auth.UserSnapshot = Depends(get_current_user)):
+    user = await db.get(models.User, current_user.id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    user.system_prompt = data.system_prompt
+    await db.commit()
+    # Önbellekteki kopyalar eski persona'yı taşımasın
+    if auth_cache:
+        auth_cache.invalidate_user(current_user.id)
+    if answer_cache:
+        answer_cache.invalidate_user(current_user.id)
     return {"msg": "Persona updated"}
 
 
 @app.post("/transcribe")
 async def transcribe_audio(
         file: UploadFile = File(...),
-        current_user: models.User = Depends(get_current_user)
+        current_user: auth.UserSnapshot = Depends(get_current_user)
 ):
     """
     Frontend'den gelen ses dosyasını okur ve Fal.ai STT servisine
     Data URI formatında göndererek transkripsiyonu alır.
     """
+    ticket = await admit(stt_admission, current_user.id)
     try:
         # Dosya içeriğini byte olarak oku
         audio_bytes = await file.read()
 
         # Fal.ai servisine gönder
-        text = await stt_service.transcribe(audio_bytes)
+        text = await stt_admission.run(ticket, stt_service.transcribe(audio_bytes))
 
         if not text:
-            # Hata detayını loglarda görebiliriz, frontend'e genel hata dön
-            raise HTTPException(status_code=500, detail="Transcription failed (Empty result)")
+            # Sessiz/çok kısa parça (filtre tarafından atlandı) veya boş transkripsiyon: hata değil
+            return {"text": ""}
 
+        # Kullanıcı konuşmaya devam ederken bağlam araması arka planda başlar
+        if prefetcher:
+            prefetcher.observe_fragment(current_user.id, text)
         return {"text": text}
+    except HTTPException:
+        raise
+    except DeadlineExceeded:
+        raise HTTPException(status_code=504, detail="Transcription timed out")
     except Exception as e:
         print(f"Transcribe Endpoint Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        ticket.release()
+
+
+@app.websocket("/ws/transcribe")
+async def transcribe_ws(websocket: WebSocket, token: str = Query(...)):
+    """
+    Kalıcı akışlı STT oturumu (2 saniyelik POST /transcribe yüklemelerinin yerine).
+    İstemci: 16 kHz mono PCM16 binary frame'ler, bitirirken {"type": "stop"} metin frame'i.
+    Sunucu: {"type": "partial" | "final", "seq", "text"} ve stop sonrası {"type": "done"}.
+    Kimlik doğrulama bağlantı başına bir kez yapılır.
+    """
+    try:
+        user = await auth.get_user_snapshot(token, AsyncSessionLocal, auth_cache)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    session = StreamingSTTSession(
+        stt_service,
+        send=websocket.send_json,
+        segmenter=SpeechSegmenter(
+            sample_rate=int(websocket.query_params.get("sample_rate", "16000")),
+            silence_ms=int(os.getenv("STT_SILENCE_MS", "600")),
+            max_segment_seconds=float(os.getenv("STT_MAX_SEGMENT_SECONDS", "15")),
+            vad=EnergyVAD(min_threshold=float(os.getenv("VAD_MIN_RMS", "300"))),
+        ),
+        max_concurrency=int(os.getenv("STT_SESSION_CONCURRENCY", "2")),
+        partial_interval_seconds=float(os.getenv("STT_PARTIAL_INTERVAL", "2.5")),
+        on_transcript=partial(prefetcher.observe, user.id) if prefetcher else None,
+        admission=stt_admission,
+        user_id=user.id,
+        opus_bitrate=os.getenv("VAD_OPUS_BITRATE", "24k"),
+    )
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                await session.feed(message["bytes"])
+            elif message.get("text"):
+                control = parse_json_frame(message["text"])
+                if control is None:
+                    await websocket.send_json({"type": "error", "data": {"detail": "invalid_json"}})
+                    continue
+                if control.get("type") == "stop":
+                    await session.flush()
+                    await websocket.send_json({"type": "done", **session.stats()})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await session.close()
 
 
 @app.post("/chat/stream")
 async def chat_stream(
         request: ChatRequest,
-        current_user: models.User = Depends(get_current_user)
+        current_user: auth.UserSnapshot = Depends(get_current_user)
 ):
     """
     SSE ile LLM cevabını ve TTS sesini akıtır.
+    Sunucu doluysa akış başlamadan 429 / 503 (Retry-After) döner.
     """
-    return StreamingResponse(
-        orchestrator.stream_chat(
+    ticket = await admit(chat_admission, current_user.id)
+
+    async def events():
+        stream = orchestrator.stream_chat(
             user_id=current_user.id,
             user_message=request.message,
-            system_prompt=current_user.system_prompt
-        ),
-        media_type="text/event-stream"
-    )
+            system_prompt=current_user.system_prompt,
+            bypass_cache=request.bypass_cache,
+            session_id=request.session_id
+        )
+        try:
+            async for event in chat_admission.guard_stream(ticket, stream):
+                yield event
+        except DeadlineExceeded:
+            yield f"data: {json.dumps({'type': 'error', 'data': 'deadline_exceeded'})}\n\n"
+            yield f"data: {json.dumps({'type': 'status', 'data': 'done'})}\n\n"
+
+    return AdmittedStreamingResponse(ticket, events(), media_type="text/event-stream")
+
+
+@app.websocket("/ws/chat")
+async def chat_ws(websocket: WebSocket, token: str = Query(...)):
+    """
+    SSE'ye alternatif ikili (binary) taşıma.
+    İstemci: {"message": "..."} metin frame'i gönderir.
+    Sunucu: kontrol olayları ({"type", "data"}) metin frame'i, ses ise ham binary frame olarak gelir;
+    her cümlenin sesi {"type": "audio_end", "data": {"seq": n}} ile kapanır.
+    """
+    # Tarayıcı WebSocket'inde header gönderilemediği için token query parametresinden okunur
+    try:
+        current_user = await auth.get_user_snapshot(token, AsyncSessionLocal, auth_cache)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    try:
+        while True:
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                break
+            request = parse_json_frame(frame.get("text"))
+            if request is None:
+                # Bozuk frame bağlantıyı düşürmez; istemci hatayı görüp tekrar gönderebilir
+                await websocket.send_json({"type": "error", "data": {"detail": "invalid_json"}})
+                continue
+            message = str(request.get("message") or "").strip()
+            if not message:
+                continue
+
+            # Persona bağlantı açıkken değişmiş olabilir (bağlantı boyunca DB oturumu tutulmaz)
+            async with AsyncSessionLocal() as db:
+                user = await db.get(models.User, current_user.id)
+            if user is not None:
+                current_user = auth.UserSnapshot.from_model(user)
+
+            try:
+                ticket = await chat_admission.acquire(current_user.id)
+            except AdmissionRejected as e:
+                await websocket.send_json({"type": "error", "data": {
+                    "status": e.status_code, "detail": e.detail, "retry_after": e.retry_after}})
+                await websocket.send_json({"type": "status", "data": "done"})
+                continue
+
+            events = orchestrator.chat_events(
+                user_id=current_user.id,
+                user_message=message,
+                system_prompt=current_user.system_prompt,
+                bypass_cache=bool(request.get("bypass_cache", False)),
+                session_id=request.get("session_id")
+            )
+            guarded = chat_admission.guard_stream(ticket, events)
+            try:
+                async for event_type, data in guarded:
+                    if event_type == "audio":
+                        await websocket.send_bytes(data[1])
+                    else:
+                        await websocket.send_text(json.dumps({"type": event_type, "data": data}, ensure_ascii=False))
+            except DeadlineExceeded:
+                await websocket.send_json({"type": "error", "data": {"detail": "deadline_exceeded"}})
+                await websocket.send_json({"type": "status", "data": "done"})
+            finally:
+                # Gönderim sırasında bağlantı koparsa akış (ve yarım TTS işleri) burada kapatılır;
+                # akış hiç başlamadıysa slot doğrudan bırakılır
+                await guarded.aclose()
+                ticket.release()
+    except WebSocketDisconnect:
+        pass
 
 
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
 # voice_ai_backend/models.py
-from sqlalchemy import Column, Integer, String, Text
+from datetime import datetime
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy.orm import relationship
 from database import Base
 
 class User(Base):
@@ -10,4 +12,34 @@ class User(Base):
     full_name = Column(String)
     hashed_password = Column(String)
     # YENİ: AI'nın nasıl davranacağını belirleyen özel talimat (Persona)
-    system_prompt = Column(Text, default="You are a helpful AI assistant.")
\ No newline at end of file
+    system_prompt = Column(Text, default="You are a helpful AI assistant.")
+
+
+class ConversationTurn(Base):
+    """Bir soru-cevap turu (sohbet geçmişi ve gecikme analizi için)."""
+    __tablename__ = "conversation_turns"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    # İstemcinin gönderdiği oturum kimliği (yoksa None)
+    session_id = Column(String, index=True)
+    user_message = Column(Text, nullable=False)
+    assistant_message = Column(Text, nullable=False, default="")
+    # Cevap önbellekten mi geldi
+    cached = Column(Boolean, nullable=False, default=False)
+    sources_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    timings = relationship("TurnTiming", back_populates="turn", cascade="all, delete-orphan")
+
+
+class TurnTiming(Base):
+    """Bir turun aşama süreleri (retrieval, llm_first_token, first_audio, total ...)."""
+    __tablename__ = "turn_timings"
+
+    id = Column(Integer, primary_key=True)
+    turn_id = Column(Integer, ForeignKey("conversation_turns.id", ondelete="CASCADE"), index=True, nullable=False)
+    stage = Column(String, nullable=False)
+    duration_ms = Column(Float, nullable=False)
+
+    turn = relationship("ConversationTurn", back_populates="timings")
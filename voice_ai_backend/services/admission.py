@@ -0,0 +1,218 @@
+# voice_ai_backend/services/admission.py
+import asyncio
+import math
+import time
+from collections import deque
+from typing import AsyncGenerator, Deque, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class AdmissionRejected(Exception):
+    """İstek kabul edilmedi; HTTP katmanı status_code ve Retry-After ile cevap döner."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """Kabul edilen istek kendisine ayrılan toplam süreyi aştı."""
+
+
+class AdmissionTicket:
+    """Kabul edilmiş bir isteğin slotu; iş bitince release ile bırakılmalıdır."""
+
+    def __init__(self, controller: "AdmissionController", user_id: int, deadline: Optional[float]):
+        self.controller = controller
+        self.user_id = user_id
+        self.deadline = deadline
+        self.started_at = time.monotonic()
+        self.released = False
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.controller._release(self)
+
+
+class AdmissionController:
+    """
+    Pahalı uç noktalar (LLM + TTS, STT) için kabul kontrolü ve geri basınç.
+
+    Aynı anda en fazla max_concurrent istek çalışır; fazlası sınırlı bir FIFO kuyrukta
+    bekler. Kuyruk doluysa veya bekleme queue_timeout_seconds'ı aşarsa istek hemen 503
+    ile reddedilir; kullanıcı kendi eşzamanlı istek sınırını (çalışan + bekleyen) aşarsa
+    429 döner. Böylece ani yük upstream'leri boğup herkesin gecikmesini birlikte
+    bozmaz; Retry-After ortalama servis süresinden tahmin edilir.
+    """
+
+    def __init__(self, name: str, max_concurrent: int = 8, max_per_user: int = 2, max_queue: int = 16,
+                 queue_timeout_seconds: float = 5.0, deadline_seconds: Optional[float] = None,
+                 wait_window: int = 200):
+        """
+        Args:
+            name (str): Log ve metriklerde görünen isim.
+            max_concurrent (int): Aynı anda çalışabilecek istek sayısı.
+            max_per_user (int): Bir kullanıcının aynı anda çalışan + bekleyen istek sınırı (0 ise sınırsız).
+            max_queue (int): Slot bekleyebilecek en fazla istek (0 ise kuyruk yok, doluysa hemen reddedilir).
+            queue_timeout_seconds (float): Kuyrukta en fazla bekleme süresi.
+            deadline_seconds (float): Kabul edilen isteğin toplam süre sınırı (None ise sınırsız).
+        """
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_per_user = max_per_user
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.deadline_seconds = deadline_seconds
+
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._per_user: Dict[int, int] = {}
+
+        # Metrikler
+        self.admitted = 0
+        self.rejected_user_limit = 0
+        self.rejected_queue_full = 0
+        self.queue_timeouts = 0
+        self.deadline_exceeded = 0
+        self.max_queue_depth = 0
+        self._waits: Deque[float] = deque(maxlen=wait_window)
+        self._service_times: Deque[float] = deque(maxlen=wait_window)
+
+    async def acquire(self, user_id: int) -> AdmissionTicket:
+        """Slot alır; gerekirse kuyrukta bekler. Kabul edilmezse AdmissionRejected fırlatır."""
+        if self.max_per_user and self._per_user.get(user_id, 0) >= self.max_per_user:
+            self.rejected_user_limit += 1
+            raise AdmissionRejected(429, "Too many concurrent requests for this user", self._retry_after())
+
+        started = time.monotonic()
+        if self._active >= self.max_concurrent or self._waiters:
+            if len(self._waiters) >= self.max_queue:
+                self.rejected_queue_full += 1
+                print(f"⚠️ [Admission:{self.name}] Kuyruk dolu, istek reddedildi (user {user_id})")
+                raise AdmissionRejected(503, "Server is busy, please retry", self._retry_after())
+
+            self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+            try:
+                # Slot, release sırasında doğrudan bu isteğe devredilir (_active artırılmış gelir)
+                await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout_seconds)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if waiter.done() and not waiter.cancelled():
+                    # Zaman aşımıyla aynı anda slot devredildi: slotu geri ver
+                    self._active -= 1
+                    self._wake_next()
+                else:
+                    waiter.cancel()
+                    self._remove_waiter(waiter)
+                self._decrement_user(user_id)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                self.queue_timeouts += 1
+                raise AdmissionRejected(503, "Server is busy, please retry", self._retry_after())
+        else:
+            self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+            self._active += 1
+
+        self._waits.append(time.monotonic() - started)
+        self.admitted += 1
+        deadline = time.monotonic() + self.deadline_seconds if self.deadline_seconds else None
+        return AdmissionTicket(self, user_id, deadline)
+
+    async def guard_stream(self, ticket: AdmissionTicket, stream: AsyncGenerator[T, None]) -> AsyncGenerator[T, None]:
+        """
+        Akışı bilet süresiyle sınırlar ve bitince (normal, hata veya istemci kopması) slotu bırakır.
+        Süre dolarsa DeadlineExceeded fırlatır.
+        """
+        try:
+            while True:
+                remaining = ticket.remaining()
+                try:
+                    if remaining is None:
+                        item = await stream.__anext__()
+                    else:
+                        item = await asyncio.wait_for(stream.__anext__(), remaining)
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    self.deadline_exceeded += 1
+                    print(f"⏱️ [Admission:{self.name}] İstek süresi aşıldı (user {ticket.user_id})")
+                    raise DeadlineExceeded()
+                yield item
+        finally:
+            ticket.release()
+            await stream.aclose()
+
+    async def run(self, ticket: AdmissionTicket, awaitable):
+        """Tek seferlik bir işi bilet süresiyle çalıştırır ve slotu bırakır."""
+        try:
+            remaining = ticket.remaining()
+            try:
+                return await asyncio.wait_for(awaitable, remaining)
+            except asyncio.TimeoutError:
+                self.deadline_exceeded += 1
+                print(f"⏱️ [Admission:{self.name}] İstek süresi aşıldı (user {ticket.user_id})")
+                raise DeadlineExceeded()
+        finally:
+            ticket.release()
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+        return {
+            "active": self._active,
+            "queued": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "rejected_user_limit": self.rejected_user_limit,
+            "rejected_queue_full": self.rejected_queue_full,
+            "queue_timeouts": self.queue_timeouts,
+            "deadline_exceeded": self.deadline_exceeded,
+            "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+            "p95_wait_ms": round(waits[math.ceil(len(waits) * 0.95) - 1] * 1000, 1) if waits else 0.0,
+        }
+
+    # --- İç işleyiş ---
+    def _release(self, ticket: AdmissionTicket) -> None:
+        self._service_times.append(time.monotonic() - ticket.started_at)
+        self._decrement_user(ticket.user_id)
+        self._active -= 1
+        self._wake_next()
+
+    def _wake_next(self) -> None:
+        while self._waiters and self._active < self.max_concurrent:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._active += 1
+            waiter.set_result(None)
+
+    def _remove_waiter(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _decrement_user(self, user_id: int) -> None:
+        count = self._per_user.get(user_id, 0) - 1
+        if count > 0:
+            self._per_user[user_id] = count
+        else:
+            self._per_user.pop(user_id, None)
+
+    def _retry_after(self) -> int:
+        """Kuyruğun erimesi için tahmini süre (saniye)."""
+        service_time = sum(self._service_times) / len(self._service_times) if self._service_times else 1.0
+        waves = (len(self._waiters) + 1) / self.max_concurrent
+        return max(1, math.ceil(service_time * waves))
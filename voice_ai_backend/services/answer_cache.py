@@ -0,0 +1,112 @@
+# voice_ai_backend/services/answer_cache.py
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+from services.rag.cache import LRUCache
+
+
+class SemanticAnswerCache:
+    """
+    Tekrarlanan sorular için LLM cevap önbelleği (kullanıcı bazlı).
+
+    Bir kayıt; sistem prompt'u, getirilen parça kimlikleri kümesi aynıysa ve sorgu
+    embedding'i eşik değerinden daha benzerse (kosinüs) yeniden kullanılır.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.92, ttl_seconds: float = 3600.0,
+                 max_entries_per_user: int = 256, max_users: int = 10000):
+        """
+        Args:
+            similarity_threshold (float): Önbellekten cevap vermek için gereken minimum kosinüs benzerliği.
+            ttl_seconds (float): Bir cevabın geçerli kalacağı süre.
+            max_entries_per_user (int): Kullanıcı başına tutulacak en fazla kayıt (en eskisi silinir).
+            max_users (int): Önbelleği tutulacak en fazla kullanıcı (en uzun süredir kullanılmayan silinir).
+        """
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries_per_user = max_entries_per_user
+
+        # kullanıcı -> OrderedDict[kayıt kimliği, kayıt]
+        self._entries = LRUCache(max_entries=max_users)
+        self._next_id = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _context_key(system_prompt: str, chunk_ids: Iterable[str]) -> str:
+        raw = system_prompt + "\x1f" + "\x1e".join(sorted(set(chunk_ids)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> List[float]:
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def lookup(self, user_id: int, system_prompt: str, chunk_ids: Iterable[str],
+               query_embedding: List[float]) -> Optional[str]:
+        """Eşleşen ve süresi dolmamış en benzer cevabı döner."""
+        entries = self._entries.get(user_id)
+        if not entries:
+            self.misses += 1
+            return None
+
+        context_key = self._context_key(system_prompt, chunk_ids)
+        query_vec = self._normalize(query_embedding)
+        now = time.monotonic()
+
+        best_id, best_score = None, self.similarity_threshold
+        for entry_id, entry in list(entries.items()):
+            if now - entry["created_at"] > self.ttl_seconds:
+                del entries[entry_id]
+                continue
+            if entry["context_key"] != context_key:
+                continue
+            score = sum(a * b for a, b in zip(query_vec, entry["embedding"]))
+            if score >= best_score:
+                best_id, best_score = entry_id, score
+
+        if best_id is None:
+            self.misses += 1
+            return None
+
+        entries.move_to_end(best_id)
+        self.hits += 1
+        return entries[best_id]["answer"]
+
+    def store(self, user_id: int, system_prompt: str, chunk_ids: Iterable[str],
+              query_embedding: List[float], answer: str) -> None:
+        entries = self._entries.get(user_id)
+        if entries is None:
+            entries = OrderedDict()
+            self._entries.put(user_id, entries)
+        entries[self._next_id] = {
+            "context_key": self._context_key(system_prompt, chunk_ids),
+            "embedding": self._normalize(query_embedding),
+            "answer": answer,
+            "created_at": time.monotonic(),
+        }
+        self._next_id += 1
+        while len(entries) > self.max_entries_per_user:
+            entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Doküman yüklendiğinde veya persona değiştiğinde kullanıcının tüm cevaplarını siler."""
+        if self._entries.pop(user_id) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        users = self._entries.values()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "users": len(users),
+            "entries": sum(len(e) for e in users),
+        }
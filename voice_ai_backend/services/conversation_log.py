@@ -0,0 +1,94 @@
+# voice_ai_backend/services/conversation_log.py
+import asyncio
+from typing import Dict, List, Optional
+
+import models
+
+
+class ConversationRecorder:
+    """
+    Sohbet turlarını ve aşama sürelerini arka planda, toplu olarak veritabanına yazar.
+
+    record() beklemez: tur kuyruğa eklenir ve tek bir yazıcı görev birden fazla turu tek
+    transaction'da kaydeder. Böylece cevap akışı SQLite yazmasını beklemez; kuyruk
+    doluysa (DB yavaş) kayıt atlanır.
+    """
+
+    def __init__(self, session_factory, max_pending: int = 1000, batch_size: int = 50):
+        """
+        Args:
+            session_factory: AsyncSession üreten fabrika (database.AsyncSessionLocal).
+            max_pending (int): Yazılmayı bekleyebilecek en fazla tur.
+            batch_size (int): Tek transaction'da yazılacak en fazla tur.
+        """
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._writer: Optional[asyncio.Task] = None
+
+        # Metrikler
+        self.recorded = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def record(self, user_id: int, session_id: Optional[str], user_message: str, assistant_message: str,
+               timings: Dict[str, float], cached: bool = False, sources_count: int = 0) -> None:
+        """Turu kaydetmek üzere kuyruğa ekler (timings: aşama -> milisaniye)."""
+        turn = models.ConversationTurn(
+            user_id=user_id,
+            session_id=session_id,
+            user_message=user_message,
+            assistant_message=assistant_message,
+            cached=cached,
+            sources_count=sources_count,
+            timings=[models.TurnTiming(stage=stage, duration_ms=round(ms, 1)) for stage, ms in timings.items()],
+        )
+        try:
+            self._queue.put_nowait(turn)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def start(self) -> None:
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+
+    async def aclose(self) -> None:
+        """Kuyrukta kalan turları yazıp yazıcıyı durdurur (lifespan kapanışı)."""
+        if self._writer is None:
+            return
+        self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
+        self._writer = None
+        while not self._queue.empty():
+            await self._write(self._take_batch([]))
+
+    def stats(self) -> dict:
+        return {
+            "recorded": self.recorded,
+            "pending": self._queue.qsize(),
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    # --- İç işleyiş ---
+    def _take_batch(self, batch: List[models.ConversationTurn]) -> List[models.ConversationTurn]:
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _write_loop(self) -> None:
+        while True:
+            first = await self._queue.get()
+            await self._write(self._take_batch([first]))
+
+    async def _write(self, batch: List[models.ConversationTurn]) -> None:
+        if not batch:
+            return
+        try:
+            async with self.session_factory() as db:
+                db.add_all(batch)
+                await db.commit()
+            self.recorded += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"⚠️ [ConversationLog] {len(batch)} tur kaydedilemedi: {e}")
@@ -0,0 +1,194 @@
+# voice_ai_backend/services/llm_pool.py
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, List, Optional, Set
+from urllib.parse import urljoin
+
+from core.http_client import HTTPClientPool
+
+# Devre kesici durumları
+CLOSED = "closed"        # Normal: istek alır
+OPEN = "open"            # Art arda hata: open_seconds boyunca istek almaz
+HALF_OPEN = "half_open"  # Süre doldu: tek bir deneme isteği alır
+
+
+class LLMEndpoint:
+    """Tek bir üretim (generate) sunucusunun durumu ve sayaçları."""
+
+    def __init__(self, url: str, latency_window: int = 100):
+        self.url = url
+        self.state = CLOSED
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        # None: henüz bilinmiyor, False: sunucu akışı desteklemiyor
+        self.streaming_supported: Optional[bool] = None
+
+        # Metrikler (gecikme: ilk token'a kadar geçen süre)
+        self.requests = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.latencies: Deque[float] = deque(maxlen=latency_window)
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "url": self.url,
+            "state": self.state,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "consecutive_failures": self.consecutive_failures,
+            "avg_first_token_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+            "p95_first_token_ms": round(latencies[math.ceil(len(latencies) * 0.95) - 1] * 1000, 1) if latencies else None,
+            "last_error": self.last_error,
+        }
+
+
+class LLMEndpointPool:
+    """
+    Birden fazla LLM üretim sunucusu arasında yük dağıtımı.
+
+    En az bekleyen isteği olan sağlıklı sunucu seçilir (eşitlikte ortalama gecikmesi düşük
+    olan). Art arda hata veren sunucunun devresi açılır ve bir süre istek almaz; süre
+    dolunca tek bir deneme isteğiyle (veya sağlık kontrolüyle) geri alınır. Arka planda
+    periyodik sağlık kontrolleri yapılır.
+    """
+
+    def __init__(self, urls: List[str], http: Optional[HTTPClientPool] = None, failure_threshold: int = 3,
+                 open_seconds: float = 30.0, probe_interval_seconds: float = 10.0, probe_path: str = "/health"):
+        """
+        Args:
+            failure_threshold (int): Devrenin açılması için art arda hata sayısı.
+            open_seconds (float): Açık devrenin yeniden denenmeden önce bekleyeceği süre.
+            probe_interval_seconds (float): Sağlık kontrolü aralığı (0 ise kapalı).
+            probe_path (str): Sağlık kontrolü yolu (sunucu köküne göre). 5xx dışındaki her
+                HTTP cevabı sunucunun ayakta olduğu kabul edilir.
+        """
+        if not urls:
+            raise ValueError("En az bir LLM sunucusu tanımlanmalı")
+        self.endpoints = [LLMEndpoint(url) for url in urls]
+        self.http = http or HTTPClientPool()
+        self.http.ensure("llm_probe", timeout=3.0)
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.probe_interval_seconds = probe_interval_seconds
+        self.probe_path = probe_path
+        self._probe_task: Optional[asyncio.Task] = None
+
+        # Hedge metrikleri
+        self.hedges_started = 0
+        self.hedges_won = 0
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def acquire(self, exclude: Optional[Set[str]] = None) -> Optional[LLMEndpoint]:
+        """
+        İstek için sunucu seçer ve bekleyen istek sayısını artırır (release ile azaltılmalı).
+        Uygun sunucu yoksa None döner.
+        """
+        now = time.monotonic()
+        candidates = []
+        for endpoint in self.endpoints:
+            if exclude and endpoint.url in exclude:
+                continue
+            if endpoint.state == OPEN and now - endpoint.opened_at >= self.open_seconds:
+                endpoint.state = HALF_OPEN
+            if endpoint.state == OPEN or (endpoint.state == HALF_OPEN and endpoint.trial_in_flight):
+                continue
+            candidates.append(endpoint)
+
+        if not candidates:
+            # Hepsi açık: en uzun süredir açık olan süresi dolmadan yarı açığa alınıp tek bir deneme
+            # isteği alır (tamamen durmaktansa). Deneme sürerken gelen istekler hemen başarısız olur.
+            fallback = [e for e in self.endpoints
+                        if not (exclude and e.url in exclude) and not (e.state == HALF_OPEN and e.trial_in_flight)]
+            if not fallback:
+                return None
+            endpoint = min(fallback, key=lambda e: e.opened_at)
+            endpoint.state = HALF_OPEN
+            candidates = [endpoint]
+
+        endpoint = min(candidates, key=lambda e: (e.outstanding, self._avg_latency(e)))
+        if endpoint.state == HALF_OPEN:
+            endpoint.trial_in_flight = True
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+        return endpoint
+
+    def release(self, endpoint: LLMEndpoint) -> None:
+        endpoint.outstanding = max(0, endpoint.outstanding - 1)
+        # Deneme isteği sonuç vermeden bitti (hedge kaybedeni iptal edildi, istemci koptu):
+        # devre yarı açık kalır ve bir sonraki istek yeniden deneme yapabilir
+        if endpoint.state == HALF_OPEN:
+            endpoint.trial_in_flight = False
+
+    def record_success(self, endpoint: LLMEndpoint, latency: Optional[float] = None) -> None:
+        if latency is not None:
+            endpoint.latencies.append(latency)
+        endpoint.consecutive_failures = 0
+        endpoint.trial_in_flight = False
+        if endpoint.state != CLOSED:
+            print(f"✅ [LLMPool] Sunucu tekrar devrede: {endpoint.url}")
+        endpoint.state = CLOSED
+
+    def record_failure(self, endpoint: LLMEndpoint, error: str) -> None:
+        endpoint.errors += 1
+        endpoint.last_error = error[:200]
+        endpoint.consecutive_failures += 1
+        endpoint.trial_in_flight = False
+        if endpoint.state == HALF_OPEN or endpoint.consecutive_failures >= self.failure_threshold:
+            if endpoint.state != OPEN:
+                print(f"⚠️ [LLMPool] Devre açıldı: {endpoint.url} ({endpoint.last_error})")
+            endpoint.state = OPEN
+            endpoint.opened_at = time.monotonic()
+
+    async def start(self) -> None:
+        """Periyodik sağlık kontrolünü başlatır (lifespan başlangıcı)."""
+        if self.probe_interval_seconds > 0 and self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def aclose(self) -> None:
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            await asyncio.gather(self._probe_task, return_exceptions=True)
+            self._probe_task = None
+
+    def stats(self) -> dict:
+        return {
+            "endpoints": [endpoint.stats() for endpoint in self.endpoints],
+            "hedges_started": self.hedges_started,
+            "hedges_won": self.hedges_won,
+        }
+
+    # --- İç işleyiş ---
+    @staticmethod
+    def _avg_latency(endpoint: LLMEndpoint) -> float:
+        latencies = endpoint.latencies
+        return sum(latencies) / len(latencies) if latencies else 0.0
+
+    async def _probe_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.probe_interval_seconds)
+            await asyncio.gather(*(self._probe(endpoint) for endpoint in self.endpoints))
+
+    async def _probe(self, endpoint: LLMEndpoint) -> None:
+        # Trafik alan kapalı devreli sunucular zaten gerçek isteklerle izleniyor
+        if endpoint.state == CLOSED and endpoint.outstanding:
+            return
+        try:
+            response = await self.http.get("llm_probe").get(urljoin(endpoint.url, self.probe_path))
+            if response.status_code >= 500:
+                raise RuntimeError(f"Sağlık kontrolü: {response.status_code}")
+        except Exception as e:
+            if endpoint.state == CLOSED:
+                self.record_failure(endpoint, f"Sağlık kontrolü başarısız: {e}")
+            return
+
+        # Açık devre: sunucu ayağa kalkmış, deneme isteğini beklemeden geri al
+        if endpoint.state != CLOSED or endpoint.consecutive_failures:
+            self.record_success(endpoint)
@@ -1,14 +1,123 @@
 # voice_ai_backend/services/llm_service.py
+import asyncio
 import json
-import httpx
 import re
-from typing import AsyncGenerator
+import time
+from typing import AsyncGenerator, Dict, Optional, Set
+import httpx
 from core.interfaces import ILLMService
+from core.http_client import HTTPClientPool
+from services.llm_pool import LLMEndpoint, LLMEndpointPool
+from services.memory import ConversationHistory
+
+EMPTY_RESPONSE_MESSAGE = "Üzgünüm, geçerli bir cevap oluşturulamadı."
+ERROR_PREFIX = "❌ [LLM Hata]"
+CONNECTION_ERROR_PREFIX = "Bağlantı Hatası"
+
+
+def is_valid_answer(text: str) -> bool:
+    """Cevabın gerçek bir model çıktısı olup olmadığını (hata / boş cevap mesajı değil) kontrol eder."""
+    text = text.strip()
+    return bool(text) and text != EMPTY_RESPONSE_MESSAGE and not text.startswith((ERROR_PREFIX, CONNECTION_ERROR_PREFIX))
+
+
+def build_prompt(system_prompt: str, user_query: str, context: str = "",
+                 history: Optional[ConversationHistory] = None) -> str:
+    """
+    Prompt'u turlar arasında değişmeyen kısımlar başta olacak şekilde dizer:
+    talimat -> konuşma özeti -> geçmiş turlar -> bağlam -> soru. Talimat ve geçmiş bir
+    sonraki turda aynen tekrar ettiği için ön ek önbelleği (prefix caching) yapan sunucu
+    bu kısmın KV önbelleğini yeniden kullanır; her turda değişen bağlam ve soru en sondadır.
+    """
+    sections = [f"[TALİMAT]: {system_prompt}"]
+    if history and history.summary:
+        sections.append(f"[KONUŞMA ÖZETİ]:\n{history.summary}")
+    if history and history.turns:
+        lines = []
+        for user_message, answer in history.turns:
+            lines.append(f"Kullanıcı: {user_message}")
+            lines.append(f"Asistan: {answer}")
+        sections.append("[KONUŞMA GEÇMİŞİ]:\n" + "\n".join(lines))
+    sections.append(f"[BAĞLAM BİLGİSİ]:\n{context}")
+    sections.append(f"[KULLANICI SORUSU]:\n{user_query}")
+    return "\n\n".join(sections) + "\n"
+
+
+class ThinkTagFilter:
+    """
+    Akış halindeki metinden <think>...</think> bloklarını parça sınırlarından bağımsız olarak siler.
+    Bir etiketin yarısı parçanın sonunda kalırsa bir sonraki parçaya kadar bekletilir.
+    """
+
+    OPEN_TAG = "<think>"
+    CLOSE_TAG = "</think>"
+
+    def __init__(self):
+        self._buffer = ""
+        self._inside = False
+
+    def feed(self, text: str) -> str:
+        """Yeni parçayı işler ve güvenle gönderilebilecek metni döner."""
+        self._buffer += text
+        output = []
+
+        while self._buffer:
+            tag = self.CLOSE_TAG if self._inside else self.OPEN_TAG
+            idx = self._buffer.find(tag)
+            if idx >= 0:
+                if not self._inside:
+                    output.append(self._buffer[:idx])
+                self._buffer = self._buffer[idx + len(tag):]
+                self._inside = not self._inside
+                continue
+
+            # Sondaki olası yarım etiketi (örn. "<thi") sakla, gerisini işle
+            keep = self._partial_tag_length(self._buffer, tag)
+            if not self._inside:
+                output.append(self._buffer[:len(self._buffer) - keep])
+            self._buffer = self._buffer[len(self._buffer) - keep:]
+            break
+
+        return "".join(output)
+
+    def flush(self) -> str:
+        """Akış bittiğinde kalan metni döner (kapanmamış <think> bloğu atılır)."""
+        rest = "" if self._inside else self._buffer
+        self._buffer = ""
+        self._inside = False
+        return rest
+
+    @staticmethod
+    def _partial_tag_length(text: str, tag: str) -> int:
+        for size in range(min(len(text), len(tag) - 1), 0, -1):
+            if text.endswith(tag[:size]):
+                return size
+        return 0
+
+
+class LLMUpstreamError(Exception):
+    """Bir LLM sunucusunun cevap veremediği durum (mesaj kullanıcıya gösterilebilir formattadır)."""
 
 
 class CustomLLMService(ILLMService):
-    def __init__(self, api_url: str):
-        self.api_url = api_url
+    def __init__(self, api_url: Optional[str] = None, http: Optional[HTTPClientPool] = None, stream: bool = True,
+                 pool: Optional[LLMEndpointPool] = None, hedge_after_seconds: Optional[float] = None):
+        """
+        Args:
+            api_url (str): Tek sunucu kullanılacaksa üretim URL'i (pool verilmezse zorunlu).
+            stream (bool): True ise sunucudan akışlı cevap (SSE / NDJSON) istenir. Sunucu desteklemiyorsa
+                otomatik olarak tek parça JSON moduna düşülür.
+            pool (LLMEndpointPool): Birden fazla sunucu arasında yük dağıtımı / devre kesici.
+            hedge_after_seconds (float): İlk token bu sürede gelmezse isteğin bir kopyası başka bir
+                sunucuya da gönderilir; önce cevap veren kullanılır (None ise kapalı).
+        """
+        # Paylaşılan bağlantı havuzu (verilmezse servis kendi havuzunu kullanır)
+        self.http = http or HTTPClientPool()
+        self.http.ensure("llm", timeout=120.0)
+        self.pool = pool or LLMEndpointPool([api_url], http=self.http, probe_interval_seconds=0)
+        self.api_url = self.pool.endpoints[0].url
+        self.stream = stream
+        self.hedge_after_seconds = hedge_after_seconds
 
     def _clean_response(self, text: str) -> str:
         """
@@ -22,58 +131,246 @@ class CustomLLMService(ILLMService):
 
         return clean_text.strip()
 
-    async def generate_stream(self, system_prompt: str, user_query: str, context: str = "") -> AsyncGenerator[
-        str, None]:
+    async def generate_stream(self, system_prompt: str, user_query: str, context: str = "",
+                              history: Optional[ConversationHistory] = None) -> AsyncGenerator[str, None]:
         """
         Mihenk-14B (FastAPI) entegrasyonu.
-        Gelen cevabı temizler ve simüle edilmiş stream olarak döner.
-        """
-
-        full_prompt = f"""
-        [TALİMAT]: {system_prompt}
+        Sunucu akış destekliyorsa token'ları geldikçe, desteklemiyorsa temizlenmiş cevabı
+        kelime kelime (simüle edilmiş stream) döner.
 
-        [BAĞLAM BİLGİSİ]:
-        {context}
+        İstek havuzdan seçilen sunucuya gider. Sunucu token üretmeden hata verirse bir sonraki
+        sunucu denenir; hedge_after_seconds içinde ilk token gelmezse ikinci bir sunucuya da
+        gönderilir ve ilk token'ı üreten kazanır (diğeri iptal edilir).
 
-        [KULLANICI SORUSU]:
-        {user_query}
+        history verilirse önceki turlar (ve özetleri) prompt'un sabit ön ekine eklenir.
         """
 
+        full_prompt = build_prompt(system_prompt, user_query, context, history)
+
         payload = {
             "prompt": full_prompt
         }
 
-        print(f"📡 [LLM] İstek gönderiliyor: {self.api_url}")
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        attempts: Dict[int, asyncio.Task] = {}
+        tried: Set[str] = set()
+        winner: Optional[int] = None
+        last_error = f"{CONNECTION_ERROR_PREFIX}: Kullanılabilir LLM sunucusu yok"
+
+        def launch() -> bool:
+            endpoint = self.pool.acquire(exclude=tried)
+            if endpoint is None:
+                return False
+            tried.add(endpoint.url)
+            attempt_id = len(tried)
+            attempts[attempt_id] = asyncio.create_task(self._run_attempt(attempt_id, endpoint, payload, queue))
+            return True
+
+        launch()
+        hedge_at = None
+        if self.hedge_after_seconds is not None and len(self.pool) > 1:
+            hedge_at = loop.time() + self.hedge_after_seconds
+
+        try:
+            while attempts:
+                timeout = None
+                if winner is None and hedge_at is not None:
+                    timeout = max(0.0, hedge_at - loop.time())
+                try:
+                    attempt_id, kind, value = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    # İlk token gecikti: aynı isteği başka bir sunucuya da gönder
+                    hedge_at = None
+                    if launch():
+                        self.pool.hedges_started += 1
+                        print("⏱️ [LLM] İlk token gecikti, istek ikinci sunucuya da gönderildi.")
+                    continue
+
+                if winner is not None and attempt_id != winner:
+                    continue
+
+                if kind == "token":
+                    if winner is None:
+                        winner = attempt_id
+                        if attempt_id != 1:
+                            self.pool.hedges_won += 1
+                        # Kaybeden kopyalar iptal edilir
+                        for other_id, task in attempts.items():
+                            if other_id != winner:
+                                task.cancel()
+                    yield value
+                elif kind == "done":
+                    return
+                else:
+                    attempts.pop(attempt_id, None)
+                    if winner == attempt_id:
+                        # Cevap yarıda kesildi: kullanıcı metni gördüğü için başka sunucuya geçilmez
+                        yield value
+                        return
+                    last_error = value
+                    # Token üretmeden hata: sıradaki sunucuya geç (başka kopya çalışmıyorsa)
+                    if not attempts and not launch():
+                        break
+
+            yield last_error
+        finally:
+            for task in attempts.values():
+                task.cancel()
+
+    async def _run_attempt(self, attempt_id: int, endpoint: LLMEndpoint, payload: dict, queue: asyncio.Queue) -> None:
+        """Tek bir sunucuya yapılan denemenin çıktısını (attempt_id, tip, değer) olarak kuyruğa yazar."""
+        started = time.monotonic()
+        first = True
+        try:
+            async for text in self._generate_from(endpoint, dict(payload)):
+                if first:
+                    first = False
+                    self.pool.record_success(endpoint, time.monotonic() - started)
+                queue.put_nowait((attempt_id, "token", text))
+            queue.put_nowait((attempt_id, "done", None))
+        except asyncio.CancelledError:
+            raise
+        except LLMUpstreamError as e:
+            self.pool.record_failure(endpoint, str(e))
+            queue.put_nowait((attempt_id, "error", str(e)))
+        except Exception as e:
+            print(f"\n❌ [LLM Bağlantı Hatası]: {e}")
+            self.pool.record_failure(endpoint, str(e))
+            queue.put_nowait((attempt_id, "error", f"{CONNECTION_ERROR_PREFIX}: {str(e)}"))
+        finally:
+            self.pool.release(endpoint)
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            try:
-                response = await client.post(self.api_url, json=payload)
+    async def _generate_from(self, endpoint: LLMEndpoint, payload: dict) -> AsyncGenerator[str, None]:
+        """Tek bir sunucudan cevabı akıtır; sunucu hata verirse LLMUpstreamError fırlatır."""
+        use_stream = self.stream and endpoint.streaming_supported is not False
+        if use_stream:
+            payload["stream"] = True
 
+        print(f"📡 [LLM] İstek gönderiliyor: {endpoint.url} (stream={use_stream})")
+
+        client = self.http.get("llm")
+        async with client.stream("POST", endpoint.url, json=payload) as response:
+            # Sunucu 'stream' alanını tanımıyor olabilir: aynı istek akışsız denenir. Akış yalnızca
+            # akışsız deneme başarılı olursa kapatılır (gerçek bir 4xx akışı kalıcı kapatmasın).
+            if use_stream and response.status_code in (400, 404, 422):
+                stream_error = (await response.aread()).decode("utf-8", errors="replace")
+                print(f"⚠️ [LLM] Akışlı istek reddedildi ({response.status_code}): {stream_error[:200]} "
+                      f"- tek parça deneniyor.")
+                payload.pop("stream")
+                fallback = True
+            else:
+                fallback = False
+
+            if not fallback:
                 if response.status_code != 200:
-                    err = f"❌ [LLM Hata] Status: {response.status_code} - {response.text}"
+                    body = (await response.aread()).decode("utf-8", errors="replace")
+                    err = f"{ERROR_PREFIX} Status: {response.status_code} - {body}"
                     print(err)
-                    yield err
+                    raise LLMUpstreamError(err)
+
+                content_type = response.headers.get("content-type", "")
+                if "text/event-stream" in content_type or "ndjson" in content_type or "jsonl" in content_type:
+                    endpoint.streaming_supported = True
+                    async for text in self._stream_tokens(response, sse="text/event-stream" in content_type):
+                        yield text
                     return
 
-                # JSON cevabını al
-                data = response.json()
-                raw_text = data.get("response", "")
+                # Sunucu 'stream' alanını yok saydı: tek parça JSON
+                data = json.loads(await response.aread())
+                for word in self._simulate_stream(data):
+                    yield word
+                return
 
-                # --- TEMİZLİK AŞAMASI ---
-                final_text = self._clean_response(raw_text)
+        response = await client.post(endpoint.url, json=payload)
+        if response.status_code != 200:
+            # İstek akıştan bağımsız olarak hatalı: akış desteği hakkında karar verilmez
+            err = f"{ERROR_PREFIX} Status: {response.status_code} - {response.text}"
+            print(err)
+            raise LLMUpstreamError(err)
+        print(f"⚠️ [LLM] Akış desteklenmiyor, {endpoint.url} için tek parça moda geçildi.")
+        endpoint.streaming_supported = False
+        for word in self._simulate_stream(response.json()):
+            yield word
 
-                print(f"✅ [LLM] Temizlenmiş Cevap: {final_text[:50]}...")
+    async def _stream_tokens(self, response: httpx.Response, sse: bool) -> AsyncGenerator[str, None]:
+        """Akışlı cevaptaki parçaları <think> bloklarından arındırarak geldikçe döner."""
+        think_filter = ThinkTagFilter()
+        started = False
 
-                # Eğer temizlik sonrası metin boşsa uyarı ver
-                if not final_text:
-                    yield "Üzgünüm, geçerli bir cevap oluşturulamadı."
-                    return
+        async for line in response.aiter_lines():
+            line = line.strip()
+            if sse:
+                # SSE: yalnızca 'data:' satırları taşır
+                if not line.startswith("data:"):
+                    continue
+                line = line[len("data:"):].strip()
+            if not line:
+                continue
+            if line == "[DONE]":
+                break
+
+            piece = self._extract_token(line)
+            text = think_filter.feed(piece)
+            # Cevabın başındaki boşlukları (genelde </think> sonrası satır sonları) atla
+            if not started:
+                text = text.lstrip()
+            if text:
+                started = True
+                yield text
+
+        tail = think_filter.flush()
+        if not started:
+            tail = tail.lstrip()
+        if tail.rstrip():
+            started = True
+            yield tail.rstrip()
+
+        if not started:
+            yield EMPTY_RESPONSE_MESSAGE
+        else:
+            print("✅ [LLM] Akış tamamlandı.")
+
+    def _extract_token(self, line: str) -> str:
+        """Bir akış satırından token metnini çıkarır (JSON değilse satırın kendisi token'dır)."""
+        try:
+            data = json.loads(line)
+        except ValueError:
+            return line
+
+        if isinstance(data, str):
+            return data
+        if not isinstance(data, dict):
+            return ""
+
+        for key in ("token", "response", "text", "delta", "content"):
+            value = data.get(key)
+            if isinstance(value, str):
+                return value
+
+        # OpenAI uyumlu format: choices[0].delta.content / choices[0].text
+        choices = data.get("choices") or []
+        if choices:
+            choice = choices[0]
+            delta = choice.get("delta") or {}
+            return delta.get("content") or choice.get("text") or ""
+        return ""
+
+    def _simulate_stream(self, data: dict):
+        """Tek parça JSON cevabını temizler ve kelime kelime böler."""
+        raw_text = data.get("response", "")
+
+        # --- TEMİZLİK AŞAMASI ---
+        final_text = self._clean_response(raw_text)
+
+        print(f"✅ [LLM] Temizlenmiş Cevap: {final_text[:50]}...")
 
-                # Kelime kelime simülasyon (TTS ve Frontend için)
-                words = final_text.split(" ")
-                for word in words:
-                    yield word + " "
+        # Eğer temizlik sonrası metin boşsa uyarı ver
+        if not final_text:
+            yield EMPTY_RESPONSE_MESSAGE
+            return
 
-            except Exception as e:
-                print(f"\n❌ [LLM Bağlantı Hatası]: {e}")
-                yield f"Bağlantı Hatası: {str(e)}"
\ No newline at end of file
+        # Kelime kelime simülasyon (TTS ve Frontend için)
+        words = final_text.split(" ")
+        for word in words:
+            yield word + " "
@@ -0,0 +1,161 @@
+# voice_ai_backend/services/memory.py
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+# (kullanıcı mesajı, asistan cevabı)
+Turn = Tuple[str, str]
+
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+
+class ConversationHistory:
+    """Prompt'a girecek geçmiş: eski turların özeti + bütçeye sığan son turlar."""
+
+    def __init__(self, summary: str = "", turns: Optional[List[Turn]] = None):
+        self.summary = summary
+        self.turns = list(turns or [])
+
+    def __bool__(self) -> bool:
+        return bool(self.summary or self.turns)
+
+
+class _Session:
+    def __init__(self):
+        self.summary_lines: List[str] = []
+        self.turns: List[Turn] = []
+        self.updated_at = time.monotonic()
+
+
+class ConversationMemory:
+    """
+    Oturum başına sınırlı sohbet hafızası (oturum kimliği olmayan istekler hafıza kullanmaz).
+
+    Son turlar token bütçesi içinde aynen tutulur; bütçe aşılınca en eski turlar kısa bir
+    özet satırına indirilip çalışan özete eklenir. Özet de kendi bütçesini aşarsa en eski
+    satırları düşer. Turlar tek tek değil, geçmiş evict_ratio oranına inene kadar toplu
+    özetlenir; böylece özet (prompt'un sabit ön ekinin parçası) her turda değişmez ve
+    ön ek önbelleği (prefix caching) yapan üretim sunucusu KV önbelleğini tekrar kullanır.
+
+    Özet, ek bir LLM çağrısı yapmadan çıkarımsal olarak (her mesajın ilk cümlesi) üretilir.
+    Hafıza süreç içindedir; birden fazla worker'da oturum aynı worker'a düşmezse kısalır.
+    """
+
+    def __init__(self, token_budget: int = 800, summary_token_budget: int = 300, chars_per_token: float = 3.5,
+                 evict_ratio: float = 0.5, summary_line_chars: int = 160, max_sessions: int = 1000,
+                 ttl_seconds: float = 3600.0):
+        """
+        Args:
+            token_budget (int): Aynen tutulan son turlar için (tahmini) token bütçesi.
+            summary_token_budget (int): Çalışan özet için token bütçesi.
+            chars_per_token (float): Token tahmini için karakter/token oranı (Türkçe için ~3.5).
+            evict_ratio (float): Bütçe aşılınca geçmiş bütçenin bu oranına inene kadar özetlenir.
+            summary_line_chars (int): Özetlenen her mesaj için tutulacak en fazla karakter.
+            max_sessions (int): Bellekte tutulacak en fazla oturum (en eskisi silinir).
+            ttl_seconds (float): Bu süre boyunca kullanılmayan oturum unutulur.
+        """
+        self.token_budget = token_budget
+        self.summary_token_budget = summary_token_budget
+        self.chars_per_token = chars_per_token
+        self.evict_ratio = min(1.0, max(0.0, evict_ratio))
+        self.summary_line_chars = summary_line_chars
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+
+        self._sessions: "OrderedDict[Tuple[int, str], _Session]" = OrderedDict()
+
+        # Metrikler
+        self.turns_added = 0
+        self.turns_summarized = 0
+        self.summary_lines_dropped = 0
+        self.expired = 0
+
+    def estimate_tokens(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def get(self, user_id: int, session_id: str) -> ConversationHistory:
+        session = self._get_session(user_id, session_id, create=False)
+        if session is None:
+            return ConversationHistory()
+        return ConversationHistory("\n".join(session.summary_lines), session.turns)
+
+    def append(self, user_id: int, session_id: str, user_message: str, answer: str) -> None:
+        """Tamamlanan turu ekler; bütçe aşılırsa eski turları özete katar."""
+        session = self._get_session(user_id, session_id, create=True)
+        session.turns.append((user_message.strip(), answer.strip()))
+        self.turns_added += 1
+
+        if self._turns_tokens(session.turns) <= self.token_budget:
+            return
+
+        target = self.token_budget * self.evict_ratio
+        # Son tur her zaman aynen kalır
+        while len(session.turns) > 1 and self._turns_tokens(session.turns) > target:
+            session.summary_lines.append(self._summarize(session.turns.pop(0)))
+            self.turns_summarized += 1
+
+        while (len(session.summary_lines) > 1
+               and self.estimate_tokens("\n".join(session.summary_lines)) > self.summary_token_budget):
+            session.summary_lines.pop(0)
+            self.summary_lines_dropped += 1
+
+    def clear(self, user_id: int, session_id: str) -> None:
+        self._sessions.pop(self._key(user_id, session_id), None)
+
+    def stats(self) -> dict:
+        sessions = list(self._sessions.values())
+        return {
+            "sessions": len(sessions),
+            "turns_added": self.turns_added,
+            "turns_summarized": self.turns_summarized,
+            "summary_lines_dropped": self.summary_lines_dropped,
+            "expired": self.expired,
+            "avg_history_tokens": round(
+                sum(self._turns_tokens(s.turns) for s in sessions) / len(sessions), 1) if sessions else 0.0,
+        }
+
+    # --- İç işleyiş ---
+    @staticmethod
+    def _key(user_id: int, session_id: str) -> Tuple[int, str]:
+        return user_id, session_id
+
+    def _get_session(self, user_id: int, session_id: str, create: bool) -> Optional[_Session]:
+        self._prune()
+        key = self._key(user_id, session_id)
+        session = self._sessions.get(key)
+        if session is None:
+            if not create:
+                return None
+            session = self._sessions[key] = _Session()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(key)
+        session.updated_at = time.monotonic()
+        return session
+
+    def _prune(self) -> None:
+        """Uzun süredir kullanılmayan oturumları siler (en eski kullanılan başta)."""
+        now = time.monotonic()
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if now - session.updated_at <= self.ttl_seconds:
+                break
+            del self._sessions[key]
+            self.expired += 1
+
+    def _turns_tokens(self, turns: List[Turn]) -> int:
+        return sum(self.estimate_tokens(user) + self.estimate_tokens(answer) for user, answer in turns)
+
+    def _summarize(self, turn: Turn) -> str:
+        user_message, answer = turn
+        return f"- Kullanıcı: {self._first_sentence(user_message)} / Asistan: {self._first_sentence(answer)}"
+
+    def _first_sentence(self, text: str) -> str:
+        text = " ".join(text.split())
+        sentence = SENTENCE_END.split(text, maxsplit=1)[0]
+        if len(sentence) > self.summary_line_chars:
+            cut = sentence[:self.summary_line_chars]
+            sentence = (cut[:cut.rfind(" ")] if " " in cut else cut) + "…"
+        return sentence
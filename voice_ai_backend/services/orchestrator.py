@@ -2,82 +2,233 @@
 import asyncio
 import json
 import base64
-import re
-from typing import AsyncGenerator
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Callable, Deque, List, Optional, Tuple
 from services.rag.pipeline import RAGPipeline
-from services.llm_service import CustomLLMService
+from services.rag.prefetch import RetrievalPrefetcher
+from services.llm_service import CustomLLMService, is_valid_answer
 from services.tts_service import FalTTSService
+from services.text_segmenter import SentenceSegmenter
+from services.answer_cache import SemanticAnswerCache
+from services.conversation_log import ConversationRecorder
+from services.memory import ConversationHistory, ConversationMemory
+
+# chat_events() tarafından üretilen olay: (tip, veri)
+# 'audio' olayında veri (seq, ses baytları), 'audio_end' olayında {"seq": seq} şeklindedir.
+ChatEvent = Tuple[str, Any]
 
 
 class ConversationOrchestrator:
-    def __init__(self, rag: RAGPipeline, llm: CustomLLMService, tts: FalTTSService):
+    def __init__(self, rag: RAGPipeline, llm: CustomLLMService, tts: FalTTSService, max_concurrent_tts: int = 3,
+                 stream_audio: bool = False,
+                 segmenter_factory: Callable[[], SentenceSegmenter] = SentenceSegmenter,
+                 answer_cache: Optional[SemanticAnswerCache] = None,
+                 prefetcher: Optional[RetrievalPrefetcher] = None,
+                 recorder: Optional[ConversationRecorder] = None,
+                 memory: Optional[ConversationMemory] = None):
+        """
+        Args:
+            max_concurrent_tts (int): Tek bir cevap içinde aynı anda çalışabilecek TTS isteği sayısı.
+            stream_audio (bool): True ise ses, cümle bitmeden parça parça üretilir (SSE'de 'audio_chunk'
+                olayları + 'audio_end'). False ise cümle başına tek 'audio' olayı.
+            segmenter_factory: Her cevap için TTS parçalayıcısı üretir (ilk parça / min / max politikaları).
+            answer_cache: Tekrarlanan sorular için cevap önbelleği (None ise kapalı).
+            prefetcher: Kısmi transkripsiyonlarla önceden yapılmış bağlam aramasını kullanır (None ise kapalı).
+            recorder: Tamamlanan turları ve aşama sürelerini veritabanına yazar (None ise kapalı).
+            memory: Oturum başına sohbet geçmişi; önceki turlar prompt'a eklenir (None ise her soru bağımsız).
+        """
         self.rag = rag
         self.llm = llm
         self.tts = tts
-
-    async def stream_chat(self, user_id: int, user_message: str, system_prompt: str) -> AsyncGenerator[str, None]:
+        self.max_concurrent_tts = max(1, max_concurrent_tts)
+        self.stream_audio = stream_audio
+        self.segmenter_factory = segmenter_factory
+        self.answer_cache = answer_cache
+        self.prefetcher = prefetcher
+        self.recorder = recorder
+        self.memory = memory
+
+    async def stream_chat(self, user_id: int, user_message: str, system_prompt: str,
+                          bypass_cache: bool = False, session_id: Optional[str] = None) -> AsyncGenerator[str, None]:
+        """
+        Server-Sent Events (SSE) formatında veri akışı sağlar (ses Base64 olarak JSON içinde).
         """
-        Server-Sent Events (SSE) formatında veri akışı sağlar.
+        async for event_type, data in self.chat_events(user_id, user_message, system_prompt, bypass_cache,
+                                                       session_id):
+            if event_type == "audio":
+                seq, audio_bytes = data
+                b64_audio = base64.b64encode(audio_bytes).decode('utf-8')
+                if self.stream_audio:
+                    yield self._sse_event("audio_chunk", {"seq": seq, "data": b64_audio})
+                else:
+                    yield self._sse_event("audio", b64_audio)
+            elif event_type == "audio_end":
+                # Tek parça modunda her 'audio' olayı zaten tam bir cümledir
+                if self.stream_audio:
+                    yield self._sse_event(event_type, data)
+            else:
+                yield self._sse_event(event_type, data)
+
+    async def chat_events(self, user_id: int, user_message: str, system_prompt: str,
+                          bypass_cache: bool = False, session_id: Optional[str] = None
+                          ) -> AsyncGenerator[ChatEvent, None]:
         """
+        Taşıma katmanından bağımsız olay akışı (SSE ve WebSocket bunu kullanır).
+
+        Cümleler tamamlandıkça TTS işleri arka planda başlatılır; token'lar sesi beklemeden
+        akar, ses olayları ise her zaman cümle sırasıyla gönderilir.
+        """
+
+        # Aşama süreleri (ms), tur kaydı için
+        started = time.monotonic()
+        timings = {}
+
+        def mark(stage: str) -> None:
+            if stage not in timings:
+                timings[stage] = (time.monotonic() - started) * 1000
 
         # 1. DURUM: DÜŞÜNÜYOR
-        yield self._sse_event("status", "thinking")
+        yield "status", "thinking"
 
-        # 2. RAG BAĞLAMI GETİR (Asenkron)
-        context, sources = await self.rag.get_context_async(user_id, user_message)
+        # 2. RAG BAĞLAMI GETİR (Asenkron): kullanıcı konuşurken başlatılmış arama uygunsa onu kullan
+        prefetched = await self.prefetcher.take(user_id, user_message) if self.prefetcher else None
+        if prefetched is not None:
+            context, sources = prefetched
+        else:
+            context, sources = await self.rag.get_context_async(user_id, user_message)
+        mark("retrieval")
 
         # Kaynakları hemen bildir
         if sources:
-            yield self._sse_event("sources", sources)
+            yield "sources", sources
 
         # 3. DURUM: KONUŞUYOR
-        yield self._sse_event("status", "speaking")
+        yield "status", "speaking"
+
+        # Oturum kimliği olmayan istekler durumsuzdur: geçmiş okunmaz ve yazılmaz
+        use_memory = self.memory is not None and bool(session_id)
+        history = self.memory.get(user_id, session_id) if use_memory else ConversationHistory()
+
+        # Cevap önbelleği: aynı persona + aynı parçalar + benzer soru ise LLM'e gitme.
+        # Geçmişi olan oturumda aynı soru önceki turlara göre farklı anlam taşıyabilir; önbellek kullanılmaz.
+        cache_args = None
+        cached_answer = None
+        if self.answer_cache is not None and not bypass_cache and not history:
+            query_embedding = await self.rag.embed_query_async(user_message)
+            chunk_ids = [source.get("chunk_id", "") for source in sources]
+            cache_args = (user_id, system_prompt, chunk_ids, query_embedding)
+            cached_answer = self.answer_cache.lookup(*cache_args)
 
         # LLM Akışı
-        llm_generator = self.llm.generate_stream(system_prompt, user_message, context)
-
-        buffer = ""
-        # Cümle sonlarını yakalayan regex
-        sentence_endings = re.compile(r'(?<=[.?!])\s+')
-
-        async for token in llm_generator:
-            # Token'ı metin olarak hemen gönder
-            yield self._sse_event("token", token)
-
-            buffer += token
-
-            # Tamponda cümle bitişi var mı?
-            parts = sentence_endings.split(buffer)
-
-            if len(parts) > 1:
-                complete_sentences = parts[:-1]
-                buffer = parts[-1]
-
-                for sentence in complete_sentences:
-                    if sentence.strip():
-                        # Cümleyi sese çevir ve gönder
-                        async for event in self._process_audio(sentence):
-                            yield event
-
-        # Kalan son parçayı işle
-        if buffer.strip():
-            async for event in self._process_audio(buffer):
-                yield event
+        if cached_answer is not None:
+            print(f"💾 [AnswerCache] Hit (user={user_id}): '{user_message[:30]}...'")
+            llm_generator = self._replay_answer(cached_answer)
+        else:
+            llm_generator = self.llm.generate_stream(system_prompt, user_message, context, history=history)
+        answer_parts = []
+
+        # Sıralı TTS kuyruğu (cümle sırası korunur) ve eşzamanlılık limiti
+        tts_slots = asyncio.Semaphore(self.max_concurrent_tts)
+        pending_audio: Deque[Tuple[int, asyncio.Task, asyncio.Queue]] = deque()
+        seq = 0
+
+        # Token akışını TTS parçalarına bölen artımlı bölücü (yalnızca yeni metni tarar)
+        segmenter = self.segmenter_factory()
+
+        try:
+            async for token in llm_generator:
+                mark("llm_first_token")
+                # Token'ı metin olarak hemen gönder
+                yield "token", token
+                answer_parts.append(token)
+
+                for sentence in segmenter.feed(token):
+                    # Parçayı beklemeden sentezlemeye başla
+                    pending_audio.append(self._start_audio_job(seq, sentence, tts_slots))
+                    seq += 1
+
+                # Sırası gelmiş sesleri gönder (bekleme yapmadan)
+                for event in self._drain_ready_audio(pending_audio):
+                    mark("first_audio")
+                    yield event
+            mark("llm_total")
+
+            # Başarılı yeni cevabı önbelleğe yaz
+            answer = "".join(answer_parts).strip()
+            if cache_args is not None and cached_answer is None and is_valid_answer(answer):
+                self.answer_cache.store(*cache_args, answer)
+            if use_memory and is_valid_answer(answer):
+                self.memory.append(user_id, session_id, user_message, answer)
+
+            # Kalan son parçayı işle
+            for sentence in segmenter.flush():
+                pending_audio.append(self._start_audio_job(seq, sentence, tts_slots))
+                seq += 1
+
+            # Geriye kalan sesleri sırasıyla bekle ve gönder
+            while pending_audio:
+                job_seq, _, queue = pending_audio[0]
+                chunk = await queue.get()
+                if chunk is None:
+                    pending_audio.popleft()
+                    yield "audio_end", {"seq": job_seq}
+                    continue
+                mark("first_audio")
+                yield "audio", (job_seq, chunk)
+        finally:
+            # İstemci bağlantıyı koparırsa yarım kalan TTS işlerini iptal et
+            for _, task, _ in pending_audio:
+                task.cancel()
+
+        mark("total")
+        if self.recorder is not None:
+            self.recorder.record(user_id, session_id, user_message, answer, timings,
+                                 cached=cached_answer is not None, sources_count=len(sources))
 
         # 4. DURUM: BİTİŞ
-        yield self._sse_event("status", "done")
-
-    async def _process_audio(self, text: str) -> AsyncGenerator[str, None]:
-        """Metni sese çevirir ve Base64 olarak stream eder."""
-        # TTS servisi sesi üretir
-        audio_bytes = await self.tts.speak_text(text)
-
-        if audio_bytes:
-            # Base64 encode
-            b64_audio = base64.b64encode(audio_bytes).decode('utf-8')
-            yield self._sse_event("audio", b64_audio)
+        yield "status", "done"
+
+    async def _replay_answer(self, answer: str) -> AsyncGenerator[str, None]:
+        """Önbellekteki cevabı LLM akışı gibi döner."""
+        yield answer
+
+    def _start_audio_job(self, seq: int, text: str, slots: asyncio.Semaphore) -> Tuple[int, asyncio.Task, asyncio.Queue]:
+        """Cümle için arka planda TTS başlatır; ses parçaları kuyruğa yazılır, None bitişi işaret eder."""
+        queue: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(self._synthesize(text, slots, queue))
+        return seq, task, queue
+
+    async def _synthesize(self, text: str, slots: asyncio.Semaphore, queue: asyncio.Queue) -> None:
+        """Eşzamanlılık limiti altında metni sese çevirir."""
+        try:
+            async with slots:
+                if self.stream_audio:
+                    async for chunk in self.tts.speak_text_stream(text):
+                        queue.put_nowait(chunk)
+                else:
+                    audio_bytes = await self.tts.speak_text(text)
+                    if audio_bytes:
+                        queue.put_nowait(audio_bytes)
+        finally:
+            queue.put_nowait(None)
+
+    def _drain_ready_audio(self, pending: Deque[Tuple[int, asyncio.Task, asyncio.Queue]]) -> List[ChatEvent]:
+        """Sıradaki cümle(ler)in hazır ses parçalarını beklemeden toplar."""
+        events = []
+        while pending:
+            seq, _, queue = pending[0]
+            if queue.empty():
+                break
+            chunk = queue.get_nowait()
+            if chunk is None:
+                pending.popleft()
+                events.append(("audio_end", {"seq": seq}))
+                continue
+            events.append(("audio", (seq, chunk)))
+        return events
 
     def _sse_event(self, event_type: str, data: any) -> str:
         """SSE formatı: data: {...}\n\n"""
         payload = json.dumps({"type": event_type, "data": data}, ensure_ascii=False)
-        return f"data: {payload}\n\n"
\ No newline at end of file
+        return f"data: {payload}\n\n"
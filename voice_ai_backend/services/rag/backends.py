@@ -0,0 +1,581 @@
+# voice_ai_backend/services/rag/backends.py
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: yazmalar yalnızca süreç içinde sıralanır
+    fcntl = None
+
+from .cache import LRUCache
+
+CHROMA_PATH = "chroma_db"
+NUMPY_INDEX_PATH = "vector_index"
+
+# Bir segmenti oluşturan dosyalar (seg_<ns> + sonek)
+SEGMENT_SUFFIXES = (".npy", ".offsets.npy", ".data.bin", ".ids.json")
+
+# Backend'lerin döndürdüğü parça: (kimlik, metin, metadata)
+Chunk = Tuple[str, str, dict]
+
+
+class VectorBackend(ABC):
+    """
+    VectorStore'un kullandığı depolama arayüzü. Embedding hesaplama, önbellekler,
+    manifest ve BM25 indeksi VectorStore'da kalır; backend yalnızca parçaları saklar ve arar.
+    Tüm metodlar senkrondur (VectorStore bunları thread'e yıkar).
+    """
+
+    name = "base"
+
+    def has_documents_hint(self, user_id: int) -> Optional[bool]:
+        """True: kullanıcının parçası var, False: yok, None: pahalı kontrol gerekmeden bilinemiyor."""
+        return None
+
+    @abstractmethod
+    def upsert(self, user_id: int, ids: List[str], texts: List[str], embeddings: List[List[float]],
+               metadatas: List[dict]) -> None:
+        pass
+
+    @abstractmethod
+    def update_metadatas(self, user_id: int, ids: List[str], metadatas: List[dict]) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, user_id: int, ids: List[str]) -> None:
+        pass
+
+    @abstractmethod
+    def ids_for_source(self, user_id: int, source_name: str) -> List[str]:
+        pass
+
+    @abstractmethod
+    def get(self, user_id: int, ids: Optional[List[str]] = None) -> List[Chunk]:
+        """Verilen kimliklerdeki (ids None ise tüm) parçaları döner."""
+        pass
+
+    @abstractmethod
+    def query(self, user_id: int, embedding: List[float], k: int) -> List[Chunk]:
+        """En yakın k parçayı yakınlık sırasıyla döner."""
+        pass
+
+    def invalidate(self, user_id: int) -> None:
+        """Kullanıcıya ait bellekteki handle/önbellekleri temizler."""
+
+    def scoped_path(self, base: str) -> str:
+        """
+        Backend'e bağlı yardımcı kayıtların (manifest, BM25 indeksi) dizini. Backend
+        değiştirilince eski backend'in kayıtları yeni backend'de olmayan parçaları
+        varmış gibi göstermesin diye her backend kendi alt dizinini kullanır.
+        """
+        return os.path.join(base, self.name)
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+class ChromaBackend(VectorBackend):
+    """ChromaDB PersistentClient üzerinde kullanıcı başına bir koleksiyon."""
+
+    name = "chroma"
+
+    def scoped_path(self, base: str) -> str:
+        # Varsayılan backend: mevcut kurulumların kayıtları olduğu yerde kalır
+        return base
+
+    def __init__(self, path: str = CHROMA_PATH, collection_cache_size: int = 256,
+                 missing_collection_ttl: float = 30.0):
+        """
+        Args:
+            collection_cache_size (int): Bellekte tutulacak koleksiyon handle'ı sayısı.
+            missing_collection_ttl (float): Koleksiyonu olmayan kullanıcı için Chroma'ya yeniden
+                bakmadan boş sonuç dönülecek süre.
+        """
+        import chromadb
+
+        self.client = chromadb.PersistentClient(path=path)
+        # Koleksiyon handle önbelleği: her sorguda Chroma'nın SQLite kataloğuna gidilmez
+        self._collections = LRUCache(max_entries=collection_cache_size)
+        self._collection_lock = threading.Lock()
+        self.missing_collection_ttl = missing_collection_ttl
+        self._known_collections: Set[str] = set()
+        self._listed_at = 0.0
+        self._refresh_known_collections()
+
+    @staticmethod
+    def _collection_name(user_id: int) -> str:
+        return f"user_{user_id}_docs"
+
+    def _refresh_known_collections(self) -> None:
+        """Mevcut koleksiyon isimlerini tek bir katalog sorgusuyla yeniler."""
+        # Chroma sürümüne göre isim veya Collection nesnesi döner
+        self._known_collections = {c if isinstance(c, str) else c.name for c in self.client.list_collections()}
+        self._listed_at = time.monotonic()
+
+    def _get_collection(self, user_id: int, create: bool = True):
+        """
+        Kullanıcının koleksiyon handle'ını önbellekten döner.
+        create=False iken koleksiyon yoksa None döner (yan etki olarak boş koleksiyon oluşturulmaz).
+        """
+        collection = self._collections.get(user_id)
+        if collection is not None:
+            return collection
+
+        name = self._collection_name(user_id)
+        with self._collection_lock:
+            if not create and name not in self._known_collections:
+                # Başka bir worker oluşturmuş olabilir: kataloğu bir kez yenile
+                self._refresh_known_collections()
+                if name not in self._known_collections:
+                    return None
+
+            collection = self.client.get_or_create_collection(name=name)
+            self._known_collections.add(name)
+            self._collections.put(user_id, collection)
+            return collection
+
+    def has_documents_hint(self, user_id: int) -> Optional[bool]:
+        """True: koleksiyon var, False: son katalog listesinde yok, None: liste eskimiş."""
+        if self._collection_name(user_id) in self._known_collections:
+            return True
+        if time.monotonic() - self._listed_at < self.missing_collection_ttl:
+            return False
+        return None
+
+    def invalidate(self, user_id: int) -> None:
+        with self._collection_lock:
+            self._collections.pop(user_id)
+            self._known_collections.discard(self._collection_name(user_id))
+
+    def upsert(self, user_id, ids, texts, embeddings, metadatas) -> None:
+        self._get_collection(user_id).upsert(ids=ids, documents=texts, embeddings=embeddings, metadatas=metadatas)
+
+    def update_metadatas(self, user_id, ids, metadatas) -> None:
+        self._get_collection(user_id).update(ids=ids, metadatas=metadatas)
+
+    def delete(self, user_id, ids) -> None:
+        collection = self._get_collection(user_id, create=False)
+        if collection is not None and ids:
+            collection.delete(ids=ids)
+
+    def ids_for_source(self, user_id, source_name) -> List[str]:
+        collection = self._get_collection(user_id, create=False)
+        if collection is None:
+            return []
+        return collection.get(where={"source": source_name}, include=[])["ids"]
+
+    def get(self, user_id, ids=None) -> List[Chunk]:
+        collection = self._get_collection(user_id, create=False)
+        if collection is None or ids == []:
+            return []
+        result = collection.get(ids=ids, include=["documents", "metadatas"])
+        metas = result["metadatas"] or [{}] * len(result["ids"])
+        return [(doc_id, text, meta or {}) for doc_id, text, meta in zip(result["ids"], result["documents"], metas)]
+
+    def query(self, user_id, embedding, k) -> List[Chunk]:
+        collection = self._get_collection(user_id, create=False)
+        if collection is None:
+            return []
+
+        try:
+            results = collection.query(query_embeddings=[embedding], n_results=k)
+        except Exception:
+            # Handle bayatlamış olabilir (koleksiyon başka bir süreçte silindi vb.)
+            self.invalidate(user_id)
+            raise
+
+        if not results["documents"]:
+            return []
+        docs = results["documents"][0]
+        ids = results["ids"][0]
+        metas = results["metadatas"][0] if results["metadatas"] else [{}] * len(docs)
+        return [(doc_id, text, meta or {}) for doc_id, text, meta in zip(ids, docs, metas)]
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "collection_cache": self._collections.stats()}
+
+
+class _Segment:
+    """
+    Değişmez (append-only) bir segment: vektör matrisi + kayıt (metin, metadata) dosyası.
+
+    Vektörler, kayıt ofsetleri ve kayıt baytları mmap ile açılır; metin ve metadata yalnızca
+    istenen satırlar için çözülür. Böylece worker'lar korpusu belleğe kopyalamadan işletim
+    sisteminin page cache'i üzerinden paylaşır. Yalnızca kimlik listesi belleğe okunur.
+    """
+
+    def __init__(self, directory: str, name: str, dead: List[int]):
+        base = os.path.join(directory, name)
+        self.name = name
+        self.vectors = np.load(f"{base}.npy", mmap_mode="r")
+        self.offsets = np.load(f"{base}.offsets.npy", mmap_mode="r")
+        self.data = np.memmap(f"{base}.data.bin", dtype=np.uint8, mode="r")
+        with open(f"{base}.ids.json", "r", encoding="utf-8") as f:
+            self.ids: List[str] = json.load(f)
+        self.dead: Set[int] = set(dead)
+
+    def record(self, row: int) -> Tuple[str, dict]:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        text, meta = json.loads(bytes(self.data[start:end]).decode("utf-8"))
+        return text, meta
+
+    def live_rows(self) -> List[int]:
+        return [row for row in range(len(self.ids)) if row not in self.dead]
+
+
+class _UserIndex:
+    """Bir kullanıcının yüklenmiş indeksi: segment listesi ve canlı kimliklerin konumları."""
+
+    def __init__(self, segments: List[_Segment], mtime: Optional[int]):
+        self.segments = segments
+        self.mtime = mtime
+        self.locations: Dict[str, Tuple[int, int]] = {}
+        for index, segment in enumerate(segments):
+            for row, chunk_id in enumerate(segment.ids):
+                if row not in segment.dead:
+                    self.locations[chunk_id] = (index, row)
+
+    def segment_meta(self) -> List[dict]:
+        return [{"name": s.name, "rows": len(s.ids), "dead": sorted(s.dead)} for s in self.segments]
+
+    def chunk(self, location: Tuple[int, int]) -> Chunk:
+        segment = self.segments[location[0]]
+        text, meta = segment.record(location[1])
+        return segment.ids[location[1]], text, meta
+
+
+class NumpyBackend(VectorBackend):
+    """
+    Kullanıcı başına append-only segmentlerden oluşan float32/float16 vektör indeksi.
+
+    Her yazma (batch) yeni bir değişmez segment ekler; güncellenen veya silinen parçaların
+    eski satırları sidecar'da (meta.json) ölü olarak işaretlenir. Böylece batch'li yükleme
+    her seferinde tüm korpusu yeniden yazmaz. Segment boyları geometrik tutulur (son segment
+    bir öncekinin yarısını geçince ikisi birleştirilir) ve ölü satırlar canlılardan fazlaysa
+    indeks sıkıştırılır; her satır O(log n) kez yeniden yazılır.
+
+    Segment dosyaları `mmap` ile okunur: tüm worker'lar aynı sayfaları işletim sisteminin page
+    cache'i üzerinden salt-okunur paylaşır. Vektörler yazılırken normalize edilir; arama her
+    segmentte bir matris-vektör çarpımı (kosinüs benzerliği) ve argpartition ile yapılır.
+    Yazmalar (oku-değiştir-yaz) kullanıcı başına bir dosya kilidi (flock) altında yapılır; böylece
+    aynı kullanıcıya farklı worker'lardan gelen yazmalar birbirinin segmentini kaybetmez. Sidecar
+    atomik olarak yer değiştirir; okuyucular kilit almaz, değişikliği dosya zamanından anlayıp
+    yeniden açar. Küçük/orta boy kullanıcı korpusları için Chroma'nın katalog ve kilit
+    maliyetini ortadan kaldırır.
+    """
+
+    name = "numpy"
+
+    def __init__(self, path: str = NUMPY_INDEX_PATH, dtype: str = "float32", max_users_in_memory: int = 256,
+                 query_block_rows: int = 65536):
+        """
+        Args:
+            dtype (str): Diskteki vektör tipi ("float32" veya yarı bellek için "float16").
+            max_users_in_memory (int): Açık tutulacak kullanıcı indeksi sayısı.
+            query_block_rows (int): float16 matrislerde geçici float32 belleği sınırlamak için blok boyu.
+        """
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Desteklenmeyen vektör tipi: {dtype}")
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.query_block_rows = max(1, query_block_rows)
+        os.makedirs(self.path, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._users = LRUCache(max_entries=max_users_in_memory)
+        self.segments_written = 0
+        self.merges = 0
+
+    # --- Dosya düzeni ---
+    def _dir(self, user_id: int) -> str:
+        return os.path.join(self.path, f"user_{user_id}")
+
+    def _meta_file(self, user_id: int) -> str:
+        return os.path.join(self._dir(user_id), "meta.json")
+
+    def _lock_file(self, user_id: int) -> str:
+        # Kullanıcı dizininin dışında: dizin boşalınca silinse de kilit dosyası kalır
+        return os.path.join(self.path, f"user_{user_id}.lock")
+
+    @contextmanager
+    def _write_lock(self, user_id: int):
+        """Kullanıcının indeksine yazmayı hem thread'ler hem de worker süreçleri arasında sıralar."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._lock_file(user_id), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self, user_id: int, fresh: bool = False) -> Optional[_UserIndex]:
+        """
+        Kullanıcının güncel indeksini döner (başka worker yazdıysa yeniden açar).
+        fresh=True ise (yazma kilidi altında) önbellek atlanıp sidecar diskten okunur.
+        """
+        meta_file = self._meta_file(user_id)
+        try:
+            mtime = os.stat(meta_file).st_mtime_ns
+        except FileNotFoundError:
+            self._users.pop(user_id)
+            return None
+
+        cached = self._users.get(user_id)
+        if cached is not None and cached.mtime == mtime and not fresh:
+            return cached
+
+        directory = self._dir(user_id)
+        for attempt in range(3):
+            with open(meta_file, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            try:
+                segments = [_Segment(directory, entry["name"], entry["dead"]) for entry in meta["segments"]]
+                break
+            except FileNotFoundError:
+                # Okuma sırasında başka bir worker segmentleri birleştirdi: sidecar'ı tekrar oku
+                if attempt == 2:
+                    raise
+                mtime = os.stat(meta_file).st_mtime_ns
+        index = _UserIndex(segments, mtime)
+        self._users.put(user_id, index)
+        return index
+
+    def _write_segment(self, user_id: int, ids: List[str], vectors: np.ndarray, texts: List[str],
+                       metadatas: List[dict]) -> dict:
+        """Yeni bir segment yazar ve sidecar kaydını döner (sidecar'ı değiştirmez)."""
+        directory = self._dir(user_id)
+        os.makedirs(directory, exist_ok=True)
+        name = f"seg_{time.time_ns()}"
+        base = os.path.join(directory, name)
+
+        records = [json.dumps([text, meta], ensure_ascii=False).encode("utf-8") for text, meta in zip(texts, metadatas)]
+        offsets = np.zeros(len(records) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(record) for record in records])
+        with open(f"{base}.data.bin", "wb") as f:
+            f.write(b"".join(records))
+        np.save(f"{base}.offsets.npy", offsets)
+        np.save(f"{base}.npy", np.ascontiguousarray(vectors, dtype=self.dtype))
+        with open(f"{base}.ids.json", "w", encoding="utf-8") as f:
+            json.dump(ids, f, ensure_ascii=False)
+
+        self.segments_written += 1
+        return {"name": name, "rows": len(ids), "dead": []}
+
+    def _commit(self, user_id: int, segments: List[dict], candidates: Iterable[str]) -> None:
+        """
+        Sidecar'ı atomik olarak değiştirir (yazma kilidi altında çağrılır). Yalnızca bu yazmanın
+        referansını kaldırdığı segmentler (candidates: önceki sidecar'daki ve bu yazmada
+        oluşturulan segmentler) silinir; dizindeki başka dosyalara dokunulmaz.
+        """
+        directory = self._dir(user_id)
+        meta_file = self._meta_file(user_id)
+        segments = [entry for entry in segments if entry["rows"] > len(entry["dead"])]
+        if segments:
+            tmp_path = f"{meta_file}.tmp{os.getpid()}.{threading.get_ident()}"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"segments": segments}, f)
+            os.replace(tmp_path, meta_file)
+        else:
+            try:
+                os.remove(meta_file)
+            except FileNotFoundError:
+                pass
+
+        # Eski segment dosyaları (açık mmap'ler POSIX'te silinse de okunmaya devam eder)
+        referenced = {entry["name"] for entry in segments}
+        for name in set(candidates) - referenced:
+            for suffix in SEGMENT_SUFFIXES:
+                try:
+                    os.remove(os.path.join(directory, name + suffix))
+                except OSError:
+                    pass
+        if not segments:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+        self._users.pop(user_id)
+
+    def _append(self, user_id: int, current: Optional[_UserIndex], ids: List[str], vectors: np.ndarray,
+                texts: List[str], metadatas: List[dict]) -> None:
+        """Satırları yeni segment olarak ekler; aynı kimliklerin eski satırları ölü işaretlenir."""
+        # Batch içinde tekrar eden kimliklerde son gelen geçerlidir
+        last = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        keep = sorted(last.values())
+        ids = [ids[i] for i in keep]
+
+        segments = current.segment_meta() if current is not None else []
+        if current is not None:
+            for chunk_id in ids:
+                location = current.locations.get(chunk_id)
+                if location is not None:
+                    segments[location[0]]["dead"].append(location[1])
+
+        segments.append(self._write_segment(user_id, ids, vectors[keep], [texts[i] for i in keep],
+                                            [metadatas[i] for i in keep]))
+        self._commit(user_id, self._merge_tail(user_id, segments), [entry["name"] for entry in segments])
+
+    def _merge_tail(self, user_id: int, segments: List[dict]) -> List[dict]:
+        """
+        Segment sayısını logaritmik tutar: son segment bir öncekinin canlı satırlarının yarısını
+        geçtikçe ikisi birleştirilir. Ölü satırlar canlılardan fazlaysa tamamı sıkıştırılır.
+        """
+        def live(entry: dict) -> int:
+            return entry["rows"] - len(entry["dead"])
+
+        # Tamamen ölü segmentler birleştirmeye girmez, sidecar'dan düşer
+        segments = [entry for entry in segments if live(entry) > 0]
+        total_dead = sum(len(entry["dead"]) for entry in segments)
+        if len(segments) > 1 and total_dead > sum(live(entry) for entry in segments):
+            return [self._merge(user_id, segments)]
+
+        # Birleşecek kuyruk önce hesaplanır; ara segmentler yazılmadan tek seferde birleştirilir
+        count, merged = 1, live(segments[-1]) if segments else 0
+        while count < len(segments) and live(segments[-count - 1]) <= 2 * merged:
+            merged += live(segments[-count - 1])
+            count += 1
+        if count > 1:
+            segments = segments[:-count] + [self._merge(user_id, segments[-count:])]
+        return segments
+
+    def _merge(self, user_id: int, entries: List[dict]) -> dict:
+        """Verilen segmentlerin canlı satırlarını tek bir yeni segmentte birleştirir."""
+        directory = self._dir(user_id)
+        ids, texts, metadatas, blocks = [], [], [], []
+        for entry in entries:
+            segment = _Segment(directory, entry["name"], entry["dead"])
+            rows = segment.live_rows()
+            blocks.append(np.asarray(segment.vectors[rows], dtype=np.float32))
+            for row in rows:
+                text, meta = segment.record(row)
+                ids.append(segment.ids[row])
+                texts.append(text)
+                metadatas.append(meta)
+        self.merges += 1
+        return self._write_segment(user_id, ids, np.concatenate(blocks), texts, metadatas)
+
+    @staticmethod
+    def _normalize(embeddings) -> np.ndarray:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _scores(self, vectors: np.ndarray, query: np.ndarray) -> np.ndarray:
+        if vectors.dtype == np.float32:
+            return vectors @ query
+        # float16 matris bloklar halinde float32'ye çevrilerek çarpılır (geçici bellek sınırlı)
+        return np.concatenate([
+            vectors[start:start + self.query_block_rows].astype(np.float32) @ query
+            for start in range(0, len(vectors), self.query_block_rows)
+        ])
+
+    # --- VectorBackend ---
+    def has_documents_hint(self, user_id: int) -> Optional[bool]:
+        # Tek bir stat çağrısı: kesin sonuç
+        return os.path.exists(self._meta_file(user_id))
+
+    def upsert(self, user_id, ids, texts, embeddings, metadatas) -> None:
+        if not ids:
+            return
+        vectors = self._normalize(embeddings)
+        with self._write_lock(user_id):
+            self._append(user_id, self._load(user_id, fresh=True), list(ids), vectors, list(texts),
+                         list(metadatas))
+
+    def update_metadatas(self, user_id, ids, metadatas) -> None:
+        with self._write_lock(user_id):
+            current = self._load(user_id, fresh=True)
+            if current is None:
+                return
+            found = [(chunk_id, meta, current.locations[chunk_id]) for chunk_id, meta in zip(ids, metadatas)
+                     if chunk_id in current.locations]
+            if not found:
+                return
+            # Vektör ve metin aynen kopyalanır; yalnızca yeni segmentin metadata'sı farklıdır
+            vectors = np.stack([np.asarray(current.segments[seg].vectors[row], dtype=np.float32)
+                                for _, _, (seg, row) in found])
+            texts = [current.segments[seg].record(row)[0] for _, _, (seg, row) in found]
+            self._append(user_id, current, [chunk_id for chunk_id, _, _ in found], vectors, texts,
+                         [meta for _, meta, _ in found])
+
+    def delete(self, user_id, ids) -> None:
+        if not ids:
+            return
+        with self._write_lock(user_id):
+            current = self._load(user_id, fresh=True)
+            if current is None:
+                return
+            segments = current.segment_meta()
+            removed = 0
+            for chunk_id in set(ids):
+                location = current.locations.get(chunk_id)
+                if location is not None:
+                    segments[location[0]]["dead"].append(location[1])
+                    removed += 1
+            if removed:
+                self._commit(user_id, self._merge_tail(user_id, segments), [entry["name"] for entry in segments])
+
+    def ids_for_source(self, user_id, source_name) -> List[str]:
+        with self._lock:
+            current = self._load(user_id)
+        if current is None:
+            return []
+        return [chunk_id for chunk_id, location in current.locations.items()
+                if current.chunk(location)[2].get("source") == source_name]
+
+    def get(self, user_id, ids=None) -> List[Chunk]:
+        with self._lock:
+            current = self._load(user_id)
+        if current is None:
+            return []
+        if ids is None:
+            return [current.chunk(location) for location in current.locations.values()]
+        return [current.chunk(current.locations[i]) for i in ids if i in current.locations]
+
+    def query(self, user_id, embedding, k) -> List[Chunk]:
+        with self._lock:
+            current = self._load(user_id)
+        if current is None or k <= 0:
+            return []
+
+        query = self._normalize([embedding])[0]
+        blocks, owners = [], []
+        for index, segment in enumerate(current.segments):
+            scores = self._scores(segment.vectors, query)
+            if segment.dead:
+                scores[list(segment.dead)] = -np.inf
+            blocks.append(scores)
+            owners.append(np.full(len(scores), index, dtype=np.int32))
+        scores = np.concatenate(blocks)
+        segment_of = np.concatenate(owners)
+        row_of = np.concatenate([np.arange(len(block)) for block in blocks])
+
+        k = min(k, len(current.locations))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [current.chunk((int(segment_of[i]), int(row_of[i]))) for i in top]
+
+    def invalidate(self, user_id: int) -> None:
+        self._users.pop(user_id)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "dtype": self.dtype.name,
+            "users_in_memory": self._users.stats(),
+            "segments_written": self.segments_written,
+            "merges": self.merges,
+        }
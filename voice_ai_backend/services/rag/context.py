@@ -0,0 +1,187 @@
+# voice_ai_backend/services/rag/context.py
+import math
+from typing import Dict, List, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+
+from .lexical import tokenize
+
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+
+class _Block:
+    """Bağlama girecek metin bloğu: aynı kaynağın bir veya birden fazla (birleştirilmiş) parçası."""
+
+    def __init__(self, doc: Document, relevance: float):
+        self.source = doc.metadata.get("source", "Bilinmeyen")
+        self.text = doc.page_content.replace("\n", " ")
+        self.relevance = relevance
+        self.metadatas = [doc.metadata]
+        self._terms: Optional[Set[str]] = None
+
+    @property
+    def terms(self) -> Set[str]:
+        if self._terms is None:
+            self._terms = set(tokenize(self.text))
+        return self._terms
+
+    def format(self, text: Optional[str] = None) -> str:
+        return f"[KAYNAK: {self.source}]\n{self.text if text is None else text}"
+
+
+class ContextAssembler:
+    """
+    Arama sonuçlarından LLM'e gidecek bağlamı oluşturur.
+
+    1. Aynı kaynaktan gelen ve örtüşen (chunk_overlap) ya da birbirini içeren parçalar tek
+       blokta birleştirilir; tekrar eden metin prompt'a iki kez girmez.
+    2. Bloklar MMR (Maximal Marginal Relevance) ile seçilir: arama sırasından gelen ilgi skoru,
+       seçilmiş bloklara benzerlikle (terim kümesi Jaccard) cezalandırılır.
+    3. Seçim token bütçesi dolana kadar sürer; sığmayan son blok kelime sınırından kısaltılır.
+
+    Token sayısı modelin tokenizer'ı olmadan karakter sayısından tahmin edilir.
+    """
+
+    def __init__(self, token_budget: int = 1200, mmr_lambda: float = 0.7, chars_per_token: float = 3.5,
+                 min_overlap_chars: int = 20, max_overlap_chars: int = 400, min_truncated_tokens: int = 40):
+        """
+        Args:
+            token_budget (int): Bağlam için ayrılan en fazla (tahmini) token (0 ise sınırsız).
+            mmr_lambda (float): 1'e yakın değerler ilgiyi, 0'a yakın değerler çeşitliliği öne çıkarır.
+            chars_per_token (float): Token tahmini için karakter/token oranı (Türkçe için ~3.5).
+            min_overlap_chars (int): İki parçanın birleştirilmesi için gereken en kısa örtüşme.
+            max_overlap_chars (int): Aranacak en uzun örtüşme (ingestion chunk_overlap'ten büyük olmalı).
+            min_truncated_tokens (int): Kısaltılan bloğun taşıması gereken en az token (daha azı eklenmez).
+        """
+        self.token_budget = token_budget
+        self.mmr_lambda = mmr_lambda
+        self.chars_per_token = chars_per_token
+        self.min_overlap_chars = min_overlap_chars
+        self.max_overlap_chars = max_overlap_chars
+        self.min_truncated_tokens = min_truncated_tokens
+
+        # Metrikler
+        self.requests = 0
+        self.tokens_used = 0
+        self.tokens_trimmed = 0
+        self.tokens_deduplicated = 0
+        self.chunks_merged = 0
+
+    def estimate_tokens(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def assemble(self, docs: List[Document], max_blocks: Optional[int] = None) -> Tuple[str, List[Dict], dict]:
+        """
+        Arama sırasıyla verilen parçalardan bağlam metnini oluşturur.
+        (bağlam, bağlama giren parçaların metadata'ları, rapor) döner.
+        """
+        if not docs:
+            return "", [], {"tokens_used": 0, "tokens_trimmed": 0, "tokens_deduplicated": 0, "chunks_merged": 0}
+
+        raw_tokens = sum(self.estimate_tokens(doc.page_content) for doc in docs)
+        blocks = [_Block(doc, 1.0 - rank / len(docs)) for rank, doc in enumerate(docs)]
+        blocks, merged = self._merge_overlapping(blocks)
+        dedup_tokens = raw_tokens - sum(self.estimate_tokens(block.text) for block in blocks)
+
+        parts, sources, used_tokens = self._select(blocks, max_blocks or len(blocks))
+        report = {
+            "tokens_used": used_tokens,
+            # Bütçeye sığmadığı veya çeşitlilik için elendiği için bağlama girmeyen metin
+            "tokens_trimmed": max(0, raw_tokens - dedup_tokens - used_tokens),
+            "tokens_deduplicated": max(0, dedup_tokens),
+            "chunks_merged": merged,
+        }
+
+        self.requests += 1
+        self.tokens_used += report["tokens_used"]
+        self.tokens_trimmed += report["tokens_trimmed"]
+        self.tokens_deduplicated += report["tokens_deduplicated"]
+        self.chunks_merged += merged
+        return CONTEXT_SEPARATOR.join(parts), sources, report
+
+    def stats(self) -> dict:
+        return {
+            "token_budget": self.token_budget,
+            "requests": self.requests,
+            "avg_tokens_used": round(self.tokens_used / self.requests, 1) if self.requests else 0.0,
+            "tokens_trimmed": self.tokens_trimmed,
+            "tokens_deduplicated": self.tokens_deduplicated,
+            "chunks_merged": self.chunks_merged,
+        }
+
+    # --- İç işleyiş ---
+    def _overlap(self, left: str, right: str) -> int:
+        """left'in sonu ile right'ın başı arasındaki en uzun ortak metnin uzunluğu."""
+        longest = min(len(left), len(right), self.max_overlap_chars)
+        for size in range(longest, self.min_overlap_chars - 1, -1):
+            if left.endswith(right[:size]):
+                return size
+        return 0
+
+    def _merge_overlapping(self, blocks: List[_Block]) -> Tuple[List[_Block], int]:
+        merged = 0
+        changed = True
+        while changed:
+            changed = False
+            for i, first in enumerate(blocks):
+                for j, second in enumerate(blocks):
+                    if i == j or first.source != second.source:
+                        continue
+                    if second.text in first.text:
+                        combined = first.text
+                    else:
+                        size = self._overlap(first.text, second.text)
+                        if not size:
+                            continue
+                        combined = first.text + second.text[size:]
+
+                    first.text = combined
+                    first.relevance = max(first.relevance, second.relevance)
+                    first.metadatas.extend(second.metadatas)
+                    first._terms = None
+                    del blocks[j]
+                    merged += 1
+                    changed = True
+                    break
+                if changed:
+                    break
+        return blocks, merged
+
+    @staticmethod
+    def _similarity(first: _Block, second: _Block) -> float:
+        if not first.terms or not second.terms:
+            return 0.0
+        return len(first.terms & second.terms) / len(first.terms | second.terms)
+
+    def _select(self, blocks: List[_Block], max_blocks: int) -> Tuple[List[str], List[Dict], int]:
+        budget = self.token_budget if self.token_budget > 0 else None
+        separator_tokens = self.estimate_tokens(CONTEXT_SEPARATOR)
+        remaining = list(blocks)
+        selected: List[_Block] = []
+        parts: List[str] = []
+        sources: List[Dict] = []
+        used = 0
+
+        while remaining and len(selected) < max_blocks:
+            best = max(remaining, key=lambda block: self.mmr_lambda * block.relevance - (1 - self.mmr_lambda) * max(
+                (self._similarity(block, chosen) for chosen in selected), default=0.0))
+            remaining.remove(best)
+
+            text = best.format()
+            cost = self.estimate_tokens(text) + (separator_tokens if parts else 0)
+            if budget is not None and used + cost > budget:
+                # Sığmayan blok kelime sınırından kısaltılır (çok az yer kaldıysa atlanır)
+                available = budget - used - (separator_tokens if parts else 0) - self.estimate_tokens(best.format(""))
+                if available < self.min_truncated_tokens:
+                    continue
+                cut = best.text[:int(available * self.chars_per_token) - 1]
+                cut = cut[:cut.rfind(" ")] if " " in cut else cut
+                text = best.format(cut + "…")
+                cost = self.estimate_tokens(text) + (separator_tokens if parts else 0)
+
+            selected.append(best)
+            parts.append(text)
+            sources.extend(best.metadatas)
+            used += cost
+
+        return parts, sources, used
@@ -0,0 +1,209 @@
+# voice_ai_backend/services/rag/embeddings.py
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Desteklenen CPU backend'leri:
+#   "torch"      : Varsayılan sentence-transformers (PyTorch, float32)
+#   "torch-int8" : PyTorch dinamik int8 quantization (Linear katmanları)
+#   "onnx"       : ONNX Runtime (sentence-transformers backend="onnx"), EMBEDDING_ONNX_FILE ile
+#                  quantize edilmiş dosya seçilebilir (örn. "onnx/model_qint8_avx512.onnx")
+EMBEDDING_BACKENDS = ("torch", "torch-int8", "onnx")
+
+
+class EmbeddingProvider:
+    """
+    Süreç genelinde paylaşılan, tembel (lazy) yüklenen embedding modeli.
+
+    Model ilk kullanımda (veya lifespan içinde `load()` ile) bir kez yüklenir ve
+    kısa bir örnek batch ile ısıtılır. LangChain embedding arayüzüyle uyumludur
+    (`embed_documents`, `embed_query`).
+    """
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, backend: str = "torch",
+                 onnx_file: Optional[str] = None):
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Desteklenmeyen embedding backend'i: {backend}")
+        self.model_name = model_name
+        self.backend = backend
+        self.onnx_file = onnx_file
+
+        self._model = None
+        self._lock = threading.Lock()
+        self.load_seconds: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._model is not None
+
+    def load(self):
+        """Modeli yükler ve ısıtır (zaten yüklüyse hemen döner). Thread-safe."""
+        if self._model is not None:
+            return self._model
+
+        with self._lock:
+            if self._model is None:
+                started = time.perf_counter()
+                print(f"[Embeddings] Model yükleniyor: {self.model_name} (backend={self.backend})...")
+                model = self._build_model()
+                # Isınma: ilk gerçek sorgu tokenizer/graph hazırlığını beklemesin
+                model.encode(["ısınma", "warm up batch"], batch_size=2)
+                self._model = model
+                self.load_seconds = round(time.perf_counter() - started, 2)
+                print(f"[Embeddings] Hazır ({self.load_seconds} sn).")
+        return self._model
+
+    def _build_model(self):
+        from sentence_transformers import SentenceTransformer
+
+        if self.backend == "onnx":
+            try:
+                model_kwargs = {"file_name": self.onnx_file} if self.onnx_file else None
+                return SentenceTransformer(self.model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+            except Exception as e:
+                # optimum / onnxruntime kurulu değilse PyTorch'a dön
+                print(f"⚠️ [Embeddings] ONNX backend yüklenemedi, torch kullanılacak: {e}")
+                return SentenceTransformer(self.model_name, device="cpu")
+
+        model = SentenceTransformer(self.model_name, device="cpu")
+        if self.backend == "torch-int8":
+            import torch
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+
+    # --- LangChain uyumlu arayüz ---
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        texts = [text.replace("\n", " ") for text in texts]
+        return self.load().encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "backend": self.backend,
+            "ready": self.ready,
+            "load_seconds": self.load_seconds,
+        }
+
+
+_providers: Dict[str, EmbeddingProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_embedding_provider(model_name: str = DEFAULT_EMBEDDING_MODEL) -> EmbeddingProvider:
+    """
+    Model adına göre süreç genelinde tek bir provider döner (aynı ağırlıklar iki kez yüklenmez).
+    Backend EMBEDDING_BACKEND / EMBEDDING_ONNX_FILE ortam değişkenlerinden okunur.
+    """
+    with _providers_lock:
+        provider = _providers.get(model_name)
+        if provider is None:
+            provider = EmbeddingProvider(
+                model_name=model_name,
+                backend=os.getenv("EMBEDDING_BACKEND", "torch"),
+                onnx_file=os.getenv("EMBEDDING_ONNX_FILE") or None,
+            )
+            _providers[model_name] = provider
+        return provider
+
+
+class EmbeddingMicroBatcher:
+    """
+    Eşzamanlı sorgu embedding isteklerini (tüm kullanıcılardan) kısa bir zaman penceresinde
+    toplayıp tek bir batch forward pass ile hesaplar ve sonuçları isteklere dağıtır.
+
+    Aynı anda tek bir batch çalışır; o sırada gelen istekler bir sonraki batch'te birleşir.
+    """
+
+    def __init__(self, provider: EmbeddingProvider, window_ms: float = 5.0, max_batch_size: int = 64):
+        """
+        Args:
+            window_ms (float): İlk istekten sonra diğer istekler için beklenecek süre.
+            max_batch_size (int): Tek forward pass'teki en fazla metin sayısı.
+        """
+        self.provider = provider
+        self.window_seconds = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrikler
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+
+        if not self._running:
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window_seconds, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._running or not self._pending:
+            return
+
+        batch = self._pending[:self.max_batch_size]
+        self._pending = self._pending[self.max_batch_size:]
+        self._running = True
+        self._task = asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch: List[tuple]) -> None:
+        started = time.perf_counter()
+        for _, _, queued_at in batch:
+            wait = started - queued_at
+            self.total_wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+        # Aynı metin batch içinde bir kez hesaplanır
+        unique_texts = list(dict.fromkeys(text for text, _, _ in batch))
+        try:
+            vectors = await asyncio.to_thread(self.provider.embed_documents, unique_texts)
+            by_text = dict(zip(unique_texts, vectors))
+            for text, future, _ in batch:
+                if not future.done():
+                    future.set_result(by_text[text])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.batches += 1
+            self.items += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self._running = False
+            # Batch çalışırken biriken istekleri hemen işle
+            if self._pending:
+                self._flush()
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "avg_queue_delay_ms": round(self.total_wait_seconds / self.items * 1000, 2) if self.items else 0.0,
+            "max_queue_delay_ms": round(self.max_wait_seconds * 1000, 2),
+            "pending": len(self._pending),
+        }
@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import List, Tuple
 from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
@@ -47,6 +47,41 @@ class DocumentIngestor:
         print(f"[Ingestion] '{os.path.basename(file_path)}' işlendi. Toplam parça sayısı: {len(chunks)}")
         return chunks
 
+    def count_units(self, file_path: str) -> int:
+        """
+        Dosyanın parça parça işlenebilecek birim sayısını döner (PDF için sayfa sayısı,
+        diğer formatlar tek birim).
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Dosya bulunamadı: {file_path}")
+        if file_path.endswith(".pdf"):
+            from pypdf import PdfReader
+            return len(PdfReader(file_path).pages)
+        # Desteklenmeyen formatlar burada da erken hata versin
+        self._get_loader(file_path)
+        return 1
+
+    def load_and_split_range(self, file_path: str, start: int, end: int) -> List[Document]:
+        """
+        [start, end) aralığındaki sayfaları yükler ve parçalara ayırır.
+        PDF dışı formatlarda tüm dosya tek birimdir.
+        """
+        if not file_path.endswith(".pdf"):
+            return self.load_and_split(file_path)
+
+        from pypdf import PdfReader
+        reader = PdfReader(file_path)
+        pages = []
+        for page_number in range(start, min(end, len(reader.pages))):
+            try:
+                text = reader.pages[page_number].extract_text() or ""
+            except Exception as e:
+                raise RuntimeError(f"Sayfa okunamadı ({file_path}, sayfa {page_number}): {str(e)}")
+            # PyPDFLoader ile aynı metadata formatı
+            pages.append(Document(page_content=text, metadata={"source": file_path, "page": page_number}))
+
+        return self.text_splitter.split_documents(pages)
+
     def _get_loader(self, file_path: str):
         """Dosya uzantısına göre doğru Loader sınıfını döndürür."""
         if file_path.endswith(".pdf"):
@@ -56,4 +91,17 @@ class DocumentIngestor:
         elif file_path.endswith(".txt"):
             return TextLoader(file_path, encoding="utf-8")
         else:
-            raise ValueError(f"Desteklenmeyen dosya formatı: {file_path}")
\ No newline at end of file
+            raise ValueError(f"Desteklenmeyen dosya formatı: {file_path}")
+
+
+# --- Process pool yardımcıları (pickle edilebilmeleri için modül seviyesinde) ---
+def count_units_in_process(file_path: str) -> int:
+    return DocumentIngestor().count_units(file_path)
+
+
+def load_and_split_range_in_process(file_path: str, start: int, end: int, chunk_size: int,
+                                    chunk_overlap: int) -> List[Tuple[str, dict]]:
+    """Ayrı süreçte çalışır; Document yerine (metin, metadata) döner."""
+    ingestor = DocumentIngestor(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = ingestor.load_and_split_range(file_path, start, end)
+    return [(chunk.page_content, chunk.metadata) for chunk in chunks]
@@ -0,0 +1,278 @@
+# voice_ai_backend/services/rag/jobs.py
+import asyncio
+import multiprocessing
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager, nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+
+from .ingestion import count_units_in_process, load_and_split_range_in_process
+from .manifest import file_sha256
+from .pipeline import RAGPipeline
+
+
+class IngestionJob:
+    """Tek bir doküman yükleme işinin durumu (status endpoint'i bu bilgiyi döner)."""
+
+    def __init__(self, user_id: int, file_path: str, filename: str):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.file_path = file_path
+        self.filename = filename
+        self.status = "queued"  # queued -> running -> done | failed
+        self.pages_total: Optional[int] = None
+        self.pages_processed = 0
+        self.chunks_processed = 0
+        # Artımlı yükleme: yeniden embed edilen ve silinen parçalar
+        self.chunks_embedded = 0
+        self.chunks_deleted = 0
+        # Birebir aynı dosya daha önce yüklendiyse hiç işlenmez
+        self.skipped = False
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "pages_total": self.pages_total,
+            "pages_processed": self.pages_processed,
+            "chunks_processed": self.chunks_processed,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_deleted": self.chunks_deleted,
+            "skipped": self.skipped,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class IngestionJobManager:
+    """
+    Doküman yüklemelerini arka planda çalıştıran iş yöneticisi.
+
+    Dosya okuma ve parçalama (CPU yoğun) bir process pool'da sayfa aralıkları halinde
+    yapılır; üretilen parçalar sabit boyutlu batch'ler halinde embed edilip vektör
+    veritabanına yazılır. Bir sonraki sayfa aralığı, önceki batch'ler yazılırken okunur.
+    Event loop hiçbir aşamada bloklanmaz.
+    """
+
+    def __init__(self, pipeline: RAGPipeline, max_workers: int = 2, pages_per_task: int = 8,
+                 batch_size: int = 64, max_concurrent_jobs: int = 2, max_finished_jobs: int = 256,
+                 on_complete: Optional[Callable[[int], None]] = None):
+        """
+        Args:
+            max_workers (int): Okuma/parçalama için process pool boyutu.
+            pages_per_task (int): Bir process görevinde işlenecek sayfa sayısı.
+            batch_size (int): Tek seferde embed edilip yazılacak parça sayısı.
+            max_concurrent_jobs (int): Aynı anda çalışabilecek yükleme işi (fazlası kuyrukta bekler).
+            max_finished_jobs (int): Durumu sorgulanabilmesi için bellekte tutulan biten iş sayısı.
+            on_complete: İş başarıyla bitince kullanıcı id'si ile çağrılır (önbellek temizliği vb.).
+        """
+        self.pipeline = pipeline
+        self.max_workers = max(1, max_workers)
+        self.pages_per_task = max(1, pages_per_task)
+        self.batch_size = max(1, batch_size)
+        self.max_finished_jobs = max_finished_jobs
+        self.on_complete = on_complete
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = asyncio.Semaphore(max(1, max_concurrent_jobs))
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Aynı kaynağın eşzamanlı iki yüklemesi manifest'i bozmasın diye sıraya girer
+        # (kilit, bekleyen + çalışan iş sayısı); sayı sıfırlanınca kayıt silinir
+        self._source_locks: Dict[Tuple[int, str], Tuple[asyncio.Lock, int]] = {}
+
+        # Metrikler
+        self.jobs_done = 0
+        self.jobs_failed = 0
+        self.jobs_skipped = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Pool ilk yüklemede oluşturulur (yükleme yapılmayan worker'larda süreç açılmaz)
+        if self._executor is None:
+            # spawn: fork, event loop'un thread'lerini ve kilitlerini (embedding modeli, HTTP
+            # istemcileri) kopyalayıp çocukta kilitlenebilir; çocuk yalnızca ingestion'ı import eder
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def submit(self, user_id: int, file_path: str, filename: str) -> IngestionJob:
+        """İşi kuyruğa alır ve hemen döner. Dosya iş bitince silinir."""
+        job = IngestionJob(user_id, file_path, filename)
+        self._jobs[job.id] = job
+        task = asyncio.create_task(self._run(job))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        self._prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    async def shutdown(self) -> None:
+        """Bekleyen işleri iptal eder ve process pool'u kapatır."""
+        for task in list(self._tasks.values()):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        statuses = [job.status for job in self._jobs.values()]
+        return {
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running"),
+            "done": self.jobs_done,
+            "failed": self.jobs_failed,
+            "skipped": self.jobs_skipped,
+        }
+
+    # --- İç işleyiş ---
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    @asynccontextmanager
+    async def _source_lock(self, key: Tuple[int, str]):
+        lock, users = self._source_locks.get(key, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._source_locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._source_locks[key]
+            if users <= 1:
+                del self._source_locks[key]
+            else:
+                self._source_locks[key] = (lock, users - 1)
+
+    async def _run(self, job: IngestionJob) -> None:
+        try:
+            async with self._source_lock((job.user_id, job.filename)), self._slots:
+                job.status = "running"
+                job.started_at = time.time()
+                # Yükleme bitip kaydedilene kadar kullanıcının BM25 indeksi LRU'dan düşmez
+                lexical_index = self.pipeline.store.lexical_index
+                with lexical_index.pinned(job.user_id) if lexical_index is not None else nullcontext():
+                    await self._ingest(job)
+            job.status = "done"
+            self.jobs_done += 1
+            if job.skipped:
+                self.jobs_skipped += 1
+                print(f"[Ingestion] {job.filename}: dosya değişmemiş, atlandı.")
+                return
+            if self.on_complete:
+                self.on_complete(job.user_id)
+            print(f"[Ingestion] {job.filename}: {job.chunks_processed} parça "
+                  f"({job.chunks_embedded} yeni, {job.chunks_deleted} silindi).")
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error = "İş iptal edildi"
+            self.jobs_failed += 1
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            self.jobs_failed += 1
+            print(f"❌ [Ingestion Hata] {job.filename}: {e}")
+            # Kısmen yazılan parçalar da cevapları etkiler
+            if job.chunks_processed and self.on_complete:
+                self.on_complete(job.user_id)
+        finally:
+            job.finished_at = time.time()
+            if os.path.exists(job.file_path):
+                os.remove(job.file_path)
+            self._prune()
+
+    async def _ingest(self, job: IngestionJob) -> None:
+        loop = asyncio.get_running_loop()
+        store = self.pipeline.store
+
+        file_hash = await asyncio.to_thread(file_sha256, job.file_path)
+        previous_hash, previous_ids = await store.source_state_async(job.user_id, job.filename)
+        if previous_hash == file_hash:
+            job.skipped = True
+            return
+
+        executor = self._get_executor()
+        ingestor = self.pipeline.ingestor
+        job.pages_total = await loop.run_in_executor(executor, count_units_in_process, job.file_path)
+        ranges = [(start, min(start + self.pages_per_task, job.pages_total))
+                  for start in range(0, job.pages_total, self.pages_per_task)]
+
+        def split(page_range):
+            return loop.run_in_executor(
+                executor, load_and_split_range_in_process, job.file_path, page_range[0], page_range[1],
+                ingestor.chunk_size, ingestor.chunk_overlap,
+            )
+
+        # Pool'daki tüm worker'lar meşgul olsun diye birkaç aralık önden okunur
+        pending = [split(page_range) for page_range in ranges[:self.max_workers]]
+        next_range = len(pending)
+        buffer: List[Document] = []
+        written_ids: List[str] = []
+        occurrences: Dict[str, int] = {}
+
+        async def write(batch: List[Document]) -> None:
+            ids, embedded = await store.add_documents_async(
+                user_id=job.user_id, documents=batch, source_name=job.filename,
+                existing_ids=previous_ids, occurrences=occurrences,
+            )
+            written_ids.extend(ids)
+            job.chunks_processed += len(ids)
+            job.chunks_embedded += embedded
+
+        try:
+            for start, end in ranges:
+                chunks = await pending.pop(0)
+                if next_range < len(ranges):
+                    pending.append(split(ranges[next_range]))
+                    next_range += 1
+
+                buffer.extend(Document(page_content=text, metadata=meta) for text, meta in chunks)
+                while len(buffer) >= self.batch_size:
+                    await write(buffer[:self.batch_size])
+                    buffer = buffer[self.batch_size:]
+                job.pages_processed = end
+
+            if buffer:
+                await write(buffer)
+        except BaseException:
+            if written_ids:
+                await self._finalize(job, None, written_ids, previous_ids, complete=False)
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+
+        if not written_ids:
+            # Boş veya okunamayan dosya: kaynağın mevcut parçaları silinmez, iş hata ile biter
+            raise ValueError("Boş dosya: metin çıkarılamadı")
+
+        job.chunks_deleted = await self._finalize(job, file_hash, written_ids, previous_ids, complete=True)
+
+    async def _finalize(self, job: IngestionJob, file_hash: Optional[str], written_ids: List[str],
+                        previous_ids: Set[str], complete: bool) -> int:
+        # İptal edilen işte de manifest yazılsın (yazılan parçalar kaybolmasın)
+        return await asyncio.shield(self.pipeline.store.finalize_source_async(
+            job.user_id, job.filename, file_hash, written_ids, previous_ids, complete=complete,
+        ))
@@ -0,0 +1,225 @@
+# voice_ai_backend/services/rag/lexical.py
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set, Tuple
+
+from services.text_segmenter import turkish_lower
+from .cache import LRUCache
+
+LEXICAL_INDEX_PATH = os.path.join("chroma_db", "bm25")
+
+# Sondan eklemeli Türkçe için basit ve etkili kök yaklaşımı: kelimenin ilk 5 harfi
+# ("faturalarım", "faturanın" -> "fatur")
+STEM_LENGTH = 5
+
+STOPWORDS = {
+    "ve", "veya", "ile", "bir", "bu", "şu", "da", "de", "mi", "mı", "mu", "mü", "ne", "için",
+    "gibi", "daha", "çok", "en", "ki", "ama", "fakat", "ya", "her", "olan", "olarak", "nasıl",
+    "neden", "hangi", "var", "yok", "ben", "sen", "biz", "siz", "onlar", "the", "and", "or", "of",
+}
+
+# Ürün kodları ("AB-1234", "v2.1", "X/500") tek token olarak da tutulur
+TOKEN_RE = re.compile(r"[0-9a-zçğıöşüâîû]+(?:[-./][0-9a-zçğıöşüâîû]+)*")
+CODE_SEPARATORS = re.compile(r"[-./]")
+APOSTROPHE_SUFFIX = re.compile(r"['’]\w*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Türkçe'ye uygun tokenizasyon: I/İ doğru küçültülür, kesme işaretinden sonraki ekler
+    ("İstanbul'da") atılır, kelimeler köke kısaltılır. Rakam veya ayraç içeren tokenlar
+    (ürün kodu, model adı) kısaltılmaz; ayraçsız ve parçalı halleri de eklenir.
+    """
+    text = APOSTROPHE_SUFFIX.sub("", turkish_lower(unicodedata.normalize("NFC", text)))
+    tokens = []
+    for match in TOKEN_RE.findall(text):
+        if any(ch.isdigit() for ch in match) or CODE_SEPARATORS.search(match):
+            tokens.append(match)
+            parts = [part for part in CODE_SEPARATORS.split(match) if part]
+            if len(parts) > 1:
+                tokens.append("".join(parts))
+                tokens.extend(part for part in parts if len(part) > 1)
+        elif len(match) > 1 and match not in STOPWORDS:
+            tokens.append(match[:STEM_LENGTH])
+    return tokens
+
+
+class BM25Index:
+    """Tek bir kullanıcının parçaları üzerinde artımlı güncellenebilen BM25 ters indeksi."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_terms: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+
+    def add(self, chunk_id: str, text: str) -> None:
+        self._add_terms(chunk_id, dict(Counter(tokenize(text))))
+
+    def remove(self, chunk_id: str) -> None:
+        terms = self.doc_terms.pop(chunk_id, None)
+        if terms is None:
+            return
+        self.total_length -= self.doc_lengths.pop(chunk_id)
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(chunk_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """En yüksek BM25 skoruna sahip k parçayı (kimlik, skor) olarak döner."""
+        if not self.doc_terms:
+            return []
+        n_docs = len(self.doc_terms)
+        avg_length = self.total_length / n_docs or 1.0
+
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for chunk_id, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[chunk_id] / avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def to_dict(self) -> dict:
+        return {"docs": self.doc_terms}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BM25Index":
+        index = cls()
+        for chunk_id, terms in data.get("docs", {}).items():
+            index._add_terms(chunk_id, terms)
+        return index
+
+    def _add_terms(self, chunk_id: str, terms: Dict[str, int]) -> None:
+        # Aynı parça tekrar eklenirse (yeniden yükleme) önce eski hali çıkarılır
+        self.remove(chunk_id)
+        self.doc_terms[chunk_id] = terms
+        length = sum(terms.values())
+        self.doc_lengths[chunk_id] = length
+        self.total_length += length
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[chunk_id] = tf
+
+
+class LexicalIndex:
+    """
+    Kullanıcı başına BM25 indekslerini diskte (JSON) saklayan ve bellekte LRU ile tutan yönetici.
+
+    Parçalar vektör veritabanına yazılırken indekse eklenir, silinirken çıkarılır; indeks
+    kaynak yüklemesi tamamlandığında diske yazılır. Başka bir worker indeksi güncellediyse
+    dosyanın değişme zamanından anlaşılır ve yeniden okunur.
+
+    Yüklemesi süren kullanıcıların indeksi sabitlenir (pin): kaydedilmemiş değişiklikler LRU'dan
+    düşürülüp kaybolmaz ve diskteki eski sürümle değiştirilmez. Son sabitleme kalkarken
+    kaydedilmemiş değişiklik varsa indeks diske yazılır.
+    """
+
+    def __init__(self, path: str = LEXICAL_INDEX_PATH, max_users_in_memory: int = 128):
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+        self._lock = threading.RLock()
+        self._indexes = LRUCache(max_entries=max_users_in_memory)
+        self._mtimes: Dict[int, Optional[float]] = {}
+        # Sabitlenmiş kullanıcılar: (indeks, sabitleme sayısı)
+        self._pinned: Dict[int, Tuple[BM25Index, int]] = {}
+        self._dirty: Set[int] = set()
+
+    def exists(self, user_id: int) -> bool:
+        return os.path.exists(self._file(user_id))
+
+    def add_chunks(self, user_id: int, chunk_ids: List[str], texts: List[str]) -> None:
+        with self._lock:
+            index = self._get(user_id)
+            for chunk_id, text in zip(chunk_ids, texts):
+                index.add(chunk_id, text)
+            self._dirty.add(user_id)
+
+    def remove_chunks(self, user_id: int, chunk_ids: List[str]) -> None:
+        with self._lock:
+            index = self._get(user_id)
+            for chunk_id in chunk_ids:
+                index.remove(chunk_id)
+            self._dirty.add(user_id)
+
+    def save(self, user_id: int) -> None:
+        """Kullanıcının indeksini atomik olarak diske yazar."""
+        with self._lock:
+            index = self._get(user_id)
+            path = self._file(user_id)
+            tmp_path = f"{path}.tmp{threading.get_ident()}"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index.to_dict(), f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._mtimes[user_id] = os.path.getmtime(path)
+            self._dirty.discard(user_id)
+
+    @contextmanager
+    def pinned(self, user_id: int):
+        """Blok süresince kullanıcının indeksini bellekte sabit tutar (ör. bir kaynak yüklemesi)."""
+        with self._lock:
+            index, count = self._pinned.get(user_id) or (self._get(user_id), 0)
+            self._pinned[user_id] = (index, count + 1)
+        try:
+            yield
+        finally:
+            with self._lock:
+                index, count = self._pinned[user_id]
+                if count > 1:
+                    self._pinned[user_id] = (index, count - 1)
+                else:
+                    if user_id in self._dirty:
+                        self.save(user_id)
+                    del self._pinned[user_id]
+                    self._indexes.put(user_id, index)
+
+    def search(self, user_id: int, query: str, k: int) -> List[Tuple[str, float]]:
+        with self._lock:
+            return self._get(user_id).search(query, k)
+
+    def stats(self) -> dict:
+        return {"users_in_memory": self._indexes.stats(), "pinned": len(self._pinned)}
+
+    # --- İç işleyiş ---
+    def _file(self, user_id: int) -> str:
+        return os.path.join(self.path, f"user_{user_id}.json")
+
+    def _get(self, user_id: int) -> BM25Index:
+        pinned = self._pinned.get(user_id)
+        if pinned is not None:
+            return pinned[0]
+
+        path = self._file(user_id)
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        index = self._indexes.get(user_id)
+        if index is not None and self._mtimes.get(user_id) == mtime:
+            return index
+
+        index = BM25Index()
+        if mtime is not None:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    index = BM25Index.from_dict(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ [BM25] İndeks okunamadı (user {user_id}): {e}")
+        self._indexes.put(user_id, index)
+        self._mtimes[user_id] = mtime
+        return index
@@ -0,0 +1,76 @@
+# voice_ai_backend/services/rag/manifest.py
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+MANIFEST_PATH = os.path.join("chroma_db", "manifests")
+
+
+def file_sha256(file_path: str) -> str:
+    """Dosyanın içerik özetini parça parça okuyarak hesaplar (büyük dosyalar belleğe alınmaz)."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SourceManifest:
+    """
+    Kullanıcı başına, yüklenen her kaynak dosya için dosya özeti ve parça kimliklerini tutar.
+
+    Yeniden yüklemede yalnızca yeni/değişen parçaların embed edilmesi, artık bulunmayan
+    parçaların silinmesi ve birebir aynı dosyanın hiç işlenmemesi bu kayıt üzerinden yapılır.
+    Her kullanıcı için tek bir JSON dosyası atomik olarak yazılır; birden fazla worker
+    aynı dosyayı gördüğü için kayıt bellekte tutulmaz, her işlemde diskten okunur.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, source_name: str) -> Optional[dict]:
+        with self._lock:
+            return self._load(user_id).get(source_name)
+
+    def set(self, user_id: int, source_name: str, file_hash: Optional[str], chunk_ids: List[str]) -> None:
+        """
+        Kaynağın kaydını günceller. file_hash None ise (yarım kalan yükleme) aynı dosya
+        bir sonraki yüklemede atlanmaz, yeniden işlenir.
+        """
+        with self._lock:
+            entries = self._load(user_id)
+            entries[source_name] = {"file_hash": file_hash, "chunk_ids": chunk_ids, "updated_at": time.time()}
+            self._save(user_id, entries)
+
+    def remove(self, user_id: int, source_name: str) -> None:
+        with self._lock:
+            entries = self._load(user_id)
+            if entries.pop(source_name, None) is not None:
+                self._save(user_id, entries)
+
+    # --- İç işleyiş ---
+    def _file(self, user_id: int) -> str:
+        return os.path.join(self.path, f"user_{user_id}.json")
+
+    def _load(self, user_id: int) -> Dict[str, dict]:
+        try:
+            with open(self._file(user_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            # Bozuk kayıt: kaynaklar yeniden yüklendiğinde baştan oluşur
+            print(f"⚠️ [Manifest] Okunamadı (user {user_id}): {e}")
+            return {}
+
+    def _save(self, user_id: int, entries: Dict[str, dict]) -> None:
+        path = self._file(user_id)
+        tmp_path = f"{path}.tmp{threading.get_ident()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
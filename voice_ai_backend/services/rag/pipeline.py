@@ -1,6 +1,6 @@
 # voice_ai_backend/services/rag/pipeline.py
-import os
-from typing import List, Tuple, Dict
+from typing import List, Optional, Tuple, Dict
+from .context import ContextAssembler
 from .ingestion import DocumentIngestor
 from .store import VectorStore
 
@@ -10,49 +10,44 @@ class RAGPipeline:
     Asenkron RAG Pipeline.
     """
 
-    def __init__(self):
+    def __init__(self, store: Optional[VectorStore] = None, retriever=None,
+                 assembler: Optional[ContextAssembler] = None, fetch_multiplier: int = 2):
+        """
+        Args:
+            retriever (HybridRetriever): Verilirse arama vektör + BM25 birleşimiyle yapılır,
+                verilmezse yalnızca vektör araması kullanılır.
+            assembler (ContextAssembler): Bağlamı örtüşme birleştirme, MMR ve token bütçesiyle oluşturur.
+            fetch_multiplier (int): Assembler'ın seçim yapabilmesi için k * fetch_multiplier aday getirilir.
+        """
         self.ingestor = DocumentIngestor()
-        self.store = VectorStore()
-
-    async def process_document_async(self, user_id: int, file_path: str) -> dict:
-        """Dokümanı asenkron olarak işler ve kaydeder."""
-        filename = os.path.basename(file_path)
-
-        # Chunking işlemi CPU intensive olabilir ama şimdilik senkron kalabilir
-        # (çok büyük dosyalar için burası da async yapılabilir)
-        chunks = self.ingestor.load_and_split(file_path)
-
-        if not chunks:
-            return {"status": "warning", "message": "Boş dosya", "chunks": 0}
+        self.store = store or VectorStore()
+        self.retriever = retriever
+        self.assembler = assembler or ContextAssembler()
+        self.fetch_multiplier = max(1, fetch_multiplier)
 
-        # Kaydetme işlemi (Async)
-        await self.store.add_documents_async(user_id=user_id, documents=chunks, source_name=filename)
-
-        return {
-            "status": "success",
-            "filename": filename,
-            "chunks_processed": len(chunks)
-        }
+    async def embed_query_async(self, query_text: str) -> List[float]:
+        """Sorgunun embedding vektörünü döner (cevap önbelleği için)."""
+        return await self.store.embed_query_async(query_text)
 
     async def get_context_async(self, user_id: int, query_text: str, k: int = 3) -> Tuple[str, List[Dict]]:
         """
         Sorgu için bağlamı asenkron olarak getirir.
+        En fazla k blok döner; adaylar k * fetch_multiplier kadar getirilip assembler ile seçilir.
         """
-        # 1. Async Vektör Araması
-        relevant_docs = await self.store.query_async(user_id=user_id, query_text=query_text, k=k)
+        candidates = k * self.fetch_multiplier
+
+        # 1. Async Arama (hibrit: vektör + BM25, aksi halde yalnızca vektör)
+        if self.retriever is not None:
+            relevant_docs = await self.retriever.retrieve_async(user_id=user_id, query_text=query_text, k=candidates)
+        else:
+            relevant_docs = await self.store.query_async(user_id=user_id, query_text=query_text, k=candidates)
 
         if not relevant_docs:
             return "", []
 
-        # 2. Formatlama (Hızlı olduğu için senkron kalabilir)
-        formatted_context = []
-        sources = []
-
-        for doc in relevant_docs:
-            source_name = doc.metadata.get("source", "Bilinmeyen")
-            content = doc.page_content.replace("\n", " ")
-            formatted_context.append(f"[KAYNAK: {source_name}]\n{content}")
-            sources.append(doc.metadata)
-
-        full_context_text = "\n\n---\n\n".join(formatted_context)
-        return full_context_text, sources
\ No newline at end of file
+        # 2. Birleştirme + MMR + token bütçesi (hızlı olduğu için senkron kalabilir)
+        full_context_text, sources, report = self.assembler.assemble(relevant_docs, max_blocks=k)
+        print(f"[RAG] Bağlam: {report['tokens_used']} token "
+              f"(kırpılan {report['tokens_trimmed']}, tekrar {report['tokens_deduplicated']}, "
+              f"birleşen {report['chunks_merged']})")
+        return full_context_text, sources
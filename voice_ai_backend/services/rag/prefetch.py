@@ -0,0 +1,201 @@
+# voice_ai_backend/services/rag/prefetch.py
+import asyncio
+import math
+import re
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from .pipeline import RAGPipeline
+
+# get_context_async sonucu: (bağlam, kaynaklar)
+ContextResult = Tuple[str, List[Dict]]
+
+
+class _Speculation:
+    """Bir kullanıcı için kısmi transkripsiyonla başlatılmış arama."""
+
+    def __init__(self, text: str, embedding_task: asyncio.Task, context_task: asyncio.Task, version: int):
+        self.text = text
+        self.embedding_task = embedding_task
+        self.context_task = context_task
+        self.version = version
+        self.created_at = time.monotonic()
+
+    def cancel(self) -> None:
+        self.embedding_task.cancel()
+        self.context_task.cancel()
+
+
+class RetrievalPrefetcher:
+    """
+    Kullanıcı hâlâ konuşurken kısmi transkripsiyonlarla bağlam aramasını önceden başlatır.
+
+    Sohbet isteği geldiğinde nihai soru, önceden aranan metne yeterince benziyorsa
+    (aynı metin veya embedding kosinüs benzerliği eşik üstünde) hazır sonuç kullanılır;
+    aksi halde arama normal yoldan yapılır. Kullanıcı başına aynı anda tek bir
+    spekülatif arama çalışır; arada gelen yeni metinler birleştirilip en sonuncusuyla
+    tekrar aranır.
+    """
+
+    def __init__(self, rag: RAGPipeline, ttl_seconds: float = 20.0, similarity_threshold: float = 0.9,
+                 min_chars: int = 12, max_concurrent: int = 4, utterance_gap_seconds: float = 8.0):
+        """
+        Args:
+            ttl_seconds (float): Önceden aranan sonucun geçerli sayılacağı süre.
+            similarity_threshold (float): Nihai soru ile kısmi metin arasındaki en düşük kosinüs benzerliği.
+            min_chars (int): Bundan kısa kısmi metinlerle arama yapılmaz.
+            max_concurrent (int): Tüm kullanıcılar için aynı anda çalışabilecek spekülatif arama
+                (gerçek sorguları yavaşlatmaması için; dolu ise yeni spekülasyon atlanır).
+            utterance_gap_seconds (float): Parça parça gelen transkripsiyonda bu kadar sessizlikten
+                sonra gelen metin yeni bir konuşma sayılır.
+        """
+        self.rag = rag
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.min_chars = min_chars
+        self.max_concurrent = max(1, max_concurrent)
+        self.utterance_gap_seconds = utterance_gap_seconds
+
+        self._speculations: Dict[int, _Speculation] = {}
+        self._next_text: Dict[int, str] = {}
+        self._transcripts: Dict[int, Tuple[str, float]] = {}
+        self._active = 0
+
+        # Metrikler
+        self.started = 0
+        self.skipped = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    @staticmethod
+    def _normalize_text(text: str) -> str:
+        return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+    def observe(self, user_id: int, text: str) -> None:
+        """Kullanıcının şu ana kadarki (birikmiş) transkripsiyonunu bildirir."""
+        text = self._normalize_text(text)
+        if len(text) < self.min_chars:
+            return
+
+        current = self._speculations.get(user_id)
+        if current is not None and current.text == text:
+            return
+        if current is not None and not current.context_task.done():
+            # Çalışan arama bitince en güncel metinle tekrar aranır
+            self._next_text[user_id] = text
+            return
+        if self._active >= self.max_concurrent:
+            self.skipped += 1
+            return
+        self._start(user_id, text)
+
+    def observe_fragment(self, user_id: int, fragment: str) -> None:
+        """
+        Parça parça gelen transkripsiyon (POST /transcribe) için: parçayı kullanıcının
+        birikmiş metnine ekler ve onunla arama yapar.
+        """
+        fragment = fragment.strip()
+        if not fragment:
+            return
+        now = time.monotonic()
+        previous, updated_at = self._transcripts.get(user_id, ("", now))
+        if now - updated_at > self.utterance_gap_seconds:
+            previous = ""
+        text = f"{previous} {fragment}".strip()
+        self._transcripts[user_id] = (text, now)
+        self.observe(user_id, text)
+
+    async def take(self, user_id: int, query_text: str) -> Optional[ContextResult]:
+        """
+        Nihai soru için önceden aranmış bağlamı döner; uygun sonuç yoksa None döner
+        (çağıran normal aramaya düşer). Spekülasyon her durumda tüketilir.
+        """
+        self._transcripts.pop(user_id, None)
+        self._next_text.pop(user_id, None)
+        speculation = self._speculations.pop(user_id, None)
+        if speculation is None:
+            return None
+
+        stale = time.monotonic() - speculation.created_at > self.ttl_seconds
+        # Arada doküman yüklendiyse önceki sonuç geçersizdir
+        if stale or speculation.version != self.rag.store.collection_version(user_id):
+            speculation.cancel()
+            self.expired += 1
+            return None
+
+        try:
+            if self._normalize_text(query_text) != speculation.text:
+                partial_embedding, final_embedding = await asyncio.gather(
+                    speculation.embedding_task, self.rag.embed_query_async(query_text)
+                )
+                if self._cosine(partial_embedding, final_embedding) < self.similarity_threshold:
+                    speculation.cancel()
+                    self.misses += 1
+                    return None
+            result = await speculation.context_task
+        except Exception as e:
+            print(f"⚠️ [Prefetch] Spekülatif arama kullanılamadı: {e}")
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return result
+
+    def stats(self) -> dict:
+        used = self.hits + self.misses + self.expired
+        return {
+            "started": self.started,
+            "skipped": self.skipped,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": round(self.hits / used, 3) if used else 0.0,
+            "active": self._active,
+        }
+
+    # --- İç işleyiş ---
+    def _start(self, user_id: int, text: str) -> None:
+        previous = self._speculations.get(user_id)
+        if previous is not None:
+            previous.cancel()
+        self._prune()
+
+        # Embedding ve arama aynı mikro-batch'e düşer; embedding benzerlik kontrolü için ayrıca tutulur
+        embedding_task = asyncio.create_task(self.rag.embed_query_async(text))
+        context_task = asyncio.create_task(self.rag.get_context_async(user_id, text))
+        # Sayaç görev planlanırken artar (aynı döngü adımındaki observe çağrıları sınırı aşamaz);
+        # görev bitince veya başlamadan iptal edilince _on_done'da azalır
+        self._active += 1
+        self._speculations[user_id] = _Speculation(
+            text, embedding_task, context_task, self.rag.store.collection_version(user_id)
+        )
+        self.started += 1
+        context_task.add_done_callback(lambda task: self._on_done(user_id, task))
+        # Sonucu hiç kullanılmayan görevlerin hataları loglara "never retrieved" olarak düşmesin
+        embedding_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    def _on_done(self, user_id: int, task: asyncio.Task) -> None:
+        self._active -= 1
+        if not task.cancelled():
+            task.exception()
+        text = self._next_text.pop(user_id, None)
+        if text is not None and user_id in self._speculations and self._active < self.max_concurrent:
+            self._start(user_id, text)
+
+    def _prune(self) -> None:
+        """Sohbete dönüşmeyen (take çağrılmayan) eski spekülasyonları temizler."""
+        now = time.monotonic()
+        for user_id, speculation in list(self._speculations.items()):
+            if now - speculation.created_at > self.ttl_seconds and speculation.context_task.done():
+                del self._speculations[user_id]
+        for user_id, (_, updated_at) in list(self._transcripts.items()):
+            if now - updated_at > self.utterance_gap_seconds:
+                del self._transcripts[user_id]
+
+    @staticmethod
+    def _cosine(first: List[float], second: List[float]) -> float:
+        dot = sum(a * b for a, b in zip(first, second))
+        norm = math.sqrt(sum(a * a for a in first)) * math.sqrt(sum(b * b for b in second))
+        return dot / norm if norm else 0.0
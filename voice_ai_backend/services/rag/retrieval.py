@@ -0,0 +1,65 @@
+# voice_ai_backend/services/rag/retrieval.py
+import asyncio
+import heapq
+from typing import Dict, List, Tuple
+
+from langchain_core.documents import Document
+
+from .lexical import LexicalIndex
+from .store import VectorStore
+
+
+class HybridRetriever:
+    """
+    Vektör araması ile BM25 sonuçlarını Reciprocal Rank Fusion (RRF) ile birleştirir.
+
+    Anlamsal arama eş anlamlıları, BM25 ise ürün kodu, isim ve birebir terimleri yakalar;
+    böylece daha küçük k ile aynı geri çağırma (recall) elde edilir.
+    """
+
+    def __init__(self, store: VectorStore, index: LexicalIndex, rrf_k: int = 60, candidate_multiplier: int = 3):
+        """
+        Args:
+            rrf_k (int): RRF sabiti; skor = Σ 1 / (rrf_k + sıra).
+            candidate_multiplier (int): Her iki yöntemden k * candidate_multiplier aday alınır.
+        """
+        self.store = store
+        self.index = index
+        self.rrf_k = rrf_k
+        self.candidate_multiplier = max(1, candidate_multiplier)
+
+    async def retrieve_async(self, user_id: int, query_text: str, k: int = 3) -> List[Document]:
+        if self.store.has_documents_hint(user_id) is False:
+            return []
+
+        candidates = k * self.candidate_multiplier
+        vector_docs, lexical_hits = await asyncio.gather(
+            self.store.query_async(user_id=user_id, query_text=query_text, k=candidates),
+            asyncio.to_thread(self._search_lexical, user_id, query_text, candidates),
+        )
+
+        scores: Dict[str, float] = {}
+        docs_by_id: Dict[str, Document] = {}
+        for rank, doc in enumerate(vector_docs):
+            chunk_id = doc.metadata["chunk_id"]
+            docs_by_id[chunk_id] = doc
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1 / (self.rrf_k + rank + 1)
+        for rank, (chunk_id, _) in enumerate(lexical_hits):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1 / (self.rrf_k + rank + 1)
+
+        top_ids = [chunk_id for chunk_id, _ in heapq.nlargest(k, scores.items(), key=lambda item: item[1])]
+
+        # Yalnızca BM25'in bulduğu parçaların metni vektör veritabanından okunur
+        missing = [chunk_id for chunk_id in top_ids if chunk_id not in docs_by_id]
+        if missing:
+            for doc in await self.store.get_documents_async(user_id, missing):
+                docs_by_id[doc.metadata["chunk_id"]] = doc
+
+        return [docs_by_id[chunk_id] for chunk_id in top_ids if chunk_id in docs_by_id]
+
+    def _search_lexical(self, user_id: int, query_text: str, k: int) -> List[Tuple[str, float]]:
+        self.store.ensure_lexical_index(user_id)
+        if not self.index.exists(user_id):
+            # Kullanıcının parçası yok: bellekte de boş indeks açılmaz
+            return []
+        return self.index.search(user_id, query_text, k)
@@ -1,40 +1,119 @@
 # voice_ai_backend/services/rag/store.py
 import asyncio
-import chromadb
-from typing import List
+import hashlib
+import re
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
 from langchain_core.documents import Document
-from langchain_community.embeddings import SentenceTransformerEmbeddings
-
-CHROMA_PATH = "chroma_db"
+from .embeddings import DEFAULT_EMBEDDING_MODEL, EmbeddingMicroBatcher, get_embedding_provider
+from .backends import ChromaBackend, Chunk, VectorBackend
+from .cache import LRUCache
+from .manifest import MANIFEST_PATH, SourceManifest
 
 
 class VectorStore:
     """
     Vektör veritabanı işlemlerini yöneten asenkron sınıf.
+    Parçaların saklanması ve aranması değiştirilebilir bir backend'e (Chroma, NumPy) devredilir.
     """
 
-    def __init__(self, embedding_model_name: str = "all-MiniLM-L6-v2"):
-        # Embedding modeli CPU'yu yorar, bu yüzden yüklenirken log basıyoruz
-        print(f"[VectorStore] Model yükleniyor: {embedding_model_name}...")
-        self.client = chromadb.PersistentClient(path=CHROMA_PATH)
-        self.embedding_fn = SentenceTransformerEmbeddings(model_name=embedding_model_name)
+    def __init__(self, embedding_model_name: str = DEFAULT_EMBEDDING_MODEL, batch_window_ms: float = 5.0,
+                 max_batch_size: int = 64, embedding_cache_size: int = 4096, result_cache_size: int = 2048,
+                 result_cache_ttl: float = 600.0, collection_cache_size: int = 256,
+                 missing_collection_ttl: float = 30.0, lexical_index=None,
+                 backend: Optional[VectorBackend] = None):
+        """
+        Args:
+            batch_window_ms (float): Eşzamanlı sorgu embedding'lerinin tek batch'te toplanacağı pencere.
+            max_batch_size (int): Tek batch'teki en fazla sorgu.
+            embedding_cache_size (int): Önbellekte tutulacak sorgu embedding'i sayısı (0 ise kapalı).
+            result_cache_size (int): Önbellekte tutulacak arama sonucu sayısı (0 ise kapalı).
+            result_cache_ttl (float): Arama sonuçlarının geçerlilik süresi (diğer worker'lardaki
+                yüklemeler bu süre sonunda görünür olur).
+            collection_cache_size (int): Bellekte tutulacak koleksiyon handle'ı sayısı (varsayılan Chroma backend'i).
+            missing_collection_ttl (float): Koleksiyonu olmayan kullanıcı için Chroma'ya yeniden
+                bakmadan boş sonuç dönülecek süre (varsayılan Chroma backend'i).
+            lexical_index (LexicalIndex): Verilirse parçalar yazılırken/silinirken BM25 indeksi de
+                güncellenir (hibrit arama için, bkz. retrieval.py).
+            backend (VectorBackend): Depolama backend'i; verilmezse Chroma kullanılır.
+        """
+        self.backend = backend or ChromaBackend(collection_cache_size=collection_cache_size,
+                                                missing_collection_ttl=missing_collection_ttl)
+        # Paylaşılan embedding modeli ilk kullanımda (veya lifespan'de) yüklenir
+        self.embedding_fn = get_embedding_provider(embedding_model_name)
+        # Tüm kullanıcıların sorgu embedding'leri mikro-batch'lerle hesaplanır
+        self.query_batcher = EmbeddingMicroBatcher(self.embedding_fn, window_ms=batch_window_ms,
+                                                   max_batch_size=max_batch_size)
+
+        # Tekrarlanan sorular için önbellekler. Sonuç anahtarı koleksiyon sürümünü içerir;
+        # sürüm her doküman eklemede artar, böylece yükleme sonrası eski sonuç dönmez.
+        self.embedding_cache = LRUCache(max_entries=embedding_cache_size)
+        self.result_cache = LRUCache(max_entries=result_cache_size, ttl_seconds=result_cache_ttl)
+        self._collection_versions: Dict[int, int] = {}
+
+        # Kaynak başına dosya özeti + parça kimlikleri (artımlı yeniden yükleme için)
+        self.manifest = SourceManifest(self.backend.scoped_path(MANIFEST_PATH))
+        self.lexical_index = lexical_index
         print("[VectorStore] Hazır.")
 
-    def _get_collection(self, user_id: int):
-        collection_name = f"user_{user_id}_docs"
-        return self.client.get_or_create_collection(name=collection_name)
+    def has_documents_hint(self, user_id: int) -> Optional[bool]:
+        """
+        Backend'e sorgu atmadan kullanıcının dokümanı olup olmadığını tahmin eder.
+        True: var, False: yok, None: bilinmiyor.
+        """
+        return self.backend.has_documents_hint(user_id)
+
+    def invalidate_collection(self, user_id: int) -> None:
+        """Koleksiyon silindiğinde veya yeniden oluşturulduğunda handle önbelleğini temizler."""
+        self.backend.invalidate(user_id)
+        self._bump_collection_version(user_id)
+
+    @staticmethod
+    def _normalize_query(query_text: str) -> str:
+        return re.sub(r"\s+", " ", unicodedata.normalize("NFC", query_text)).strip()
+
+    def collection_version(self, user_id: int) -> int:
+        return self._collection_versions.get(user_id, 0)
+
+    def _bump_collection_version(self, user_id: int) -> None:
+        self._collection_versions[user_id] = self.collection_version(user_id) + 1
 
-    async def add_documents_async(self, user_id: int, documents: List[Document], source_name: str) -> None:
-        """Doküman ekleme işlemini thread'e yıkar (Non-blocking)."""
-        await asyncio.to_thread(self._add_documents_sync, user_id, documents, source_name)
+    @staticmethod
+    def _chunk_id(user_id: int, safe_source_name: str, text: str, occurrences: Dict[str, int]) -> str:
+        """
+        Parça kimliği içerik özetinden türetilir: metni değişmeyen parça yeniden yüklemede
+        aynı kimliği alır. Aynı kaynakta tekrar eden metinler sıra numarasıyla ayrılır.
+        """
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:24]
+        occurrence = occurrences.get(digest, 0)
+        occurrences[digest] = occurrence + 1
+        chunk_id = f"doc_{user_id}_{safe_source_name}_{digest}"
+        return chunk_id if occurrence == 0 else f"{chunk_id}_{occurrence}"
 
-    def _add_documents_sync(self, user_id: int, documents: List[Document], source_name: str):
+    async def add_documents_async(self, user_id: int, documents: List[Document], source_name: str,
+                                  existing_ids: Optional[Set[str]] = None,
+                                  occurrences: Optional[Dict[str, int]] = None) -> Tuple[List[str], int]:
+        """
+        Doküman ekleme işlemini thread'e yıkar (Non-blocking).
+        existing_ids içindeki (içeriği değişmemiş) parçalar yeniden embed edilmez. Büyük dosyalar
+        batch'ler halinde eklenirken aynı occurrences sözlüğü tüm batch'lere verilmelidir.
+        (parça kimlikleri, yeni embed edilen parça sayısı) döner.
+        """
+        occurrences = {} if occurrences is None else occurrences
+        try:
+            return await asyncio.to_thread(self._add_documents_sync, user_id, documents, source_name,
+                                           existing_ids or set(), occurrences)
+        finally:
+            # Yarım kalan yazmalarda da önbellekteki sonuçlar geçersiz sayılır
+            self._bump_collection_version(user_id)
+
+    def _add_documents_sync(self, user_id: int, documents: List[Document], source_name: str,
+                            existing_ids: Set[str], occurrences: Dict[str, int]) -> Tuple[List[str], int]:
         """Senkron çalışan asıl ekleme fonksiyonu."""
-        collection = self._get_collection(user_id)
         safe_source_name = source_name.replace(" ", "_")
 
-        ids = [f"doc_{user_id}_{safe_source_name}_{i}" for i in range(len(documents))]
         texts = [doc.page_content for doc in documents]
+        ids = [self._chunk_id(user_id, safe_source_name, text, occurrences) for text in texts]
 
         metadatas = []
         for doc in documents:
@@ -42,37 +121,144 @@ class VectorStore:
             meta["source"] = source_name
             metadatas.append(meta)
 
-        # Embedding hesaplama işlemi ağırdır
-        embeddings = self.embedding_fn.embed_documents(texts)
+        new = [i for i, chunk_id in enumerate(ids) if chunk_id not in existing_ids]
+        unchanged = [i for i, chunk_id in enumerate(ids) if chunk_id in existing_ids]
 
         try:
-            collection.upsert(ids=ids, documents=texts, embeddings=embeddings, metadatas=metadatas)
-            print(f"[VectorStore] Eklendi: {len(documents)} parça.")
+            if new:
+                # Embedding hesaplama işlemi ağırdır: yalnızca yeni/değişen parçalar için yapılır
+                embeddings = self.embedding_fn.embed_documents([texts[i] for i in new])
+                self.backend.upsert(user_id, [ids[i] for i in new], [texts[i] for i in new], embeddings,
+                                    [metadatas[i] for i in new])
+            if unchanged:
+                # Metin aynı ama sayfa numarası vb. değişmiş olabilir
+                self.backend.update_metadatas(user_id, [ids[i] for i in unchanged],
+                                              [metadatas[i] for i in unchanged])
+            if self.lexical_index is not None:
+                self.ensure_lexical_index(user_id)
+                # Tekrar eklemek zararsızdır; kaydı olmayan eski parçalar da böylece indekslenir
+                self.lexical_index.add_chunks(user_id, ids, texts)
+            print(f"[VectorStore] Eklendi: {len(new)} parça ({len(unchanged)} parça değişmemiş).")
         except Exception as e:
             print(f"[VectorStore Hata]: {e}")
             raise e
+        return ids, len(new)
 
-    async def query_async(self, user_id: int, query_text: str, k: int = 3) -> List[Document]:
-        """Arama işlemini thread'e yıkar (Non-blocking)."""
-        return await asyncio.to_thread(self._query_sync, user_id, query_text, k)
+    async def source_state_async(self, user_id: int, source_name: str) -> Tuple[Optional[str], Set[str]]:
+        """Kaynağın son yüklemedeki dosya özeti ve parça kimlikleri (Non-blocking)."""
+        return await asyncio.to_thread(self._source_state_sync, user_id, source_name)
 
-    def _query_sync(self, user_id: int, query_text: str, k: int) -> List[Document]:
-        """Senkron çalışan asıl sorgu fonksiyonu."""
-        collection = self._get_collection(user_id)
+    def _source_state_sync(self, user_id: int, source_name: str) -> Tuple[Optional[str], Set[str]]:
+        entry = self.manifest.get(user_id, source_name)
+        if entry is not None:
+            return entry.get("file_hash"), set(entry.get("chunk_ids", []))
+
+        # Manifest'ten önce yüklenmiş kaynaklar: parçalar backend'deki metadata'dan bulunur
+        return None, set(self.backend.ids_for_source(user_id, source_name))
+
+    async def finalize_source_async(self, user_id: int, source_name: str, file_hash: Optional[str],
+                                    chunk_ids: List[str], previous_ids: Set[str], complete: bool = True) -> int:
+        """
+        Yükleme bitince manifest'i günceller. Tamamlanan yüklemede yeni sürümde bulunmayan
+        parçalar silinir; yarım kalan yüklemede hiçbir şey silinmez, eski ve yeni kimlikler
+        birlikte kaydedilir (bir sonraki yükleme temizler). Silinen parça sayısını döner.
+        """
+        try:
+            return await asyncio.to_thread(self._finalize_source_sync, user_id, source_name, file_hash,
+                                           chunk_ids, previous_ids, complete)
+        finally:
+            self._bump_collection_version(user_id)
+
+    def _finalize_source_sync(self, user_id: int, source_name: str, file_hash: Optional[str],
+                              chunk_ids: List[str], previous_ids: Set[str], complete: bool) -> int:
+        if not complete:
+            merged = list(dict.fromkeys([*previous_ids, *chunk_ids]))
+            self.manifest.set(user_id, source_name, None, merged)
+            if self.lexical_index is not None:
+                self.lexical_index.save(user_id)
+            return 0
+
+        stale = previous_ids.difference(chunk_ids)
+        if stale:
+            self.backend.delete(user_id, list(stale))
+            print(f"[VectorStore] Silindi: {len(stale)} eski parça ({source_name}).")
+        self.manifest.set(user_id, source_name, file_hash, chunk_ids)
+        if self.lexical_index is not None:
+            self.lexical_index.remove_chunks(user_id, list(stale))
+            self.lexical_index.save(user_id)
+        return len(stale)
+
+    def ensure_lexical_index(self, user_id: int) -> None:
+        """BM25 indeksinden önce yüklenmiş dokümanlar için indeksi bir kez backend'den kurar."""
+        if self.lexical_index is None or self.lexical_index.exists(user_id):
+            return
+        chunk_ids, texts = self.all_chunks_sync(user_id)
+        if not chunk_ids:
+            # Dokümanı olmayan kullanıcı için boş indeks dosyası oluşturulmaz
+            return
+        self.lexical_index.add_chunks(user_id, chunk_ids, texts)
+        self.lexical_index.save(user_id)
+        print(f"[BM25] İndeks oluşturuldu (user {user_id}): {len(chunk_ids)} parça.")
 
-        # Sorgu embedding'i hesapla
-        query_embedding = self.embedding_fn.embed_query(query_text)
+    def all_chunks_sync(self, user_id: int) -> Tuple[List[str], List[str]]:
+        """Kullanıcının tüm parçalarının kimlik ve metinleri (indeks kurulumu için)."""
+        chunks = self.backend.get(user_id)
+        return [chunk_id for chunk_id, _, _ in chunks], [text for _, text, _ in chunks]
 
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=k
-        )
+    async def get_documents_async(self, user_id: int, chunk_ids: List[str]) -> List[Document]:
+        """Kimliği bilinen parçaları (örn. BM25 sonuçları) metadata'larıyla birlikte döner."""
+        return await asyncio.to_thread(self._get_documents_sync, user_id, chunk_ids)
 
+    def _get_documents_sync(self, user_id: int, chunk_ids: List[str]) -> List[Document]:
+        if not chunk_ids:
+            return []
+        return self._to_documents(self.backend.get(user_id, chunk_ids))
+
+    @staticmethod
+    def _to_documents(chunks: List[Chunk]) -> List[Document]:
         found_docs = []
-        if results["documents"]:
-            docs = results["documents"][0]
-            metas = results["metadatas"][0] if results["metadatas"] else [{}] * len(docs)
-            for text, meta in zip(docs, metas):
-                found_docs.append(Document(page_content=text, metadata=meta))
+        for chunk_id, text, meta in chunks:
+            # Parça kimliği cevap önbelleği anahtarında kullanılır
+            meta = dict(meta or {})
+            meta["chunk_id"] = chunk_id
+            found_docs.append(Document(page_content=text, metadata=meta))
+        return found_docs
+
+    async def embed_query_async(self, query_text: str) -> List[float]:
+        """Sorgu embedding'ini önbellekten döner, yoksa mikro-batch içinde hesaplar (Non-blocking)."""
+        key = (self.embedding_fn.model_name, self._normalize_query(query_text))
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            embedding = await self.query_batcher.embed(query_text)
+            self.embedding_cache.put(key, embedding)
+        return embedding
 
-        return found_docs
\ No newline at end of file
+    async def query_async(self, user_id: int, query_text: str, k: int = 3) -> List[Document]:
+        """Embedding'i batch'te hesaplar, arama işlemini thread'e yıkar (Non-blocking)."""
+        # Hiç doküman yüklememiş kullanıcı: embedding ve backend'e hiç gitmeden boş sonuç
+        if self.has_documents_hint(user_id) is False:
+            return []
+
+        key = (user_id, self._normalize_query(query_text), k, self.collection_version(user_id))
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return list(cached)
+
+        query_embedding = await self.embed_query_async(query_text)
+        found_docs = await asyncio.to_thread(self._query_sync, user_id, query_embedding, k)
+
+        # Arama sürerken yükleme olduysa sonucu önbelleğe yazma
+        if key[3] == self.collection_version(user_id):
+            self.result_cache.put(key, list(found_docs))
+        return found_docs
+
+    def cache_stats(self) -> dict:
+        return {
+            "embedding_cache": self.embedding_cache.stats(),
+            "result_cache": self.result_cache.stats(),
+            "backend": self.backend.stats(),
+        }
+
+    def _query_sync(self, user_id: int, query_embedding: List[float], k: int) -> List[Document]:
+        """Senkron çalışan asıl sorgu fonksiyonu."""
+        return self._to_documents(self.backend.query(user_id, query_embedding, k))
@@ -5,7 +5,7 @@ from chromadb.config import Settings
 from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader
 # DÜZELTİLEN IMPORT:
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import SentenceTransformerEmbeddings
+from services.rag.embeddings import get_embedding_provider
 
 # ChromaDB Kayıt Yolu
 CHROMA_PATH = "chroma_db"
@@ -15,8 +15,8 @@ class RAGService:
     def __init__(self):
         # PersistentClient verileri diske kaydeder
         self.client = chromadb.PersistentClient(path=CHROMA_PATH)
-        # Açık kaynaklı, ücretsiz ve güçlü bir embedding modeli
-        self.embedding_fn = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
+        # Açık kaynaklı, ücretsiz ve güçlü bir embedding modeli (VectorStore ile aynı kopya paylaşılır)
+        self.embedding_fn = get_embedding_provider("all-MiniLM-L6-v2")
 
     def _get_collection(self, user_id: int):
         """Her kullanıcı için izole edilmiş bir koleksiyon döndürür."""
@@ -1,6 +1,8 @@
 import os
-import httpx
+from typing import Optional
 from core.interfaces import ISTTService
+from core.http_client import HTTPClientPool
+from services.vad import SilenceFilter
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,7 +11,10 @@ load_dotenv()
 class FalSTTService(ISTTService):
     """Fal.ai Freya STT Servisi."""
 
-    def __init__(self):
+    def __init__(self, http: Optional[HTTPClientPool] = None, vad: Optional[SilenceFilter] = None):
+        # Paylaşılan bağlantı havuzu (verilmezse servis kendi havuzunu kullanır)
+        self.http = http or HTTPClientPool()
+        self.http.ensure("stt", timeout=10.0)
         # OpenAI uyumlu endpoint (Dosya yükleme destekler)
         self.api_url = "https://fal.run/freya-mypsdi253hbk/freya-stt/audio/transcriptions"
         self.api_key = os.getenv("FAL_KEY")
@@ -17,21 +22,36 @@ class FalSTTService(ISTTService):
             "Authorization": f"Key {self.api_key}",
             # Content-Type'ı httpx otomatik 'multipart/form-data' yapar.
         }
+        # Sessizlik filtresi (None ise parçalar olduğu gibi gönderilir)
+        self.vad = vad
 
-    async def transcribe(self, audio_data: bytes) -> str:
+    async def transcribe(self, audio_data: bytes, filename: str = "chunk.webm",
+                         content_type: str = "audio/webm", skip_vad: bool = False) -> str:
         """
         Ses verisini (chunk) direkt dosya olarak Fal.ai'ye gönderir.
+
+        Args:
+            skip_vad (bool): Ses zaten segmentlenmişse (akışlı oturum) sessizlik filtresini atla.
         """
-        # Ses verisi çok kısaysa (sessizlik vb.) API'ye gitme
-        if len(audio_data) < 1000:
+        # Ses verisi çok kısaysa (sessizlik vb.) API'ye gitme. Segmentlenmiş ses zaten konuşma
+        # içerir; kısa bir segment opus ile 1 KB'ın altına inebilir.
+        if not skip_vad and len(audio_data) < 1000:
             return ""
 
+        # Sessiz parçaları hiç gönderme, konuşmanın baş/son sessizliğini kırp
+        if self.vad is not None and not skip_vad:
+            filtered = await self.vad.process(audio_data, filename, content_type)
+            if filtered is None:
+                print("🔇 [STT] Sessiz parça atlandı.")
+                return ""
+            audio_data, filename, content_type = filtered
+
         print(f"TZ 🎤 [STT] Fal.ai isteği ({len(audio_data)} bytes)...")
 
         try:
-            # Dosya formatı webm gönderiyoruz
+            # Varsayılan format webm (akışlı oturumlarda wav segmentler gelir)
             files = {
-                'file': ('chunk.webm', audio_data, 'audio/webm')
+                'file': (filename, audio_data, content_type)
             }
 
             # Parametreler
@@ -41,18 +61,18 @@ class FalSTTService(ISTTService):
                 "response_format": "json"
             }
 
-            async with httpx.AsyncClient(timeout=10.0) as client:  # Timeout'u kısalttık
-                response = await client.post(self.api_url, files=files, data=data, headers=self.headers)
-
-                if response.status_code == 200:
-                    response_data = response.json()
-                    text = response_data.get("text", "")
-                    if text:
-                        print(f"✅ [STT Parça]: {text}")
-                    return text
-                else:
-                    print(f"❌ [STT Hata] {response.status_code}: {response.text}")
-                    return ""
+            client = self.http.get("stt")
+            response = await client.post(self.api_url, files=files, data=data, headers=self.headers)
+
+            if response.status_code == 200:
+                response_data = response.json()
+                text = response_data.get("text", "")
+                if text:
+                    print(f"✅ [STT Parça]: {text}")
+                return text
+            else:
+                print(f"❌ [STT Hata] {response.status_code}: {response.text}")
+                return ""
 
         except Exception as e:
             print(f"❌ [STT Kritik Hata]: {e}")
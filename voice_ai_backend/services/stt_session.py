@@ -0,0 +1,159 @@
+# voice_ai_backend/services/stt_session.py
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+from services.admission import AdmissionController, AdmissionRejected, DeadlineExceeded
+from services.stt_service import FalSTTService
+from services.vad import SpeechSegmenter, encode_pcm16_to_opus, pcm16_to_wav
+
+
+class StreamingSTTSession:
+    """
+    Tek bir WebSocket bağlantısı boyunca süren akışlı STT oturumu.
+
+    İstemciden gelen sürekli PCM16 sesi sunucu tarafında sessizlik noktalarından
+    segmentlere böler, segmentleri sınırlı eşzamanlılıkla Fal.ai'ye gönderir ve
+    sonuçları sırasıyla 'final' mesajı olarak iletir. Konuşma sürerken belirli
+    aralıklarla açık segmentin 'partial' transkripsiyonunu da gönderir.
+    """
+
+    def __init__(self, stt: FalSTTService, send: Callable[[dict], Awaitable[None]],
+                 segmenter: Optional[SpeechSegmenter] = None, max_concurrency: int = 2,
+                 partial_interval_seconds: float = 2.5, on_transcript: Optional[Callable[[str], None]] = None,
+                 admission: Optional[AdmissionController] = None, user_id: Optional[int] = None,
+                 opus_bitrate: Optional[str] = "24k"):
+        """
+        Args:
+            send: İstemciye JSON mesajı gönderen fonksiyon.
+            max_concurrency (int): Aynı anda Fal.ai'ye gidebilecek segment isteği.
+            partial_interval_seconds (float): Kısmi transkripsiyon aralığı (0 ise kapalı).
+            on_transcript: Her 'partial'/'final' mesajında o ana kadarki birikmiş metinle çağrılır
+                (örn. spekülatif bağlam araması için).
+            admission: Her segment isteği bu kabul kontrolünden slot alır; reddedilen 'final' segment
+                için istemciye retry_after içeren 'error' mesajı gider, 'partial' sessizce atlanır.
+            user_id (int): Kabul kontrolündeki kullanıcı başı sınır için.
+            opus_bitrate (str): Segmentler bu bit hızıyla ogg/opus olarak yüklenir (None ise veya ffmpeg
+                yoksa PCM16 WAV).
+        """
+        self.stt = stt
+        self.send = send
+        self.on_transcript = on_transcript
+        self.admission = admission
+        self.user_id = user_id
+        self.opus_bitrate = opus_bitrate
+        self._finals: List[str] = []
+        self.segmenter = segmenter or SpeechSegmenter()
+        self.partial_interval_seconds = partial_interval_seconds
+
+        self._slots = asyncio.Semaphore(max(1, max_concurrency))
+        self._tasks: Set[asyncio.Task] = set()
+        self._last_final: Optional[asyncio.Task] = None
+        self._seq = 0
+        self._partial_task: Optional[asyncio.Task] = None
+        self._last_partial_at = 0.0
+
+    async def feed(self, pcm: bytes) -> None:
+        """Yeni ses verisini işler; kapanan segmentler için transkripsiyonu başlatır."""
+        for segment in self.segmenter.feed(pcm):
+            self._start_final(segment)
+
+        if self.segmenter.in_speech:
+            self._maybe_start_partial()
+
+    async def flush(self) -> None:
+        """Açık segmenti kapatır ve bekleyen tüm transkripsiyonların gönderilmesini bekler."""
+        for segment in self.segmenter.flush():
+            self._start_final(segment)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def close(self) -> None:
+        """Bağlantı koptuğunda bekleyen işleri iptal eder."""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+
+    def stats(self) -> dict:
+        return {"segments": self._seq, **self.segmenter.stats()}
+
+    # --- İç işleyiş ---
+    def _track(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _start_final(self, segment: bytes) -> None:
+        seq = self._seq
+        self._seq += 1
+        self._last_partial_at = 0.0
+        self._last_final = self._track(self._transcribe_final(seq, segment, self._last_final))
+
+    async def _transcribe_final(self, seq: int, segment: bytes, previous: Optional[asyncio.Task]) -> None:
+        error = None
+        try:
+            async with self._slots:
+                text = await self._transcribe(segment)
+        except AdmissionRejected as e:
+            text, error = "", {"status": e.status_code, "detail": e.detail, "retry_after": e.retry_after}
+        except DeadlineExceeded:
+            text, error = "", {"detail": "deadline_exceeded"}
+
+        # Sonuçlar segment sırasıyla gönderilir
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        if error is not None:
+            await self.send({"type": "error", "seq": seq, "data": error})
+            return
+        await self.send({"type": "final", "seq": seq, "text": text})
+        if text:
+            self._finals.append(text)
+            self._notify_transcript()
+
+    def _maybe_start_partial(self) -> None:
+        if self.partial_interval_seconds <= 0:
+            return
+        if self._partial_task is not None and not self._partial_task.done():
+            return
+        if self.segmenter.current_speech_seconds < self.partial_interval_seconds:
+            return
+        now = time.monotonic()
+        if now - self._last_partial_at < self.partial_interval_seconds:
+            return
+
+        self._last_partial_at = now
+        self._partial_task = self._track(self._transcribe_partial(self._seq, self.segmenter.current_segment))
+
+    async def _transcribe_partial(self, seq: int, segment: bytes) -> None:
+        try:
+            async with self._slots:
+                text = await self._transcribe(segment)
+        except (AdmissionRejected, DeadlineExceeded):
+            # Kısmi sonuç isteğe bağlıdır; sunucu doluysa atlanır
+            return
+        # Segment bu arada kapandıysa kısmi sonuç artık geçersizdir
+        if text and seq == self._seq:
+            await self.send({"type": "partial", "seq": seq, "text": text})
+            self._notify_transcript(text)
+
+    def _notify_transcript(self, partial: str = "") -> None:
+        if self.on_transcript is not None:
+            self.on_transcript(" ".join([*self._finals, partial]).strip())
+
+    async def _encode(self, segment: bytes) -> Tuple[bytes, str, str]:
+        """Segmenti yüklenecek (veri, dosya adı, içerik tipi) üçlüsüne çevirir (WAV'ın ~1/10'u opus)."""
+        if self.opus_bitrate:
+            encoded = await encode_pcm16_to_opus(segment, self.segmenter.sample_rate, self.opus_bitrate)
+            if encoded is not None:
+                return encoded, "segment.ogg", "audio/ogg"
+        return pcm16_to_wav(segment, self.segmenter.sample_rate), "segment.wav", "audio/wav"
+
+    async def _transcribe(self, segment: bytes) -> str:
+        audio, filename, content_type = await self._encode(segment)
+        if self.admission is None:
+            return await self.stt.transcribe(audio, filename=filename, content_type=content_type, skip_vad=True)
+        ticket = await self.admission.acquire(self.user_id)
+        return await self.admission.run(
+            ticket, self.stt.transcribe(audio, filename=filename, content_type=content_type, skip_vad=True)
+        )
\ No newline at end of file
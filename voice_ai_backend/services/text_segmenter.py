@@ -0,0 +1,151 @@
+# voice_ai_backend/services/text_segmenter.py
+from typing import List, Optional
+
+SENTENCE_END = ".?!…"
+CLAUSE_END = ",;:"
+# Cümle sonu işaretinden sonra gelebilecek kapanış karakterleri
+CLOSERS = "\"'”’»)]"
+
+# Sonunda nokta olsa da cümleyi bitirmeyen Türkçe (ve yaygın) kısaltmalar
+ABBREVIATIONS = {
+    "dr", "prof", "doç", "doc", "yrd", "av", "sn", "müh", "uzm", "op", "hz", "öğr", "gör",
+    "vb", "vs", "vd", "bkz", "örn", "ör", "yy", "sf", "bşk", "gn", "gen", "alb", "kur",
+    "mah", "cad", "sok", "sk", "apt", "blv", "no", "tel", "faks", "şti", "ltd", "inc", "co",
+    "st", "km", "kg", "gr", "cm", "mm", "lt", "mr", "mrs", "ms", "etc", "ca", "vol",
+}
+
+
+def turkish_lower(text: str) -> str:
+    """Türkçe'ye uygun küçük harfe çevirme (I -> ı, İ -> i)."""
+    return text.replace("I", "ı").replace("İ", "i").lower()
+
+
+class SentenceSegmenter:
+    """
+    LLM token akışını TTS'e verilecek parçalara bölen artımlı (incremental) bölücü.
+
+    Her `feed` çağrısında yalnızca yeni gelen metin taranır. Kısaltmalar ("Dr.", "vb."),
+    ondalık sayılar ("1.5") ve sıra sayıları ("3. madde") cümle sonu sayılmaz.
+    """
+
+    def __init__(self, first_chunk_min_chars: int = 40, min_chunk_chars: int = 20, max_chunk_chars: int = 250):
+        """
+        Args:
+            first_chunk_min_chars (int): İlk parça bu uzunluğu geçtikten sonraki ilk virgül/noktalı virgülde
+                erkenden gönderilir (ilk sesin gecikmesini azaltır). 0 verilirse kapalıdır.
+            min_chunk_chars (int): Bundan kısa cümleler bir sonrakiyle birleştirilir (kesik konuşmayı önler).
+            max_chunk_chars (int): Cümle sonu gelmese de bu uzunlukta, son yan cümle sınırından
+                (yoksa son boşluktan) bölünür.
+        """
+        self.first_chunk_min_chars = first_chunk_min_chars
+        self.min_chunk_chars = min_chunk_chars
+        self.max_chunk_chars = max(max_chunk_chars, min_chunk_chars + 1)
+
+        self._buffer = ""
+        self._scan_pos = 0
+        self._last_clause: Optional[int] = None
+        self._last_space: Optional[int] = None
+        self.chunks_emitted = 0
+
+    def feed(self, text: str) -> List[str]:
+        """Yeni metni ekler ve tamamlanan parçaları döner."""
+        self._buffer += text
+        chunks = []
+        while True:
+            chunk = self._next_chunk()
+            if chunk is None:
+                break
+            if chunk:
+                chunks.append(chunk)
+        return chunks
+
+    def flush(self) -> List[str]:
+        """Akış bittiğinde tamponda kalan metni döner."""
+        rest = self._buffer.strip()
+        self._reset_buffer("")
+        if not rest:
+            return []
+        self.chunks_emitted += 1
+        return [rest]
+
+    # --- İç işleyiş ---
+    def _next_chunk(self) -> Optional[str]:
+        buf = self._buffer
+        i = self._scan_pos
+
+        while i < len(buf):
+            ch = buf[i]
+            if ch in SENTENCE_END or ch in CLAUSE_END:
+                j = i + 1
+                while j < len(buf) and (buf[j] in SENTENCE_END or buf[j] in CLOSERS):
+                    j += 1
+                if j >= len(buf):
+                    # İşaretten sonra ne geleceği henüz belli değil
+                    break
+
+                if buf[j].isspace():
+                    if ch in SENTENCE_END:
+                        boundary = self._is_sentence_boundary(buf, i, j)
+                        if boundary is None:
+                            break
+                        if boundary and len(buf[:j].strip()) >= self.min_chunk_chars:
+                            return self._emit(j)
+                    elif self._early_flush_allowed(j):
+                        return self._emit(j)
+                    elif j <= self.max_chunk_chars:
+                        self._last_clause = j
+                i = j
+                continue
+
+            if ch.isspace() and i <= self.max_chunk_chars:
+                self._last_space = i
+            i += 1
+
+        self._scan_pos = i
+
+        # Çok uzun parça: cümle sonunu beklemeden böl
+        if len(buf) > self.max_chunk_chars:
+            cut = self._last_clause or self._last_space or self.max_chunk_chars
+            return self._emit(cut)
+        return None
+
+    def _early_flush_allowed(self, end: int) -> bool:
+        return self.first_chunk_min_chars > 0 and self.chunks_emitted == 0 and end >= self.first_chunk_min_chars
+
+    def _is_sentence_boundary(self, buf: str, i: int, j: int) -> Optional[bool]:
+        """True: cümle sonu, False: değil, None: karar için daha fazla metin gerekli."""
+        if buf[i] != "." or (i + 1 < len(buf) and buf[i + 1] == "."):
+            return True
+
+        start = i
+        while start > 0 and not buf[start - 1].isspace():
+            start -= 1
+        word = buf[start:i].lstrip("\"'“‘«([")
+        if not word:
+            return True
+
+        # Kısaltmalar, tek harfli baş harfler ("M. Kemal") ve "A.Ş." gibi noktalı kısaltmalar
+        if turkish_lower(word) in ABBREVIATIONS or (len(word) == 1 and word.isalpha()) or "." in word:
+            return False
+
+        # Sıra sayısı ("3. madde"): ardından küçük harf geliyorsa cümle bitmemiştir
+        if word.isdigit():
+            rest = buf[j:].lstrip()
+            if not rest:
+                return None
+            return not rest[0].islower()
+
+        return True
+
+    def _emit(self, end: int) -> str:
+        chunk = self._buffer[:end].strip()
+        self._reset_buffer(self._buffer[end:].lstrip())
+        if chunk:
+            self.chunks_emitted += 1
+        return chunk
+
+    def _reset_buffer(self, text: str) -> None:
+        self._buffer = text
+        self._scan_pos = 0
+        self._last_clause = None
+        self._last_space = None
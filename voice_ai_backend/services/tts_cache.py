@@ -0,0 +1,199 @@
+# voice_ai_backend/services/tts_cache.py
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+TTS_CACHE_PATH = "tts_cache"
+# Bu süreden eski .tmp dosyaları yarım kalmış yazmalardır ve açılışta silinir
+ORPHAN_TMP_SECONDS = 300
+
+
+class TTSAudioCache:
+    """
+    İçerik adresli TTS ses önbelleği.
+
+    Anahtar: normalize edilmiş metin + ses + hız + format. İki katmanlıdır:
+    bayt bütçeli bellek içi LRU ve bütçeli, LRU tahliyeli disk katmanı.
+    """
+
+    def __init__(self, memory_budget_bytes: int = 32 * 1024 * 1024,
+                 disk_budget_bytes: int = 512 * 1024 * 1024,
+                 disk_path: Optional[str] = TTS_CACHE_PATH):
+        """
+        Args:
+            memory_budget_bytes (int): Bellekte tutulacak toplam ses boyutu.
+            disk_budget_bytes (int): Diskte tutulacak toplam ses boyutu.
+            disk_path (str): Disk katmanı klasörü. None verilirse disk katmanı kapalıdır.
+        """
+        self.memory_budget_bytes = memory_budget_bytes
+        self.disk_budget_bytes = disk_budget_bytes
+        self.disk_path = disk_path
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+
+        # Disk indeksi: anahtar -> (dosya adı, boyut), en eski kullanım başta
+        self._disk: "OrderedDict[str, tuple]" = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.disk_path:
+            os.makedirs(self.disk_path, exist_ok=True)
+            self._load_disk_index()
+
+    # --- Anahtar ---
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Unicode NFC + boşluk sadeleştirme (aynı cümlenin farklı yazımlarını birleştirir)."""
+        text = unicodedata.normalize("NFC", text)
+        return re.sub(r"\s+", " ", text).strip()
+
+    def make_key(self, text: str, voice: str, speed: float, response_format: str) -> str:
+        raw = "\x1f".join([self.normalize_text(text), voice, f"{speed:.3f}", response_format])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # --- Okuma / Yazma ---
+    async def get(self, key: str) -> Optional[bytes]:
+        audio = self._memory_get(key)
+        if audio is not None:
+            self.memory_hits += 1
+            return audio
+
+        if self.disk_path:
+            audio = await asyncio.to_thread(self._disk_get, key)
+            if audio is not None:
+                self.disk_hits += 1
+                self._memory_put(key, audio)
+                return audio
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, audio: bytes, response_format: str = "mp3") -> None:
+        if not audio:
+            return
+        self._memory_put(key, audio)
+        if self.disk_path:
+            await asyncio.to_thread(self._disk_put, key, audio, response_format)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+        }
+
+    # --- Bellek katmanı ---
+    def _memory_get(self, key: str) -> Optional[bytes]:
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+        return audio
+
+    def _memory_put(self, key: str, audio: bytes) -> None:
+        # Bütçeden büyük tek bir kayıt belleğe alınmaz
+        if len(audio) > self.memory_budget_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.memory_budget_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    # --- Disk katmanı ---
+    def _load_disk_index(self) -> None:
+        """Açılışta mevcut dosyaları son kullanım sırasına göre indeksler."""
+        entries = []
+        now = time.time()
+        for filename in os.listdir(self.disk_path):
+            path = os.path.join(self.disk_path, filename)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if ".tmp" in filename:
+                # Yarım kalmış atomik yazma. Başka bir worker o anda yazıyor olabilir: yalnızca eskiler silinir
+                if now - st.st_mtime > ORPHAN_TMP_SECONDS:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                continue
+            key = filename.split(".", 1)[0]
+            entries.append((st.st_mtime, key, filename, st.st_size))
+
+        for _, key, filename, size in sorted(entries):
+            self._disk[key] = (filename, size)
+            self._disk_bytes += size
+        self._evict_disk()
+        print(f"[TTSCache] Disk önbelleği: {len(self._disk)} kayıt, {self._disk_bytes} bytes.")
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        with self._disk_lock:
+            entry = self._disk.get(key)
+            if entry is None:
+                return None
+            self._disk.move_to_end(key)
+        path = os.path.join(self.disk_path, entry[0])
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            # mtime son kullanım zamanı olarak kullanılır (yeniden başlatmada LRU sırası korunur)
+            os.utime(path)
+            return audio
+        except OSError:
+            with self._disk_lock:
+                if self._disk.pop(key, None) is not None:
+                    self._disk_bytes -= entry[1]
+            return None
+
+    def _disk_put(self, key: str, audio: bytes, response_format: str) -> None:
+        if len(audio) > self.disk_budget_bytes:
+            return
+        filename = f"{key}.{response_format}"
+        path = os.path.join(self.disk_path, filename)
+        tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+        try:
+            # Atomik yazma: yarım dosya okunmasın
+            with open(tmp_path, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ [TTSCache] Diske yazılamadı: {e}")
+            return
+
+        with self._disk_lock:
+            old = self._disk.pop(key, None)
+            if old is not None:
+                self._disk_bytes -= old[1]
+            self._disk[key] = (filename, len(audio))
+            self._disk_bytes += len(audio)
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        while self._disk_bytes > self.disk_budget_bytes and self._disk:
+            _, (filename, size) = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(os.path.join(self.disk_path, filename))
+            except OSError:
+                pass
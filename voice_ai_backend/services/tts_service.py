@@ -1,19 +1,30 @@
 # voice_ai_backend/services/tts_service.py
 import os
-import httpx
-from typing import AsyncGenerator
+import json
+import asyncio
+from typing import AsyncGenerator, Optional
 from core.interfaces import ITTSService
+from core.http_client import HTTPClientPool
+from services.tts_cache import TTSAudioCache
+from services.text_segmenter import SentenceSegmenter
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Akış modunda upstream'den okunacak parça boyutu (ilk baytlar hızlı iletilsin diye küçük)
+STREAM_CHUNK_SIZE = 4096
+
 
 class FalTTSService(ITTSService):
     """
     Fal.ai Freya TTS Servisi Entegrasyonu.
     """
 
-    def __init__(self):
+    def __init__(self, http: Optional[HTTPClientPool] = None, cache: Optional[TTSAudioCache] = None,
+                 voice: str = "zeynep", speed: float = 1.1, response_format: str = "mp3"):
+        # Paylaşılan bağlantı havuzu (verilmezse servis kendi havuzunu kullanır)
+        self.http = http or HTTPClientPool()
+        self.http.ensure("tts", timeout=30.0)
         # Ses üretimi için doğru endpoint: /audio/speech
         self.api_url = "https://fal.run/freya-mypsdi253hbk/freya-tts/audio/speech"
         self.api_key = os.getenv("FAL_KEY")
@@ -21,58 +32,164 @@ class FalTTSService(ITTSService):
             "Authorization": f"Key {self.api_key}",
             "Content-Type": "application/json"
         }
+        self.voice = voice  # DÜZELTİLDİ: 'freya' yerine 'zeynep' yapıldı.
+        self.speed = speed
+        self.response_format = response_format
+
+        # Ses önbelleği (None ise her istek Fal.ai'ye gider)
+        self.cache = cache
+        # Aynı anahtar için eşzamanlı istekler tek bir Fal.ai çağrısını paylaşır
+        self._inflight = {}
 
     async def speak_text(self, text: str) -> bytes:
         if not text.strip():
             return b""
 
-        # Payload ayarları
-        payload = {
-            "input": text,
-            "voice": "zeynep",  # DÜZELTİLDİ: 'freya' yerine 'zeynep' yapıldı.
-            "response_format": "mp3",
-            "speed": 1.1
-        }
+        if self.cache is None:
+            return await self._synthesize(text)
 
-        print(f"🔊 [TTS] Fal.ai isteği ({payload['voice']}): '{text[:20]}...'")
+        key = self.cache.make_key(text, self.voice, self.speed, self.response_format)
+        audio = await self.cache.get(key)
+        if audio is not None:
+            print(f"💾 [TTS Cache] Hit: '{text[:20]}...'")
+            return audio
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._synthesize_and_cache(key, text))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: bir bekleyen iptal edilirse diğerleri için istek sürsün
+        return await asyncio.shield(task)
+
+    async def _synthesize_and_cache(self, key: str, text: str) -> bytes:
+        audio = await self._synthesize(text)
+        if audio:
+            await self.cache.put(key, audio, self.response_format)
+        return audio
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.post(self.api_url, json=payload, headers=self.headers)
+    async def _synthesize(self, text: str) -> bytes:
+        """Fal.ai'ye gerçek TTS isteğini atar."""
+        payload = self._payload(text)
 
-                if response.status_code == 200:
-                    content_type = response.headers.get("content-type", "")
+        print(f"🔊 [TTS] Fal.ai isteği ({payload['voice']}): '{text[:20]}...'")
+
+        client = self.http.get("tts")
+        try:
+            response = await client.post(self.api_url, json=payload, headers=self.headers)
 
-                    # 1. Durum: Doğrudan ses verisi (audio/mpeg vb.)
-                    if "audio" in content_type or "mpeg" in content_type:
-                        return response.content
+            if response.status_code == 200:
+                content_type = response.headers.get("content-type", "")
 
-                    # 2. Durum: JSON dönerse (URL içerir)
-                    elif "application/json" in content_type:
-                        data = response.json()
-                        # Dokümana göre 'url' veya 'audio_url' olabilir
-                        audio_url = data.get("url") or data.get("audio_url")
+                # 1. Durum: Doğrudan ses verisi (audio/mpeg vb.)
+                if "audio" in content_type or "mpeg" in content_type:
+                    return response.content
 
-                        if audio_url:
-                            print(f"🔗 [TTS] Ses URL'i indiriliyor: {audio_url}")
-                            audio_resp = await client.get(audio_url)
-                            return audio_resp.content
-                        else:
-                            print(f"⚠️ [TTS] JSON döndü ama URL bulunamadı: {data}")
-                            return b""
+                # 2. Durum: JSON dönerse (URL içerir)
+                elif "application/json" in content_type:
+                    data = response.json()
+                    # Dokümana göre 'url' veya 'audio_url' olabilir
+                    audio_url = data.get("url") or data.get("audio_url")
 
+                    if audio_url:
+                        print(f"🔗 [TTS] Ses URL'i indiriliyor: {audio_url}")
+                        audio_resp = await client.get(audio_url)
+                        return audio_resp.content
                     else:
-                        # Bazen header yanlış olabilir, yine de content'i deneyelim
-                        print(f"⚠️ [TTS] Beklenmeyen içerik tipi: {content_type}")
-                        return response.content
+                        print(f"⚠️ [TTS] JSON döndü ama URL bulunamadı: {data}")
+                        return b""
 
                 else:
-                    print(f"❌ [TTS Hata] {response.status_code}: {response.text}")
-                    return b""
-            except Exception as e:
-                print(f"❌ [TTS Bağlantı Hatası]: {e}")
+                    # Bazen header yanlış olabilir, yine de content'i deneyelim
+                    print(f"⚠️ [TTS] Beklenmeyen içerik tipi: {content_type}")
+                    return response.content
+
+            else:
+                print(f"❌ [TTS Hata] {response.status_code}: {response.text}")
                 return b""
+        except Exception as e:
+            print(f"❌ [TTS Bağlantı Hatası]: {e}")
+            return b""
+
+    def _payload(self, text: str) -> dict:
+        """Fal.ai TTS istek gövdesi."""
+        return {
+            "input": text,
+            "voice": self.voice,
+            "response_format": self.response_format,
+            "speed": self.speed
+        }
+
+    async def speak_text_stream(self, text: str) -> AsyncGenerator[bytes, None]:
+        """
+        Tek bir metni sese çevirir ve ses baytlarını upstream'den geldikçe parça parça döner.
+        Önbellekte varsa tamamı tek parça olarak döner; eksiksiz biten akışlar önbelleğe yazılır.
+        """
+        if not text.strip():
+            return
+
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(text, self.voice, self.speed, self.response_format)
+            audio = await self.cache.get(key)
+            if audio is not None:
+                print(f"💾 [TTS Cache] Hit: '{text[:20]}...'")
+                yield audio
+                return
+
+        buffer = bytearray()
+        try:
+            async for chunk in self._synthesize_stream(text):
+                buffer.extend(chunk)
+                yield chunk
+        except Exception as e:
+            print(f"❌ [TTS Stream Hatası]: {e}")
+            return
+
+        if key is not None and buffer:
+            await self.cache.put(key, bytes(buffer), self.response_format)
+
+    async def _synthesize_stream(self, text: str) -> AsyncGenerator[bytes, None]:
+        """Fal.ai'ye akışlı (streamed response) TTS isteği atar. Hatalar çağırana iletilir."""
+        payload = self._payload(text)
+        print(f"🔊 [TTS Stream] Fal.ai isteği ({payload['voice']}): '{text[:20]}...'")
+
+        client = self.http.get("tts")
+        async with client.stream("POST", self.api_url, json=payload, headers=self.headers) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                raise RuntimeError(f"{response.status_code}: {body[:200]!r}")
+
+            content_type = response.headers.get("content-type", "")
+
+            # JSON dönerse (URL içerir) sesi URL'den akışlı indir
+            if "application/json" in content_type:
+                data = json.loads(await response.aread())
+                audio_url = data.get("url") or data.get("audio_url")
+                if not audio_url:
+                    raise RuntimeError(f"JSON döndü ama URL bulunamadı: {data}")
+
+                async with client.stream("GET", audio_url) as audio_resp:
+                    async for chunk in audio_resp.aiter_bytes(STREAM_CHUNK_SIZE):
+                        yield chunk
+                return
+
+            # Doğrudan ses verisi (audio/mpeg vb.) veya beklenmeyen tip: içeriği aktar
+            async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                yield chunk
 
     async def speak_stream(self, text_stream: AsyncGenerator[str, None]) -> AsyncGenerator[bytes, None]:
-        """Orchestrator tarafından kullanılacak stream fonksiyonu."""
-        pass
\ No newline at end of file
+        """
+        Metin akışını (token veya cümle) alır, cümle sınırlarında böler ve her cümlenin
+        ses baytlarını upstream'den geldikçe döner.
+        """
+        segmenter = SentenceSegmenter()
+
+        async for text in text_stream:
+            for sentence in segmenter.feed(text):
+                async for chunk in self.speak_text_stream(sentence):
+                    yield chunk
+
+        for sentence in segmenter.flush():
+            async for chunk in self.speak_text_stream(sentence):
+                yield chunk
@@ -0,0 +1,333 @@
+# voice_ai_backend/services/vad.py
+import asyncio
+import io
+import shutil
+import wave
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+import numpy as np
+
+SAMPLE_WIDTH = 2  # PCM16
+
+
+class EnergyVAD:
+    """
+    Kare (frame) enerjisine dayalı hafif ses aktivitesi tespiti.
+
+    Eşik, sessiz karelerden öğrenilen gürültü tabanına göre uyarlanır; böylece
+    oda gürültüsü konuşma sayılmaz.
+    """
+
+    def __init__(self, min_threshold: float = 300.0, noise_ratio: float = 3.0, noise_adapt_rate: float = 0.05):
+        """
+        Args:
+            min_threshold (float): Konuşma sayılması için gereken minimum RMS (int16 ölçeğinde).
+            noise_ratio (float): Eşik = max(min_threshold, gürültü tabanı * noise_ratio).
+            noise_adapt_rate (float): Gürültü tabanının sessiz karelerle güncellenme hızı (EMA).
+        """
+        self.min_threshold = min_threshold
+        self.noise_ratio = noise_ratio
+        self.noise_adapt_rate = noise_adapt_rate
+        self.noise_floor = min_threshold / noise_ratio
+
+    @property
+    def threshold(self) -> float:
+        return max(self.min_threshold, self.noise_floor * self.noise_ratio)
+
+    def is_speech(self, frame: bytes) -> bool:
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        if samples.size == 0:
+            return False
+        rms = float(np.sqrt(np.mean(samples * samples)))
+        speech = rms >= self.threshold
+        if not speech:
+            self.noise_floor += (rms - self.noise_floor) * self.noise_adapt_rate
+        return speech
+
+
+class SpeechSegmenter:
+    """
+    PCM16 mono ses akışını sessizlik noktalarından konuşma segmentlerine böler.
+    Sessiz kısımlar atılır; her segmentin başında kısa bir ön tampon (pre-roll) tutulur.
+    """
+
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 30, silence_ms: int = 600,
+                 min_speech_ms: int = 250, max_segment_seconds: float = 15.0, pre_roll_ms: int = 200,
+                 vad: EnergyVAD = None):
+        """
+        Args:
+            silence_ms (int): Bu kadar sessizlik gelince segment kapatılır.
+            min_speech_ms (int): Bundan kısa konuşma içeren segmentler atılır (tık, nefes vb.).
+            max_segment_seconds (float): Sessizlik gelmese de segment bu sürede kapatılır.
+            pre_roll_ms (int): Konuşma başlamadan önceki kısa ses (kelime başı kesilmesin diye).
+        """
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * SAMPLE_WIDTH
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_segment_frames = max(1, int(max_segment_seconds * 1000) // frame_ms)
+        self.vad = vad or EnergyVAD()
+
+        self._remainder = b""
+        self._pre_roll: Deque[bytes] = deque(maxlen=max(0, pre_roll_ms // frame_ms))
+        self._segment: List[bytes] = []
+        self._speech_frames = 0
+        self._silence_run = 0
+
+        # Sayaçlar (kare cinsinden)
+        self.frames_total = 0
+        self.frames_speech = 0
+
+    @property
+    def in_speech(self) -> bool:
+        return bool(self._segment)
+
+    @property
+    def current_segment(self) -> bytes:
+        """Henüz kapanmamış segmentin ses verisi (kısmi transkripsiyon için)."""
+        return b"".join(self._segment)
+
+    @property
+    def current_speech_seconds(self) -> float:
+        return self._speech_frames * self.frame_ms / 1000
+
+    def feed(self, pcm: bytes) -> List[bytes]:
+        """Yeni PCM verisini işler ve tamamlanan segmentleri döner."""
+        data = self._remainder + pcm
+        usable = len(data) - len(data) % self.frame_bytes
+        self._remainder = data[usable:]
+
+        segments = []
+        for offset in range(0, usable, self.frame_bytes):
+            segment = self._process_frame(data[offset:offset + self.frame_bytes])
+            if segment:
+                segments.append(segment)
+        return segments
+
+    def flush(self) -> List[bytes]:
+        """Akış bittiğinde (kullanıcı mikrofonu kapattığında) açık segmenti kapatır."""
+        self._remainder = b""
+        segment = self._close_segment()
+        return [segment] if segment else []
+
+    def stats(self) -> dict:
+        seconds = self.frame_ms / 1000
+        return {
+            "seconds_received": round(self.frames_total * seconds, 2),
+            "seconds_speech": round(self.frames_speech * seconds, 2),
+            "seconds_skipped": round((self.frames_total - self.frames_speech) * seconds, 2),
+        }
+
+    # --- İç işleyiş ---
+    def _process_frame(self, frame: bytes) -> bytes:
+        self.frames_total += 1
+        speech = self.vad.is_speech(frame)
+        if speech:
+            self.frames_speech += 1
+
+        if not self._segment:
+            if not speech:
+                self._pre_roll.append(frame)
+                return b""
+            # Konuşma başladı: ön tamponla birlikte yeni segment aç
+            self._segment = list(self._pre_roll) + [frame]
+            self._pre_roll.clear()
+            self._speech_frames = 1
+            self._silence_run = 0
+            return b""
+
+        self._segment.append(frame)
+        if speech:
+            self._speech_frames += 1
+            self._silence_run = 0
+        else:
+            self._silence_run += 1
+
+        if self._silence_run >= self.silence_frames or len(self._segment) >= self.max_segment_frames:
+            return self._close_segment()
+        return b""
+
+    def _close_segment(self) -> bytes:
+        frames = self._segment
+        speech_frames = self._speech_frames
+        self._segment = []
+        self._speech_frames = 0
+
+        # Sondaki sessizliği at (ön tampon kadarını bırak)
+        trailing = max(0, self._silence_run - (self._pre_roll.maxlen or 0))
+        self._silence_run = 0
+        if trailing:
+            frames = frames[:-trailing]
+
+        if speech_frames < self.min_speech_frames:
+            return b""
+        return b"".join(frames)
+
+
+def pcm16_to_wav(pcm: bytes, sample_rate: int = 16000) -> bytes:
+    """Ham PCM16 mono veriyi WAV dosyasına sarar (STT servisine yüklemek için)."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(SAMPLE_WIDTH)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def trim_silence(pcm: bytes, sample_rate: int = 16000, frame_ms: int = 30, padding_ms: int = 200,
+                 min_speech_ms: int = 250, vad: EnergyVAD = None) -> bytes:
+    """
+    PCM16 verinin başındaki ve sonundaki sessizliği kırpar.
+    Yeterli konuşma yoksa boş bayt döner (parça hiç gönderilmemeli).
+    """
+    vad = vad or EnergyVAD()
+    frame_bytes = int(sample_rate * frame_ms / 1000) * SAMPLE_WIDTH
+    frames = [pcm[i:i + frame_bytes] for i in range(0, len(pcm) - frame_bytes + 1, frame_bytes)]
+    speech_flags = [vad.is_speech(frame) for frame in frames]
+
+    if sum(speech_flags) < max(1, min_speech_ms // frame_ms):
+        return b""
+
+    padding = padding_ms // frame_ms
+    first = speech_flags.index(True)
+    last = len(speech_flags) - 1 - speech_flags[::-1].index(True)
+    start = max(0, first - padding)
+    end = min(len(frames), last + 1 + padding)
+    return b"".join(frames[start:end])
+
+
+async def decode_to_pcm16(audio: bytes, sample_rate: int = 16000) -> Optional[bytes]:
+    """
+    webm/opus (veya ffmpeg'in okuyabildiği herhangi bir format) veriyi 16 kHz mono PCM16'ya çevirir.
+    ffmpeg yoksa veya çözme başarısızsa None döner.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return None
+
+    process = await asyncio.create_subprocess_exec(
+        ffmpeg, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+        "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1",
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    pcm, err = await process.communicate(audio)
+    if process.returncode != 0:
+        print(f"⚠️ [VAD] Ses çözülemedi: {err.decode(errors='replace')[:200]}")
+        return None
+    return pcm
+
+
+async def encode_pcm16_to_opus(pcm: bytes, sample_rate: int = 16000, bitrate: str = "24k") -> Optional[bytes]:
+    """
+    16 kHz mono PCM16'yı ogg/opus'a sıkıştırır (konuşma için ~3 KB/s; WAV ~32 KB/s).
+    ffmpeg yoksa veya kodlama başarısızsa None döner.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return None
+
+    process = await asyncio.create_subprocess_exec(
+        ffmpeg, "-hide_banner", "-loglevel", "error",
+        "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-i", "pipe:0",
+        "-c:a", "libopus", "-b:a", bitrate, "-application", "voip", "-f", "ogg", "pipe:1",
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    encoded, err = await process.communicate(pcm)
+    if process.returncode != 0 or not encoded:
+        print(f"⚠️ [VAD] Ses sıkıştırılamadı: {err.decode(errors='replace')[:200]}")
+        return None
+    return encoded
+
+
+class SilenceFilter:
+    """
+    STT'ye gönderilmeden önce ses parçalarını süzer: sessiz parçalar tamamen atılır,
+    geri kalanların baş/son sessizliği kırpılıp ogg/opus olarak yeniden sıkıştırılır.
+
+    Kırpma sesin küçük bir kısmını attıysa veya yeniden kodlanan veri orijinalden büyükse
+    orijinal (zaten sıkıştırılmış webm/opus) veri yüklenir; böylece filtre yüklenen baytı
+    hiçbir zaman artırmaz.
+    """
+
+    def __init__(self, sample_rate: int = 16000, min_threshold: float = 300.0, padding_ms: int = 200,
+                 min_speech_ms: int = 250, min_trim_ratio: float = 0.2, opus_bitrate: str = "24k"):
+        """
+        Args:
+            min_trim_ratio (float): Kırpılan süre oranı bunun altındaysa orijinal veri yüklenir.
+            opus_bitrate (str): Kırpılan sesin yeniden kodlanacağı opus bit hızı.
+        """
+        self.sample_rate = sample_rate
+        self.min_threshold = min_threshold
+        self.padding_ms = padding_ms
+        self.min_speech_ms = min_speech_ms
+        self.min_trim_ratio = min_trim_ratio
+        self.opus_bitrate = opus_bitrate
+        self._ffmpeg_warned = False
+
+        # Sayaçlar
+        self.chunks_received = 0
+        self.chunks_skipped = 0
+        self.seconds_received = 0.0
+        self.seconds_skipped = 0.0
+        self.bytes_received = 0
+        self.bytes_uploaded = 0
+        self.chunks_reencoded = 0
+        self.chunks_passed_through = 0
+
+    async def process(self, audio: bytes, filename: str, content_type: str) -> Optional[Tuple[bytes, str, str]]:
+        """
+        Yüklenecek (veri, dosya adı, içerik tipi) üçlüsünü döner; parça tamamen sessizse None döner.
+        Ses çözülemezse orijinal veri olduğu gibi döner.
+        """
+        self.chunks_received += 1
+        self.bytes_received += len(audio)
+
+        pcm = await decode_to_pcm16(audio, self.sample_rate)
+        if pcm is None:
+            if not self._ffmpeg_warned and shutil.which("ffmpeg") is None:
+                print("⚠️ [VAD] ffmpeg bulunamadı, sessizlik filtresi devre dışı.")
+                self._ffmpeg_warned = True
+            self.bytes_uploaded += len(audio)
+            return audio, filename, content_type
+
+        total_seconds = len(pcm) / (self.sample_rate * SAMPLE_WIDTH)
+        self.seconds_received += total_seconds
+
+        trimmed = trim_silence(
+            pcm, self.sample_rate, padding_ms=self.padding_ms, min_speech_ms=self.min_speech_ms,
+            vad=EnergyVAD(min_threshold=self.min_threshold),
+        )
+        trimmed_seconds = total_seconds - len(trimmed) / (self.sample_rate * SAMPLE_WIDTH)
+        self.seconds_skipped += trimmed_seconds
+
+        if not trimmed:
+            self.chunks_skipped += 1
+            return None
+
+        if total_seconds > 0 and trimmed_seconds / total_seconds >= self.min_trim_ratio:
+            encoded = await encode_pcm16_to_opus(trimmed, self.sample_rate, self.opus_bitrate)
+            if encoded is not None and len(encoded) < len(audio):
+                self.chunks_reencoded += 1
+                self.bytes_uploaded += len(encoded)
+                return encoded, "chunk.ogg", "audio/ogg"
+
+        # Az kırpıldı veya yeniden kodlama kazanç sağlamadı: orijinal sıkıştırılmış veri
+        self.chunks_passed_through += 1
+        self.bytes_uploaded += len(audio)
+        return audio, filename, content_type
+
+    def stats(self) -> dict:
+        return {
+            "chunks_received": self.chunks_received,
+            "chunks_skipped": self.chunks_skipped,
+            "seconds_received": round(self.seconds_received, 2),
+            "seconds_skipped": round(self.seconds_skipped, 2),
+            "bytes_received": self.bytes_received,
+            "bytes_uploaded": self.bytes_uploaded,
+            "upload_ratio": round(self.bytes_uploaded / self.bytes_received, 3) if self.bytes_received else 0.0,
+            "chunks_reencoded": self.chunks_reencoded,
+            "chunks_passed_through": self.chunks_passed_through,
+        }
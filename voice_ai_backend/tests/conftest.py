@@ -0,0 +1,6 @@
+# voice_ai_backend/tests/conftest.py
+import os
+import sys
+
+# Testler voice_ai_backend kökünden çalıştırılan uygulama gibi import eder (services..., core...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
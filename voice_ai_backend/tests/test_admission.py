@@ -0,0 +1,129 @@
+# voice_ai_backend/tests/test_admission.py
+import asyncio
+
+import pytest
+
+from services.admission import AdmissionController, AdmissionRejected, DeadlineExceeded
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_per_user_limit_returns_429():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrent=4, max_per_user=1, max_queue=4)
+        ticket = await controller.acquire(1)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire(1)
+        # Başka bir kullanıcı etkilenmez
+        other = await controller.acquire(2)
+        ticket.release()
+        other.release()
+        return rejected.value, controller.stats()
+
+    rejected, stats = run(scenario())
+    assert rejected.status_code == 429
+    assert rejected.retry_after >= 1
+    assert stats["rejected_user_limit"] == 1
+    assert stats["active"] == 0
+
+
+def test_full_queue_returns_503_with_retry_after():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrent=1, max_per_user=0, max_queue=1)
+        running = await controller.acquire(1)
+        queued = asyncio.create_task(controller.acquire(2))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire(3)
+        running.release()
+        (await queued).release()
+        return rejected.value, controller.stats()
+
+    rejected, stats = run(scenario())
+    assert rejected.status_code == 503
+    # Kuyrukta 1 istek + yeni istek, tek slot: iki servis süresi (henüz ölçüm yok, varsayılan 1 sn)
+    assert rejected.retry_after == 2
+    assert stats["rejected_queue_full"] == 1
+    assert stats["max_queue_depth"] == 1
+
+
+def test_queue_timeout_returns_503():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrent=1, max_queue=2, queue_timeout_seconds=0.01)
+        running = await controller.acquire(1)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire(2)
+        running.release()
+        return rejected.value, controller.stats()
+
+    rejected, stats = run(scenario())
+    assert rejected.status_code == 503
+    assert stats["queue_timeouts"] == 1
+    assert stats["queued"] == 0 and stats["active"] == 0
+
+
+def test_waiters_are_woken_in_fifo_order():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrent=1, max_per_user=0, max_queue=8)
+        order = []
+
+        async def worker(user_id):
+            ticket = await controller.acquire(user_id)
+            order.append(user_id)
+            await asyncio.sleep(0)
+            ticket.release()
+
+        first = await controller.acquire(0)
+        tasks = [asyncio.create_task(worker(user_id)) for user_id in range(1, 6)]
+        await asyncio.sleep(0)
+        first.release()
+        await asyncio.gather(*tasks)
+        return order, controller.stats()
+
+    order, stats = run(scenario())
+    assert order == [1, 2, 3, 4, 5]
+    assert stats["admitted"] == 6
+    assert stats["active"] == 0
+
+
+def test_release_is_idempotent():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrent=1)
+        ticket = await controller.acquire(1)
+        ticket.release()
+        ticket.release()
+        return controller.stats()
+
+    assert run(scenario())["active"] == 0
+
+
+def test_run_enforces_deadline_and_releases_slot():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrent=1, deadline_seconds=0.01)
+        ticket = await controller.acquire(1)
+        with pytest.raises(DeadlineExceeded):
+            await controller.run(ticket, asyncio.sleep(1))
+        return controller.stats()
+
+    stats = run(scenario())
+    assert stats["deadline_exceeded"] == 1
+    assert stats["active"] == 0
+
+
+def test_guard_stream_releases_slot_when_consumer_stops():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrent=1)
+
+        async def tokens():
+            for i in range(10):
+                yield i
+
+        ticket = await controller.acquire(1)
+        guarded = controller.guard_stream(ticket, tokens())
+        assert await guarded.__anext__() == 0
+        await guarded.aclose()
+        return controller.stats()
+
+    assert run(scenario())["active"] == 0
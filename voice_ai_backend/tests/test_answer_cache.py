@@ -0,0 +1,72 @@
+# voice_ai_backend/tests/test_answer_cache.py
+import math
+
+from services.answer_cache import SemanticAnswerCache
+
+PROMPT = "Sen yardımcı bir asistansın."
+
+
+def angled(degrees):
+    """Birim vektör; iki vektörün kosinüs benzerliği aradaki açının kosinüsüdür."""
+    radians = math.radians(degrees)
+    return [math.cos(radians), math.sin(radians)]
+
+
+def test_similar_question_with_same_context_hits():
+    cache = SemanticAnswerCache(similarity_threshold=0.95)
+    cache.store(1, PROMPT, ["c1", "c2"], angled(0), "Cevap")
+
+    # Parça sırası önemli değil; cos(10°) ≈ 0.985 eşiğin üstünde
+    assert cache.lookup(1, PROMPT, ["c2", "c1"], angled(10)) == "Cevap"
+    # cos(30°) ≈ 0.866 eşiğin altında
+    assert cache.lookup(1, PROMPT, ["c1", "c2"], angled(30)) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_different_context_or_persona_misses():
+    cache = SemanticAnswerCache()
+    cache.store(1, PROMPT, ["c1"], angled(0), "Cevap")
+    assert cache.lookup(1, PROMPT, ["c9"], angled(0)) is None
+    assert cache.lookup(1, "Başka persona", ["c1"], angled(0)) is None
+    assert cache.lookup(2, PROMPT, ["c1"], angled(0)) is None
+
+
+def test_best_match_wins():
+    cache = SemanticAnswerCache(similarity_threshold=0.8)
+    cache.store(1, PROMPT, ["c1"], angled(0), "uzak")
+    cache.store(1, PROMPT, ["c1"], angled(20), "yakın")
+    assert cache.lookup(1, PROMPT, ["c1"], angled(18)) == "yakın"
+
+
+def test_invalidate_user_drops_only_that_user():
+    cache = SemanticAnswerCache()
+    cache.store(1, PROMPT, ["c1"], angled(0), "bir")
+    cache.store(2, PROMPT, ["c1"], angled(0), "iki")
+    cache.invalidate_user(1)
+
+    assert cache.lookup(1, PROMPT, ["c1"], angled(0)) is None
+    assert cache.lookup(2, PROMPT, ["c1"], angled(0)) == "iki"
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_expired_entries_are_not_returned():
+    cache = SemanticAnswerCache(ttl_seconds=-1)
+    cache.store(1, PROMPT, ["c1"], angled(0), "eski")
+    assert cache.lookup(1, PROMPT, ["c1"], angled(0)) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_and_users_are_bounded():
+    cache = SemanticAnswerCache(max_entries_per_user=2, max_users=2)
+    for i in range(3):
+        cache.store(1, PROMPT, [f"c{i}"], angled(0), f"cevap {i}")
+    assert cache.lookup(1, PROMPT, ["c0"], angled(0)) is None
+    assert cache.lookup(1, PROMPT, ["c2"], angled(0)) == "cevap 2"
+
+    cache.store(2, PROMPT, ["c"], angled(0), "iki")
+    cache.lookup(1, PROMPT, ["c2"], angled(0))
+    cache.store(3, PROMPT, ["c"], angled(0), "üç")
+    # Kullanıcı 1'e az önce erişildi; en uzun süredir kullanılmayan 2 düşer
+    assert cache.stats()["users"] == 2
+    assert cache.lookup(2, PROMPT, ["c"], angled(0)) is None
+    assert cache.lookup(1, PROMPT, ["c2"], angled(0)) == "cevap 2"
@@ -0,0 +1,74 @@
+# voice_ai_backend/tests/test_lexical.py
+from services.rag.lexical import BM25Index, LexicalIndex, tokenize
+
+
+def test_tokenize_turkish_lowercase_and_suffixes():
+    tokens = tokenize("İSTANBUL'da Işıklı faturalarım")
+    assert "istan" in tokens  # I/İ doğru küçültülür, kesme sonrası ek atılır
+    assert "ışıkl" in tokens
+    assert "fatur" in tokens
+    assert tokenize("faturalarım") == tokenize("faturanın")
+
+
+def test_tokenize_drops_stopwords_and_keeps_product_codes():
+    tokens = tokenize("Bu ve şu AB-1234 modeli")
+    assert "bu" not in tokens and "ve" not in tokens
+    # Kod aynen, ayraçsız ve parçalı halleriyle tutulur
+    assert {"ab-1234", "ab1234", "ab", "1234"} <= set(tokens)
+
+
+def test_bm25_search_ranks_matching_chunk_first():
+    index = BM25Index()
+    index.add("a", "Fatura ödeme tarihi her ayın on beşidir.")
+    index.add("b", "Kargo teslimatı üç iş günü sürer.")
+    index.add("c", "AB-1234 model kulaklığın garanti süresi iki yıldır.")
+
+    assert index.search("faturamı ne zaman öderim", 2)[0][0] == "a"
+    assert index.search("ab1234 garanti", 1)[0][0] == "c"
+    assert index.search("hiç geçmeyen kelimeler", 3) == []
+
+
+def test_bm25_remove_and_readd():
+    index = BM25Index()
+    index.add("a", "kırmızı elma")
+    index.add("b", "yeşil elma")
+    index.remove("a")
+
+    assert len(index) == 1
+    assert [chunk_id for chunk_id, _ in index.search("kırmızı elma", 5)] == ["b"]
+    assert "kırmı" not in index.postings
+
+    # Aynı kimlik tekrar eklenince eski terimleri silinir
+    index.add("b", "armut")
+    assert index.search("elma", 5) == []
+    assert index.total_length == sum(index.doc_lengths.values())
+
+
+def test_bm25_roundtrip():
+    index = BM25Index()
+    index.add("a", "sözleşme iptal koşulları")
+    restored = BM25Index.from_dict(index.to_dict())
+    assert restored.search("iptal", 1) == index.search("iptal", 1)
+
+
+def test_lexical_index_persists_and_reloads(tmp_path):
+    index = LexicalIndex(path=str(tmp_path))
+    index.add_chunks(1, ["a"], ["iade politikası otuz gün"])
+    assert not index.exists(1)
+    index.save(1)
+
+    other_worker = LexicalIndex(path=str(tmp_path))
+    assert other_worker.search(1, "iade", 1)[0][0] == "a"
+
+
+def test_pinned_index_survives_lru_eviction(tmp_path):
+    index = LexicalIndex(path=str(tmp_path), max_users_in_memory=1)
+    with index.pinned(1):
+        index.add_chunks(1, ["a"], ["XK-12 kırmızı ürün"])
+        # Başka kullanıcılar LRU'yu doldurur; sabitlenmiş indeks düşmez
+        index.add_chunks(2, ["b"], ["muz"])
+        index.add_chunks(3, ["c"], ["armut"])
+        assert index.search(1, "XK-12", 1)[0][0] == "a"
+    # Sabitleme kalkarken kaydedilmemiş değişiklikler diske yazılır
+    assert index.exists(1)
+    assert LexicalIndex(path=str(tmp_path)).search(1, "kırmızı", 1)[0][0] == "a"
@@ -0,0 +1,248 @@
+# voice_ai_backend/tests/test_llm_pool.py
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from core.http_client import HTTPClientPool  # noqa: E402
+from services.llm_pool import CLOSED, HALF_OPEN, OPEN, LLMEndpointPool  # noqa: E402
+from services.llm_service import CONNECTION_ERROR_PREFIX, CustomLLMService  # noqa: E402
+
+
+def make_pool(count=2, **kwargs):
+    kwargs.setdefault("probe_interval_seconds", 0)
+    return LLMEndpointPool([f"http://llm{i}.local/generate" for i in range(count)], **kwargs)
+
+
+def expire(pool, endpoint):
+    endpoint.opened_at -= pool.open_seconds
+
+
+def test_circuit_opens_after_consecutive_failures():
+    pool = make_pool(failure_threshold=2)
+    first = pool.endpoints[0]
+
+    pool.record_failure(first, "hata")
+    assert first.state == CLOSED
+    pool.record_success(first)
+    pool.record_failure(first, "hata")
+    # Araya giren başarı sayacı sıfırladı
+    assert first.state == CLOSED
+
+    pool.record_failure(first, "hata")
+    assert first.state == OPEN
+    for _ in range(3):
+        endpoint = pool.acquire()
+        assert endpoint is pool.endpoints[1]
+        pool.release(endpoint)
+
+
+def test_half_open_allows_single_trial():
+    pool = make_pool(count=1, failure_threshold=1)
+    endpoint = pool.endpoints[0]
+    pool.record_failure(endpoint, "hata")
+    expire(pool, endpoint)
+
+    trial = pool.acquire()
+    assert trial is endpoint and endpoint.state == HALF_OPEN and endpoint.trial_in_flight
+    # Deneme sürerken ikinci istek sunucuya gönderilmez
+    assert pool.acquire() is None
+
+    # Deneme sonuçsuz bitti (iptal): yarı açık kalır, sıradaki istek yeniden dener
+    pool.release(trial)
+    assert not endpoint.trial_in_flight
+    assert pool.acquire() is endpoint
+
+    pool.record_failure(endpoint, "yine hata")
+    pool.release(endpoint)
+    assert endpoint.state == OPEN
+
+    expire(pool, endpoint)
+    pool.acquire()
+    pool.record_success(endpoint)
+    pool.release(endpoint)
+    assert endpoint.state == CLOSED and endpoint.consecutive_failures == 0
+
+
+def test_all_open_falls_back_to_oldest_single_trial():
+    pool = make_pool(count=2, failure_threshold=1)
+    older, newer = pool.endpoints
+    pool.record_failure(older, "hata")
+    pool.record_failure(newer, "hata")
+    older.opened_at -= 1
+
+    assert pool.acquire() is older
+    assert older.state == HALF_OPEN and older.trial_in_flight
+    # En eskinin denemesi sürerken sıradaki açık sunucu denenir, sonra istek reddedilir
+    assert pool.acquire() is newer
+    assert pool.acquire() is None
+    assert pool.acquire(exclude={newer.url}) is None
+
+
+def test_least_outstanding_then_latency_wins():
+    pool = make_pool(count=2)
+    slow, fast = pool.endpoints
+    slow.latencies.append(0.5)
+    fast.latencies.append(0.1)
+    assert pool.acquire() is fast
+    assert pool.acquire() is slow
+    assert pool.acquire(exclude={slow.url}) is fast
+
+
+# --- Yerel yedek (stand-in) sunucularla uçtan uca testler ---
+
+class StandInServer:
+    """127.0.0.1 üzerinde çalışan en basit HTTP/1.1 üretim sunucusu taklidi."""
+
+    def __init__(self, status=200, tokens=("Merhaba", " dünya"), delay=0.0, healthy=True):
+        self.status = status
+        self.tokens = tokens
+        self.delay = delay
+        self.healthy = healthy
+        self.requests = []
+        self._server = None
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/generate"
+
+    async def _handle(self, reader, writer):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            path = lines[0].split(" ")[1]
+            headers = dict(line.split(": ", 1) for line in lines[1:] if ": " in line)
+            body = await reader.readexactly(int(headers.get("content-length", headers.get("Content-Length", 0))))
+
+            if path == "/health":
+                await self._respond(writer, 200 if self.healthy else 503, b"ok")
+                return
+
+            self.requests.append(json.loads(body))
+            await asyncio.sleep(self.delay)
+            if self.status != 200:
+                await self._respond(writer, self.status, b"sunucu hatasi")
+                return
+
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nConnection: close\r\n\r\n")
+            for token in self.tokens:
+                writer.write(json.dumps({"token": token}).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, body):
+        writer.write(f"HTTP/1.1 {status} X\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode())
+        writer.write(body)
+        await writer.drain()
+
+
+async def generate(urls, **kwargs):
+    http = HTTPClientPool()
+    pool = LLMEndpointPool(urls, http=http, failure_threshold=1, probe_interval_seconds=0)
+    service = CustomLLMService(http=http, pool=pool, **kwargs)
+    try:
+        text = "".join([piece async for piece in service.generate_stream("Sistem", "Soru")])
+    finally:
+        await http.aclose()
+    return pool, text
+
+
+def test_failover_to_next_server_on_error():
+    async def scenario():
+        async with StandInServer(status=500) as broken, StandInServer() as healthy:
+            pool, text = await generate([broken.url, healthy.url])
+            return pool, text, broken, healthy
+
+    pool, text, broken, healthy = asyncio.run(scenario())
+    assert text == "Merhaba dünya"
+    assert len(broken.requests) == 1 and len(healthy.requests) == 1
+    assert pool.endpoints[0].state == OPEN
+    assert pool.endpoints[1].state == CLOSED
+    assert all(endpoint.outstanding == 0 for endpoint in pool.endpoints)
+
+
+def test_all_servers_failing_yields_error():
+    async def scenario():
+        async with StandInServer(status=500) as first, StandInServer(status=503) as second:
+            return await generate([first.url, second.url])
+
+    pool, text = asyncio.run(scenario())
+    assert "503" in text
+    assert all(endpoint.state == OPEN for endpoint in pool.endpoints)
+
+
+def test_unreachable_server_is_skipped():
+    async def scenario():
+        async with StandInServer() as healthy:
+            async with StandInServer() as gone:
+                dead_url = gone.url
+            return await generate([dead_url, healthy.url])
+
+    pool, text = asyncio.run(scenario())
+    assert text == "Merhaba dünya"
+    assert pool.endpoints[0].state == OPEN
+    assert pool.endpoints[0].last_error
+
+
+def test_slow_first_token_is_hedged_to_second_server():
+    async def scenario():
+        async with StandInServer(tokens=("yavaş",), delay=2.0) as slow, StandInServer(tokens=("hızlı",)) as fast:
+            pool, text = await generate([slow.url, fast.url], hedge_after_seconds=0.05)
+            return pool, text
+
+    pool, text = asyncio.run(scenario())
+    assert text == "hızlı"
+    assert pool.hedges_started == 1 and pool.hedges_won == 1
+    # Kaybeden kopya iptal edildi ve sunucu cezalandırılmadı
+    assert pool.endpoints[0].state == CLOSED and pool.endpoints[0].outstanding == 0
+
+
+def test_health_probe_closes_recovered_circuit():
+    async def scenario():
+        async with StandInServer() as up, StandInServer(healthy=False) as down:
+            http = HTTPClientPool()
+            pool = LLMEndpointPool([up.url, down.url], http=http, failure_threshold=1, probe_interval_seconds=0)
+            try:
+                pool.record_failure(pool.endpoints[0], "hata")
+                await asyncio.gather(*(pool._probe(endpoint) for endpoint in pool.endpoints))
+            finally:
+                await http.aclose()
+            return pool
+
+    pool = asyncio.run(scenario())
+    assert pool.endpoints[0].state == CLOSED
+    assert pool.endpoints[1].state == OPEN
+    assert pool.endpoints[1].last_error.startswith("Sağlık kontrolü")
+
+
+def test_no_endpoints_is_rejected():
+    with pytest.raises(ValueError):
+        LLMEndpointPool([])
+
+
+def test_connection_error_message_when_nothing_available():
+    async def scenario():
+        http = HTTPClientPool()
+        pool = make_pool(count=1, http=http, failure_threshold=1)
+        pool.record_failure(pool.endpoints[0], "hata")
+        pool.endpoints[0].trial_in_flight = True
+        pool.endpoints[0].state = HALF_OPEN
+        service = CustomLLMService(http=http, pool=pool)
+        return "".join([piece async for piece in service.generate_stream("Sistem", "Soru")])
+
+    assert asyncio.run(scenario()).startswith(CONNECTION_ERROR_PREFIX)
@@ -0,0 +1,65 @@
+# voice_ai_backend/tests/test_llm_streaming.py
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from core.http_client import HTTPClientPool  # noqa: E402
+from services.llm_service import CustomLLMService, LLMUpstreamError, ThinkTagFilter  # noqa: E402
+
+
+def run_filter(pieces):
+    think_filter = ThinkTagFilter()
+    return "".join(think_filter.feed(piece) for piece in pieces) + think_filter.flush()
+
+
+def test_think_block_removed_in_single_chunk():
+    assert run_filter(["<think>plan</think>Merhaba"]) == "Merhaba"
+
+
+@pytest.mark.parametrize("split", range(1, len("<think>gizli</think>")))
+def test_think_tags_split_across_chunks(split):
+    text = "Önce <think>gizli</think>sonra"
+    cut = len("Önce ") + split
+    assert run_filter([text[:cut], text[cut:]]) == "Önce sonra"
+
+
+def test_think_tags_fed_char_by_char():
+    text = "<think>a<b</think>Cevap <b>kalın</b> <thi"
+    # Kapanmayan yarım etiket metin olarak kalır, diğer HTML etiketlerine dokunulmaz
+    assert run_filter(list(text)) == "Cevap <b>kalın</b> <thi"
+
+
+def test_unclosed_think_block_is_dropped():
+    assert run_filter(["Cevap.", "<think>yarım kalan düşünce"]) == "Cevap."
+
+
+def make_service(handler):
+    http = HTTPClientPool()
+    http._clients["llm"] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return CustomLLMService(api_url="http://llm.local/generate", http=http)
+
+
+async def collect(service, payload):
+    endpoint = service.pool.endpoints[0]
+    return endpoint, [text async for text in service._generate_from(endpoint, payload)]
+
+
+def test_streaming_disabled_only_when_non_stream_retry_succeeds():
+    def handler(request):
+        if json.loads(request.content).get("stream"):
+            return httpx.Response(400, text="unknown field: stream")
+        return httpx.Response(200, json={"response": "merhaba dünya"})
+
+    endpoint, words = asyncio.run(collect(make_service(handler), {"prompt": "x"}))
+    assert "".join(words).split() == ["merhaba", "dünya"]
+    assert endpoint.streaming_supported is False
+
+
+def test_bad_request_does_not_disable_streaming():
+    service = make_service(lambda request: httpx.Response(422, text="prompt is required"))
+    with pytest.raises(LLMUpstreamError):
+        asyncio.run(collect(service, {}))
+    assert service.pool.endpoints[0].streaming_supported is None
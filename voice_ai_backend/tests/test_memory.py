@@ -0,0 +1,97 @@
+# voice_ai_backend/tests/test_memory.py
+from services.memory import ConversationMemory
+
+
+def make_memory(**kwargs):
+    # chars_per_token=1: token tahmini karakter sayısına eşit, hesaplar elle doğrulanabilir
+    kwargs.setdefault("chars_per_token", 1.0)
+    return ConversationMemory(**kwargs)
+
+
+def test_unknown_session_is_empty():
+    memory = make_memory()
+    history = memory.get(1, "yok")
+    assert not history
+    assert memory.stats()["sessions"] == 0
+
+
+def test_turns_within_budget_are_kept_verbatim():
+    memory = make_memory(token_budget=100)
+    memory.append(1, "s", "  Merhaba ", "Selam ")
+    memory.append(1, "s", "Nasılsın?", "İyiyim.")
+
+    history = memory.get(1, "s")
+    assert history.summary == ""
+    assert history.turns == [("Merhaba", "Selam"), ("Nasılsın?", "İyiyim.")]
+    # Oturumlar kullanıcıya göre ayrılır
+    assert not memory.get(2, "s")
+
+
+def test_over_budget_turns_are_folded_into_summary():
+    memory = make_memory(token_budget=20, evict_ratio=0.5)
+    memory.append(1, "s", "Soru bir. Ek.", "Cvp1")    # 13 + 4 = 17 token
+    memory.append(1, "s", "Soru2", "Cvp2")            # 9 token, toplam 26 > 20
+
+    history = memory.get(1, "s")
+    # Hedef 10 token: en eski tur özetlenir, son tur her zaman aynen kalır
+    assert history.turns == [("Soru2", "Cvp2")]
+    assert history.summary == "- Kullanıcı: Soru bir. / Asistan: Cvp1"
+    assert memory.stats()["turns_summarized"] == 1
+
+
+def test_last_turn_is_never_summarized():
+    memory = make_memory(token_budget=5)
+    memory.append(1, "s", "Çok uzun bir soru", "Çok uzun bir cevap")
+    assert memory.get(1, "s").turns == [("Çok uzun bir soru", "Çok uzun bir cevap")]
+    assert memory.get(1, "s").summary == ""
+
+
+def test_summary_is_stable_until_next_eviction():
+    memory = make_memory(token_budget=30, evict_ratio=0.3)
+    memory.append(1, "s", "a" * 10, "b" * 10)
+    memory.append(1, "s", "c" * 5, "d" * 5)   # 30 token: sınırda, özetlenmez
+    assert memory.get(1, "s").summary == ""
+
+    memory.append(1, "s", "e", "f")           # aşıldı: hedef 9 token, iki tur özetlenir
+    summary = memory.get(1, "s").summary
+    assert summary.count("\n") == 1
+    assert memory.get(1, "s").turns == [("e", "f")]
+
+    # Bütçe içinde kalan yeni turlar özeti (prompt ön ekini) değiştirmez
+    memory.append(1, "s", "g", "h")
+    assert memory.get(1, "s").summary == summary
+
+
+def test_summary_drops_oldest_lines_over_its_budget():
+    memory = make_memory(token_budget=10, summary_token_budget=60, evict_ratio=0.0)
+    for i in range(4):
+        memory.append(1, "s", f"Soru {i}", f"Cevap {i}")
+
+    lines = memory.get(1, "s").summary.split("\n")
+    # Her satır 35 karakter; 60 token'lık bütçeye yalnızca en yeni satır sığar
+    assert lines == ["- Kullanıcı: Soru 2 / Asistan: Cevap 2"]
+    assert memory.stats()["summary_lines_dropped"] == 2
+
+
+def test_long_first_sentence_is_truncated_at_word_boundary():
+    memory = make_memory(summary_line_chars=10)
+    assert memory._first_sentence("bir iki üç dört beş. İkinci") == "bir iki…"
+
+
+def test_max_sessions_evicts_least_recently_used():
+    memory = make_memory(max_sessions=2)
+    memory.append(1, "a", "x", "y")
+    memory.append(1, "b", "x", "y")
+    memory.get(1, "a")
+    memory.append(1, "c", "x", "y")
+
+    assert memory.get(1, "a")
+    assert not memory.get(1, "b")
+    assert memory.stats()["sessions"] == 2
+
+
+def test_idle_sessions_expire():
+    memory = make_memory(ttl_seconds=-1)
+    memory.append(1, "s", "x", "y")
+    assert not memory.get(1, "s")
+    assert memory.stats()["expired"] == 1
@@ -0,0 +1,124 @@
+# voice_ai_backend/tests/test_numpy_backend.py
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from services.rag.backends import NumpyBackend, VectorBackend  # noqa: E402
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def segment_files(backend, user_id):
+    directory = backend._dir(user_id)
+    return {name.split(".", 1)[0] for name in os.listdir(directory) if name.startswith("seg_")}
+
+
+def sidecar_segments(backend, user_id):
+    with open(backend._meta_file(user_id), encoding="utf-8") as f:
+        return [entry["name"] for entry in json.load(f)["segments"]]
+
+
+def test_vector_backend_is_abstract():
+    with pytest.raises(TypeError):
+        VectorBackend()
+
+
+def test_upsert_query_and_get(tmp_path):
+    backend = NumpyBackend(path=str(tmp_path))
+    backend.upsert(1, ["x", "y", "z"], ["doğu", "kuzey", "batı"],
+                   [[1, 0], [0, 1], [-1, 0]], [{"source": "a.txt"}] * 3)
+
+    assert [chunk_id for chunk_id, _, _ in backend.query(1, [0.9, 0.1], 2)] == ["x", "y"]
+    assert backend.get(1, ["y"]) == [("y", "kuzey", {"source": "a.txt"})]
+    assert backend.has_documents_hint(1) is True
+    assert backend.has_documents_hint(2) is False
+    assert backend.query(2, [1, 0], 3) == []
+
+
+def test_upsert_replaces_existing_ids_and_dedupes_batch(tmp_path):
+    backend = NumpyBackend(path=str(tmp_path))
+    backend.upsert(1, ["x"], ["eski"], [[1, 0]], [{"v": 1}])
+    backend.upsert(1, ["x", "x"], ["ara", "yeni"], [[0, 1], [0, 1]], [{"v": 2}, {"v": 3}])
+
+    assert backend.get(1) == [("x", "yeni", {"v": 3})]
+    assert backend.query(1, [0, 1], 5)[0][0] == "x"
+
+
+def test_update_metadatas_keeps_text_and_vector(tmp_path):
+    backend = NumpyBackend(path=str(tmp_path))
+    backend.upsert(1, ["x", "y"], ["bir", "iki"], [[1, 0], [0, 1]], [{"page": 1, "source": "a"}] * 2)
+    backend.update_metadatas(1, ["x", "yok"], [{"page": 7, "source": "a"}, {"page": 0}])
+
+    assert backend.get(1, ["x"]) == [("x", "bir", {"page": 7, "source": "a"})]
+    assert backend.query(1, [1, 0], 1)[0][0] == "x"
+    assert sorted(backend.ids_for_source(1, "a")) == ["x", "y"]
+
+
+def test_delete_removes_rows_and_empty_user_directory(tmp_path):
+    backend = NumpyBackend(path=str(tmp_path))
+    backend.upsert(1, ["x", "y"], ["bir", "iki"], [[1, 0], [0, 1]], [{}, {}])
+    backend.delete(1, ["x", "bilinmeyen"])
+    assert [chunk_id for chunk_id, _, _ in backend.get(1)] == ["y"]
+    assert [chunk_id for chunk_id, _, _ in backend.query(1, [1, 0], 5)] == ["y"]
+
+    backend.delete(1, ["y"])
+    assert backend.get(1) == []
+    assert not os.path.exists(backend._dir(1))
+    assert backend.has_documents_hint(1) is False
+
+
+def test_batches_merge_into_logarithmic_segments(tmp_path):
+    backend = NumpyBackend(path=str(tmp_path))
+    rng = np.random.default_rng(0)
+    expected = {}
+    for batch in range(40):
+        ids = [f"c{batch}_{i}" for i in range(8)]
+        vectors = rng.normal(size=(8, 16))
+        backend.upsert(1, ids, ids, vectors.tolist(), [{"batch": batch}] * 8)
+        expected.update({chunk_id: unit(vector) for chunk_id, vector in zip(ids, vectors)})
+
+    segments = sidecar_segments(backend, 1)
+    assert len(segments) <= 6
+    assert backend.stats()["merges"] > 0
+    # Diskte yalnızca sidecar'ın referans verdiği segmentler kalır
+    assert segment_files(backend, 1) == set(segments)
+
+    query = unit(rng.normal(size=16))
+    best = sorted(expected, key=lambda chunk_id: -float(expected[chunk_id] @ query))[:5]
+    assert [chunk_id for chunk_id, _, _ in backend.query(1, query.tolist(), 5)] == best
+
+
+def test_compaction_when_dead_rows_dominate(tmp_path):
+    backend = NumpyBackend(path=str(tmp_path))
+    ids = [f"c{i}" for i in range(20)]
+    backend.upsert(1, ids[:10], ids[:10], np.eye(20)[:10].tolist(), [{}] * 10)
+    backend.upsert(1, ids[10:], ids[10:], np.eye(20)[10:].tolist(), [{}] * 10)
+    backend.delete(1, ids[:15])
+
+    assert len(sidecar_segments(backend, 1)) == 1
+    assert sorted(chunk_id for chunk_id, _, _ in backend.get(1)) == ids[15:]
+
+
+def test_writers_see_each_others_segments(tmp_path):
+    # İki worker aynı dizini kullanır: biri diğerinin segmentini silmemeli
+    first = NumpyBackend(path=str(tmp_path))
+    second = NumpyBackend(path=str(tmp_path))
+    first.get(1)
+    first.upsert(1, ["a"], ["a"], [[1, 0]], [{}])
+    second.upsert(1, ["b"], ["b"], [[0, 1]], [{}])
+    first.upsert(1, ["c"], ["c"], [[1, 1]], [{}])
+
+    assert sorted(chunk_id for chunk_id, _, _ in second.get(1)) == ["a", "b", "c"]
+    assert segment_files(first, 1) == set(sidecar_segments(first, 1))
+
+
+def test_float16_storage(tmp_path):
+    backend = NumpyBackend(path=str(tmp_path), dtype="float16", query_block_rows=2)
+    backend.upsert(1, ["x", "y", "z"], ["x", "y", "z"], [[1, 0], [0, 1], [1, 1]], [{}] * 3)
+    assert backend.query(1, [0.1, 1], 1)[0][0] == "y"
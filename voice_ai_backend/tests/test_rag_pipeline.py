@@ -0,0 +1,38 @@
+# voice_ai_backend/tests/test_rag_pipeline.py
+import asyncio
+
+import pytest
+
+Document = pytest.importorskip("langchain_core.documents").Document
+
+from services.rag.context import ContextAssembler  # noqa: E402
+from services.rag.pipeline import RAGPipeline  # noqa: E402
+
+
+class FakeStore:
+    def __init__(self, docs):
+        self.docs = docs
+        self.requested_k = None
+
+    async def query_async(self, user_id, query_text, k):
+        self.requested_k = k
+        return self.docs[:k]
+
+
+def test_pipeline_accepts_assembler_and_fetch_multiplier():
+    docs = [Document(page_content=f"Parça {i} farklı içerik {i * 7}", metadata={"source": f"d{i}.txt"})
+            for i in range(10)]
+    store = FakeStore(docs)
+    pipeline = RAGPipeline(store=store, assembler=ContextAssembler(token_budget=0), fetch_multiplier=3)
+
+    context, sources = asyncio.run(pipeline.get_context_async(1, "soru", k=2))
+
+    assert store.requested_k == 6
+    assert len(sources) == 2
+    assert context.count("[KAYNAK:") == 2
+    assert pipeline.assembler.stats()["requests"] == 1
+
+
+def test_pipeline_returns_empty_context_without_documents():
+    pipeline = RAGPipeline(store=FakeStore([]), assembler=ContextAssembler())
+    assert asyncio.run(pipeline.get_context_async(1, "soru")) == ("", [])
@@ -0,0 +1,62 @@
+# voice_ai_backend/tests/test_text_segmenter.py
+from services.text_segmenter import SentenceSegmenter
+
+
+def segment(text, step=3, **kwargs):
+    """Metni LLM token akışı gibi küçük parçalar halinde verir ve çıkan tüm parçaları döner."""
+    segmenter = SentenceSegmenter(**kwargs)
+    chunks = []
+    for start in range(0, len(text), step):
+        chunks.extend(segmenter.feed(text[start:start + step]))
+    return chunks + segmenter.flush()
+
+
+def test_splits_on_sentence_end():
+    text = "Bugün hava çok güzel ve güneşli. Yarın ise yağmur bekleniyor, şemsiye alın!"
+    assert segment(text, first_chunk_min_chars=0) == [
+        "Bugün hava çok güzel ve güneşli.",
+        "Yarın ise yağmur bekleniyor, şemsiye alın!",
+    ]
+
+
+def test_abbreviations_do_not_end_sentence():
+    text = "Randevunuz Dr. Ahmet Bey ile yarın sabah saat dokuzda. Lütfen erken gelin ve bekleyin."
+    chunks = segment(text, first_chunk_min_chars=0)
+    assert chunks[0] == "Randevunuz Dr. Ahmet Bey ile yarın sabah saat dokuzda."
+    assert len(chunks) == 2
+
+
+def test_decimals_are_not_split():
+    text = "Ürünün fiyatı 1.5 milyon lira olarak açıklandı. Teslimat ise gelecek ay yapılacak."
+    assert segment(text, first_chunk_min_chars=0)[0] == "Ürünün fiyatı 1.5 milyon lira olarak açıklandı."
+
+
+def test_ordinals_followed_by_lowercase_are_not_split():
+    text = "Sözleşmenin 3. maddesi iade koşullarını açıklıyor. Diğer maddeler ise teslimatla ilgili."
+    assert segment(text, first_chunk_min_chars=0)[0] == "Sözleşmenin 3. maddesi iade koşullarını açıklıyor."
+
+
+def test_ordinal_decision_waits_for_next_word():
+    segmenter = SentenceSegmenter(first_chunk_min_chars=0, min_chunk_chars=5)
+    # "3." sonrası henüz belli değil: karar bir sonraki kelimeye kadar ertelenir
+    assert segmenter.feed("Toplam adet 3. ") == []
+    assert segmenter.feed("Kargo yarın çıkar. ") == ["Toplam adet 3.", "Kargo yarın çıkar."]
+
+
+def test_first_chunk_flushes_early_on_clause():
+    text = "Merhaba, size bu konuda memnuniyetle yardımcı olabilirim, önce birkaç bilgi almam gerekiyor."
+    chunks = segment(text, first_chunk_min_chars=40)
+    assert chunks[0] == "Merhaba, size bu konuda memnuniyetle yardımcı olabilirim,"
+    assert chunks[1] == "önce birkaç bilgi almam gerekiyor."
+
+
+def test_short_sentences_are_merged():
+    chunks = segment("Evet. Tabii ki bu mümkün, hemen bakıyorum.", first_chunk_min_chars=0, min_chunk_chars=20)
+    assert chunks == ["Evet. Tabii ki bu mümkün, hemen bakıyorum."]
+
+
+def test_long_text_without_punctuation_is_cut_at_max():
+    text = " ".join(["kelime"] * 60)
+    chunks = segment(text, first_chunk_min_chars=0, max_chunk_chars=100)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert " ".join(chunks) == text
@@ -0,0 +1,76 @@
+# voice_ai_backend/tests/test_tts_cache.py
+import asyncio
+import os
+import time
+
+from services.tts_cache import ORPHAN_TMP_SECONDS, TTSAudioCache
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_key_normalizes_text_but_not_voice_or_speed():
+    cache = TTSAudioCache(disk_path=None)
+    key = cache.make_key("Merhaba  dünya ", "alloy", 1.0, "mp3")
+    assert key == cache.make_key("Merhaba dünya", "alloy", 1.0, "mp3")
+    assert key != cache.make_key("Merhaba dünya", "nova", 1.0, "mp3")
+    assert key != cache.make_key("Merhaba dünya", "alloy", 1.25, "mp3")
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = TTSAudioCache(memory_budget_bytes=10, disk_path=None)
+
+    async def scenario():
+        await cache.put("a", b"x" * 4)
+        await cache.put("b", b"y" * 4)
+        assert await cache.get("a") == b"x" * 4  # a en son kullanılan olur
+        await cache.put("c", b"z" * 4)  # bütçe aşıldı: b düşer
+        return await cache.get("b"), await cache.get("a"), await cache.get("c")
+
+    assert run(scenario()) == (None, b"x" * 4, b"z" * 4)
+    stats = cache.stats()
+    assert stats["memory_bytes"] <= 10
+    assert stats["memory_hits"] == 3 and stats["misses"] == 1
+
+
+def test_oversized_entry_is_not_kept_in_memory():
+    cache = TTSAudioCache(memory_budget_bytes=4, disk_path=None)
+    run(cache.put("a", b"x" * 5))
+    assert run(cache.get("a")) is None
+
+
+def test_disk_tier_survives_restart_and_promotes_to_memory(tmp_path):
+    run(TTSAudioCache(disk_path=str(tmp_path)).put("k", b"ses", "mp3"))
+
+    cache = TTSAudioCache(disk_path=str(tmp_path))
+    assert run(cache.get("k")) == b"ses"
+    assert run(cache.get("k")) == b"ses"
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1
+
+
+def test_disk_tier_respects_byte_budget(tmp_path):
+    cache = TTSAudioCache(memory_budget_bytes=0, disk_budget_bytes=10, disk_path=str(tmp_path))
+
+    async def scenario():
+        for key in ("a", "b", "c"):
+            await cache.put(key, key.encode() * 4)
+        return [await cache.get(key) for key in ("a", "b", "c")]
+
+    assert run(scenario()) == [None, b"bbbb", b"cccc"]
+    assert cache.stats()["disk_bytes"] <= 10
+
+
+def test_startup_scan_removes_only_stale_tmp_files(tmp_path):
+    stale = tmp_path / "a.mp3.tmp1.2"
+    fresh = tmp_path / "b.mp3.tmp3.4"
+    for path in (stale, fresh, tmp_path / "c.mp3"):
+        path.write_bytes(b"data")
+    old = time.time() - ORPHAN_TMP_SECONDS - 10
+    os.utime(stale, (old, old))
+
+    cache = TTSAudioCache(disk_path=str(tmp_path))
+    assert not stale.exists()
+    assert fresh.exists()  # başka bir worker o anda yazıyor olabilir
+    assert cache.stats()["disk_entries"] == 1